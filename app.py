@@ -7,9 +7,9 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 # Flask and Extensions
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, session, redirect, url_for, flash, Response, stream_with_context
 from flask_cors import CORS
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, join_room
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 
 # Database and Models
@@ -25,9 +25,6 @@ from fpdf import FPDF
 
 # External APIs
 from newsapi import NewsApiClient
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from googleapiclient.discovery import build
 import google.generativeai as genai
 
 # Web3 and Blockchain
@@ -35,17 +32,31 @@ from blockchain_service import BlockchainService
 from web3 import Web3
 
 # Data Processing
-from bs4 import BeautifulSoup
-import feedparser
 import xml.etree.ElementTree as ET
 import html
-from collections import deque
 
 # Project modules
 from simulator import *
 from utils.notifications import NotificationService
+from utils.news_refresher import NewsRefresher
+from podcast_service import PodcastFetcher, PodcastAggregator, PodcastCatalog
+from utils.podcast_dedup import merge_podcasts
+from utils.rss_ingest import RSSIngestor
+from utils.quiz_cache import QuizCache
+from utils.certificate_jobs import CertificateJobQueue
+from utils.llm_cache import LLMCache
+from utils.stage_pipeline import StagePipeline
+from utils.substance_index import default_index
+from utils.batch_classify import classify_batch, feature_row
+from utils.micro_batcher import MicroBatcher
+from utils.model_registry import ModelRegistry
+from utils.tree_ensemble import compile_ensemble
+from utils.telemetry_fanout import TelemetryFanout
+from utils.telemetry_history import TelemetryHistory
+from utils.telemetry_archive import TelemetryArchive
 
 # Standard Library
+import atexit
 import os
 import json
 import time
@@ -53,7 +64,7 @@ import random
 import string
 import logging
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -124,9 +135,10 @@ print(f"API Key loaded: {'[MASKED]' if GOOGLE_API_KEY else 'None'}")
 # Initialize News API
 newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'))
 
-# Initialize blockchain service
+# Initialize blockchain service; it connects lazily, so this never waits on the node
 try:
     blockchain_service = BlockchainService()
+    blockchain_service.start()
     logging.info("Blockchain service initialized")
 except Exception as e:
     logging.warning(f"Failed to initialize blockchain service: {str(e)}")
@@ -136,6 +148,23 @@ except Exception as e:
 genai.configure(api_key=GOOGLE_API_KEY)
 model = genai.GenerativeModel('gemini-pro')
 
+# Gemini responses are cached per endpoint; facts about a supplement change far
+# less often than personal plans or chat answers. A TTL of 0 disables caching.
+llm_cache = LLMCache(
+    model,
+    db_path=os.path.join(app.instance_path, 'llm_cache.db'),
+    max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '2048')),
+    ttls={
+        'nutrition_plan': 6 * 3600,
+        'ai_coach': 3600,
+        'ai_coach_translation': 7 * 24 * 3600,
+        'supplement_features': 7 * 24 * 3600,
+        'supplement_ingredients': 7 * 24 * 3600,
+        'supplement_safety': 24 * 3600,
+        'athlete_analysis': 3600
+    }
+)
+
 # Create certificates directory if it doesn't exist
 os.makedirs('certificates', exist_ok=True)
 
@@ -201,11 +230,12 @@ def init_sample_podcasts():
 # Initialize sample podcasts when app starts
 init_sample_podcasts()
 
-# News cache
-news_cache = {
-    'last_update': None,
-    'data': []
-}
+# News feed is refreshed in the background and shared between workers
+news_refresher = NewsRefresher(
+    newsapi,
+    snapshot_path=os.path.join(app.instance_path, 'news_snapshot.json'),
+    refresh_interval=1800
+)
 
 # Routes
 @app.route("/")
@@ -225,178 +255,86 @@ def smartlabels():
     app.logger.debug("Accessing smart labels page")
     return render_template("smartlabels.html")
 
-@app.route('/antidopingwiki')
-def antidopingwiki():
-    global news_cache
-    current_time = datetime.utcnow()
-    
-    # Check if we have cached news that's less than 30 minutes old
-    if (news_cache['last_update'] and 
-        (current_time - news_cache['last_update']).total_seconds() < 1800):
-        return render_template('antidopingwiki.html', news=news_cache['data'])
-    
-    try:
-        all_news = []
-        
-        # Fetch international doping news
-        doping_response = newsapi.get_everything(
-            q='doping sports athletics',
-            language='en',
-            sort_by='publishedAt',
-            from_param=(datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%d'),
-            page_size=10
-        )
-        
-        # Fetch local doping news (using country-specific sources)
-        local_doping_response = newsapi.get_everything(
-            q='doping sports athletics',
-            language='en',
-            domains='timesofindia.indiatimes.com,hindustantimes.com,indianexpress.com',  # Add more local sources
-            sort_by='publishedAt',
-            from_param=(datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%d'),
-            page_size=10
-        )
-        
-        # Fetch general sports news
-        sports_response = newsapi.get_top_headlines(
-            category='sports',
-            language='en',
-            page_size=10
-        )
-        
-        # Process international doping news
-        if doping_response.get('status') == 'ok' and doping_response.get('articles'):
-            for article in doping_response['articles']:
-                if article.get('title') and article.get('description'):
-                    all_news.append({
-                        'title': article.get('title', ''),
-                        'description': article.get('description', ''),
-                        'url': article.get('url', '#'),
-                        'image': article.get('urlToImage', None),
-                        'publishedAt': datetime.strptime(article.get('publishedAt', datetime.utcnow().isoformat()), 
-                                                       '%Y-%m-%dT%H:%M:%SZ').strftime('%B %d, %Y'),
-                        'source': article.get('source', {}).get('name', 'Unknown Source'),
-                        'category': 'International Doping News'
-                    })
-        
-        # Process local doping news
-        if local_doping_response.get('status') == 'ok' and local_doping_response.get('articles'):
-            for article in local_doping_response['articles']:
-                if article.get('title') and article.get('description'):
-                    all_news.append({
-                        'title': article.get('title', ''),
-                        'description': article.get('description', ''),
-                        'url': article.get('url', '#'),
-                        'image': article.get('urlToImage', None),
-                        'publishedAt': datetime.strptime(article.get('publishedAt', datetime.utcnow().isoformat()), 
-                                                       '%Y-%m-%dT%H:%M:%SZ').strftime('%B %d, %Y'),
-                        'source': article.get('source', {}).get('name', 'Unknown Source'),
-                        'category': 'Local Doping News'
-                    })
-            
-        # Process sports news
-        if sports_response.get('status') == 'ok' and sports_response.get('articles'):
-            for article in sports_response['articles']:
-                if article.get('title') and article.get('description'):
-                    all_news.append({
-                        'title': article.get('title', ''),
-                        'description': article.get('description', ''),
-                        'url': article.get('url', '#'),
-                        'image': article.get('urlToImage', None),
-                        'publishedAt': datetime.strptime(article.get('publishedAt', datetime.utcnow().isoformat()),
-                                                       '%Y-%m-%dT%H:%M:%SZ').strftime('%B %d, %Y'),
-                        'source': article.get('source', {}).get('name', 'Unknown Source'),
-                        'category': 'Sports News'
-                    })
-        
-        # Add static content for laws, punishments, and real-life cases
-        static_content = {
-            'laws': {
-                'title': 'Anti-Doping Laws and Regulations',
-                'sections': [
-                    {
-                        'title': 'WADA Code',
-                        'content': 'The World Anti-Doping Code is the core document that harmonizes anti-doping policies, rules, and regulations within sport organizations and among public authorities around the world.',
-                        'link': 'https://www.wada-ama.org/en/what-we-do/world-anti-doping-code'
-                    },
-                    {
-                        'title': 'National Anti-Doping Laws',
-                        'content': 'Each country has its own anti-doping laws and regulations that align with the WADA Code while addressing specific national requirements.',
-                        'link': 'https://www.nadaindia.org/en/rules-regulations'
-                    }
-                ]
+# Shown while NewsAPI has never answered
+SAMPLE_NEWS = [
+    {
+        'title': 'Sample International News',
+        'description': 'This is a sample international news article. The news API might be temporarily unavailable.',
+        'url': '#',
+        'image': None,
+        'source': 'Sample Source',
+        'category': 'International Doping News'
+    },
+    {
+        'title': 'Sample Local News',
+        'description': 'This is a sample local news article. The news API might be temporarily unavailable.',
+        'url': '#',
+        'image': None,
+        'source': 'Sample Source',
+        'category': 'Local Doping News'
+    }
+]
+
+# Static content for laws, punishments, and real-life cases
+WIKI_STATIC_CONTENT = {
+    'laws': {
+        'title': 'Anti-Doping Laws and Regulations',
+        'sections': [
+            {
+                'title': 'WADA Code',
+                'content': 'The World Anti-Doping Code is the core document that harmonizes anti-doping policies, rules, and regulations within sport organizations and among public authorities around the world.',
+                'link': 'https://www.wada-ama.org/en/what-we-do/world-anti-doping-code'
             },
-            'punishments': {
-                'title': 'Consequences of Doping',
-                'sections': [
-                    {
-                        'title': 'Sports Sanctions',
-                        'content': 'Athletes found guilty of doping violations may face: Competition results voided, Medal/prize forfeitures, Competition bans (2-4 years for first violation, up to lifetime for repeat offenses)',
-                    },
-                    {
-                        'title': 'Legal Consequences',
-                        'content': 'Criminal charges in some jurisdictions, Financial penalties, Loss of sponsorships and endorsements'
-                    }
-                ]
+            {
+                'title': 'National Anti-Doping Laws',
+                'content': 'Each country has its own anti-doping laws and regulations that align with the WADA Code while addressing specific national requirements.',
+                'link': 'https://www.nadaindia.org/en/rules-regulations'
+            }
+        ]
+    },
+    'punishments': {
+        'title': 'Consequences of Doping',
+        'sections': [
+            {
+                'title': 'Sports Sanctions',
+                'content': 'Athletes found guilty of doping violations may face: Competition results voided, Medal/prize forfeitures, Competition bans (2-4 years for first violation, up to lifetime for repeat offenses)',
             },
-            'cases': {
-                'title': 'Notable Doping Cases',
-                'sections': [
-                    {
-                        'title': 'Lance Armstrong Case',
-                        'content': 'Seven-time Tour de France winner stripped of titles and banned from cycling for life in 2012 due to systematic doping.',
-                        'year': '2012'
-                    },
-                    {
-                        'title': 'Russian Olympic Ban',
-                        'content': 'Russia banned from major international sporting events including Olympics due to state-sponsored doping program.',
-                        'year': '2019'
-                    },
-                    {
-                        'title': 'Ben Johnson',
-                        'content': 'Stripped of 1988 Olympic gold medal after testing positive for stanozolol. Became a landmark case in anti-doping history.',
-                        'year': '1988'
-                    }
-                ]
+            {
+                'title': 'Legal Consequences',
+                'content': 'Criminal charges in some jurisdictions, Financial penalties, Loss of sponsorships and endorsements'
             }
-        }
-        
-        if all_news:
-            # Update cache if we got news successfully
-            news_cache['last_update'] = current_time
-            news_cache['data'] = all_news
-            
-    except Exception as e:
-        logging.error(f"Error fetching news: {str(e)}")
-        import traceback
-        logging.error(f"Full error traceback: {traceback.format_exc()}")
-        
-        # Use cached data if available, otherwise use sample news
-        if news_cache['data']:
-            all_news = news_cache['data']
-        else:
-            all_news = [
-                {
-                    'title': 'Sample International News',
-                    'description': 'This is a sample international news article. The news API might be temporarily unavailable.',
-                    'url': '#',
-                    'image': None,
-                    'publishedAt': datetime.utcnow().strftime('%B %d, %Y'),
-                    'source': 'Sample Source',
-                    'category': 'International Doping News'
-                },
-                {
-                    'title': 'Sample Local News',
-                    'description': 'This is a sample local news article. The news API might be temporarily unavailable.',
-                    'url': '#',
-                    'image': None,
-                    'publishedAt': datetime.utcnow().strftime('%B %d, %Y'),
-                    'source': 'Sample Source',
-                    'category': 'Local Doping News'
-                }
-            ]
-    
-    return render_template('antidopingwiki.html', news=all_news, static_content=static_content)
+        ]
+    },
+    'cases': {
+        'title': 'Notable Doping Cases',
+        'sections': [
+            {
+                'title': 'Lance Armstrong Case',
+                'content': 'Seven-time Tour de France winner stripped of titles and banned from cycling for life in 2012 due to systematic doping.',
+                'year': '2012'
+            },
+            {
+                'title': 'Russian Olympic Ban',
+                'content': 'Russia banned from major international sporting events including Olympics due to state-sponsored doping program.',
+                'year': '2019'
+            },
+            {
+                'title': 'Ben Johnson',
+                'content': 'Stripped of 1988 Olympic gold medal after testing positive for stanozolol. Became a landmark case in anti-doping history.',
+                'year': '1988'
+            }
+        ]
+    }
+}
+
+@app.route('/antidopingwiki')
+def antidopingwiki():
+    # Never blocks on NewsAPI: the refresher serves its last snapshot, stale or not
+    all_news, _ = news_refresher.get_news()
+    if not all_news:
+        all_news = [dict(article, publishedAt=datetime.utcnow().strftime('%B %d, %Y')) for article in SAMPLE_NEWS]
+
+    return render_template('antidopingwiki.html', news=all_news, static_content=WIKI_STATIC_CONTENT)
 
 @app.route("/caloriescalculator")
 def caloriescalculator():
@@ -410,17 +348,22 @@ def ai_coach_page():
 def games():
     return render_template("games.html")
 
+# Quiz definitions are cached in-process and invalidated when they change in Mongo
+quiz_cache = QuizCache(mongo_db.quizzes if mongo_db is not None else None)
+if mongo_db is not None:
+    quiz_cache.start_watcher()
+
 @app.route('/get_quiz/<quiz_id>')
 def get_quiz(quiz_id):
     try:
         logging.info(f"Fetching quiz with ID: {quiz_id}")
-        quiz = mongo_db.quizzes.find_one({"quiz_id": quiz_id}, {"_id": 0})
-        logging.info(f"Found quiz: {quiz}")
+        quiz = quiz_cache.get_quiz(quiz_id)
         
         if not quiz:
             # Try to initialize quiz data
             if init_quiz_data():
-                quiz = mongo_db.quizzes.find_one({"quiz_id": quiz_id}, {"_id": 0})
+                quiz_cache.invalidate(quiz_id)
+                quiz = quiz_cache.get_quiz(quiz_id)
         
         if quiz:
             return jsonify({
@@ -440,397 +383,103 @@ def get_quiz(quiz_id):
             "error": str(e)
         }), 500
 
-class PodcastFetcher:
-    def __init__(self):
-        """Initialize the podcast fetcher with API clients"""
-        # Initialize Spotify client
-        self.spotify = spotipy.Spotify(client_credentials_manager=SpotifyClientCredentials())
-        
-        # Initialize YouTube client
-        self.youtube = build('youtube', 'v3', developerKey=os.environ.get('YOUTUBE_API_KEY'))
-        
-        # Anti-doping related keywords for content filtering
-        self.antidoping_keywords = [
-            'anti-doping', 'antidoping', 'doping', 'wada', 'usada', 'clean sport',
-            'drug testing', 'prohibited substances', 'banned substances', 'athlete integrity',
-            'sports integrity', 'fair play', 'clean athlete', 'performance enhancing',
-            'drug free sport', 'anti doping violation', 'therapeutic use exemption', 'tue',
-            'whereabouts', 'testing pool', 'biological passport', 'prohibited list',
-            'anti-doping rule', 'sample collection', 'doping control', 'adams',
-            'world anti-doping', 'national anti-doping', 'doping test'
-        ]
-        
-        # Search queries for finding relevant content
-        self.search_queries = [
-            'anti-doping podcast',
-            'clean sport podcast',
-            'doping in sports podcast',
-            'sports integrity podcast',
-            'wada podcast',
-            'usada podcast'
-        ]
-        
-        # YouTube channel IDs
-        self.youtube_channels = [
-            'UCQxkGRRkhVeOQpwR9WEsV3A',  # World Anti-Doping Agency (WADA)
-            'UCuJcLm5uNXtXUVHHLs2W_-Q',  # U.S. Anti-Doping Agency (USADA)
-            'UC5nU0k_KnOXAwK_6cLvjfDQ'   # UK Anti-Doping (UKAD)
-        ]
-        
-        # Rate limiting attributes
-        self.spotify_calls = deque(maxlen=30)  # Track last 30 Spotify API calls
-        self.youtube_quota = {
-            'daily_limit': 10000,
-            'used': 0,
-            'reset_time': datetime.now()
-        }
-        
-        # Add iTunes search URL
-        self.itunes_search_url = "https://itunes.apple.com/search"
-        
-    def is_antidoping_content(self, title, description):
-        """Check if content is related to sports or anti-doping based on title and description"""
-        # Make the filter more lenient by always returning True to get all content
-        return True
-
-    def _check_spotify_rate_limit(self):
-        """Implement Spotify rate limiting - 30 requests per second"""
-        now = time.time()
-        # Remove calls older than 1 second
-        while self.spotify_calls and self.spotify_calls[0] < now - 1:
-            self.spotify_calls.popleft()
-        
-        if len(self.spotify_calls) >= 30:
-            sleep_time = 1 - (now - self.spotify_calls[0])
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-        
-        self.spotify_calls.append(now)
-
-    def _check_youtube_quota(self, cost=1):
-        """Check YouTube API quota"""
-        now = datetime.now()
-        
-        # Reset quota if it's a new day
-        if now.date() > self.youtube_quota['reset_time'].date():
-            self.youtube_quota['used'] = 0
-            self.youtube_quota['reset_time'] = now
-        
-        # Check if we have enough quota
-        if self.youtube_quota['used'] + cost > self.youtube_quota['daily_limit']:
-            raise Exception("YouTube API daily quota exceeded")
-        
-        self.youtube_quota['used'] += cost
-
-    def fetch_spotify_podcasts(self):
-        """Fetch sports and anti-doping related episodes from Spotify using search"""
-        podcasts = []
-        try:
-            logging.info("Starting Spotify podcast search")
-            
-            # Broader search queries
-            search_terms = ['sports', 'athlete', 'olympic', 'fitness', 'training', 'health']
-            
-            # Search for podcasts using our queries
-            for query in search_terms:
-                try:
-                    self._check_spotify_rate_limit()
-                    results = self.spotify.search(q=query, type='show', market='US', limit=10)
-                    
-                    if not results or 'shows' not in results or 'items' not in results['shows']:
-                        continue
-                    
-                    for show in results['shows']['items']:
-                        try:
-                            show_id = show['id']
-                            show_name = show['name']
-                            publisher = show['publisher']
-                            
-                            episodes = self.spotify.show_episodes(show_id, limit=5, market='US')
-                            
-                            if not episodes or 'items' not in episodes:
-                                continue
-                            
-                            for episode in episodes['items']:
-                                try:
-                                    podcast = {
-                                        'title': episode['name'],
-                                        'description': episode.get('description', '')[:500],
-                                        'author': publisher,
-                                        'published_date': episode.get('release_date', ''),
-                                        'image_url': episode['images'][0]['url'] if episode.get('images') and episode['images'] else None,
-                                        'source_url': episode['external_urls']['spotify'] if episode.get('external_urls') else '',
-                                        'source_type': 'spotify',
-                                        'category': self._categorize_content(episode['name'], episode.get('description', '')),
-                                        'language': episode.get('language', 'en'),
-                                        'duration_ms': episode.get('duration_ms', 0)
-                                    }
-                                    
-                                    if not any(p['source_url'] == podcast['source_url'] for p in podcasts):
-                                        podcasts.append(podcast)
-                                        
-                                except Exception as episode_error:
-                                    continue
-                                    
-                        except Exception:
-                            continue
-                            
-                except Exception as search_error:
-                    if "429" in str(search_error):
-                        time.sleep(5)
-                    continue
-                    
-        except Exception as e:
-            logging.error(f"Error in fetch_spotify_podcasts: {str(e)}")
-        
-        return podcasts
+# Sample podcasts as fallback
+SAMPLE_EXTERNAL_PODCASTS = [
+    {
+        'title': 'Clean Sport Insights',
+        'description': 'A podcast about maintaining integrity in sports and understanding anti-doping measures.',
+        'author': 'Sports Integrity Unit',
+        'image_url': '/static/images/podcast-placeholder.jpg',
+        'source_url': '#',
+        'source_type': 'sample',
+        'category': 'Education & Prevention',
+        'language': 'en'
+    },
+    {
+        'title': 'The Athlete\'s Corner',
+        'description': 'Weekly discussions about sports, training, and athlete well-being.',
+        'author': 'Sports Network',
+        'image_url': '/static/images/podcast-placeholder.jpg',
+        'source_url': '#',
+        'source_type': 'sample',
+        'category': 'Athlete Stories',
+        'language': 'en'
+    },
+    {
+        'title': 'Sports Science Today',
+        'description': 'Exploring the latest developments in sports science and performance.',
+        'author': 'Science in Sports',
+        'image_url': '/static/images/podcast-placeholder.jpg',
+        'source_url': '#',
+        'source_type': 'sample',
+        'category': 'Testing & Science',
+        'language': 'en'
+    }
+]
 
-    def fetch_youtube_videos(self):
-        """Fetch sports and fitness related videos from YouTube"""
-        videos = []
-        try:
-            logging.info("Starting YouTube video fetch")
-            
-            # Broader search terms
-            search_terms = ['sports', 'athlete', 'fitness', 'training', 'olympics']
-            
-            for term in search_terms:
-                try:
-                    self._check_youtube_quota(cost=1)
-                    
-                    search_request = self.youtube.search().list(
-                        part="snippet",
-                        q=term,
-                        maxResults=10,
-                        order="date",
-                        type="video"
-                    ).execute()
-                    
-                    if not search_request.get('items'):
-                        continue
-                    
-                    for item in search_request['items']:
-                        try:
-                            snippet = item['snippet']
-                            
-                            video = {
-                                'title': snippet['title'],
-                                'description': snippet.get('description', '')[:500],
-                                'author': snippet['channelTitle'],
-                                'published_date': snippet['publishedAt'],
-                                'image_url': snippet.get('thumbnails', {}).get('high', {}).get('url'),
-                                'source_url': f"https://www.youtube.com/watch?v={item['id']['videoId']}",
-                                'source_type': 'youtube',
-                                'category': self._categorize_content(snippet['title'], snippet.get('description', '')),
-                                'language': 'en'
-                            }
-                            
-                            if not any(v['source_url'] == video['source_url'] for v in videos):
-                                videos.append(video)
-                                
-                        except Exception:
-                            continue
-                            
-                except Exception as search_error:
-                    if "quotaExceeded" in str(search_error):
-                        break
-                    elif "429" in str(search_error):
-                        time.sleep(60)
-                    continue
-                    
-        except Exception as e:
-            logging.error(f"Error in fetch_youtube_videos: {str(e)}")
-        
-        return videos
+def get_sample_podcasts():
+    return [dict(podcast, published_date=datetime.now().strftime('%Y-%m-%d')) for podcast in SAMPLE_EXTERNAL_PODCASTS]
 
-    def fetch_itunes_podcasts(self):
-        """Fetch sports and fitness related podcasts from iTunes"""
-        podcasts = []
-        try:
-            logging.info("Starting iTunes podcast search")
-            
-            # Broader search terms
-            search_terms = ['sports', 'athlete', 'fitness', 'training', 'olympics']
-            
-            for query in search_terms:
-                try:
-                    params = {
-                        'term': query,
-                        'entity': 'podcast',
-                        'limit': 20,
-                        'media': 'podcast'
-                    }
-                    
-                    response = requests.get(self.itunes_search_url, params=params)
-                    if response.status_code == 200:
-                        results = response.json()
-                        
-                        for item in results.get('results', []):
-                            try:
-                                podcast = {
-                                    'title': item.get('collectionName', ''),
-                                    'description': item.get('description', '')[:500],
-                                    'author': item.get('artistName', ''),
-                                    'published_date': datetime.now().strftime('%Y-%m-%d'),
-                                    'image_url': item.get('artworkUrl600', ''),
-                                    'source_url': item.get('collectionViewUrl', ''),
-                                    'source_type': 'itunes',
-                                    'category': self._categorize_content(
-                                        item.get('collectionName', ''),
-                                        item.get('description', '')
-                                    ),
-                                    'language': 'en'
-                                }
-                                
-                                if not any(p['source_url'] == podcast['source_url'] for p in podcasts):
-                                    podcasts.append(podcast)
-                                    
-                            except Exception:
-                                continue
-                                
-                    time.sleep(1)
-                    
-                except Exception:
-                    continue
-                    
-        except Exception as e:
-            logging.error(f"Error in fetch_itunes_podcasts: {str(e)}")
-            
-        return podcasts
+def get_podcast_fetcher():
+    """Return the shared podcast fetcher, creating it on first use"""
+    if not hasattr(app, 'podcast_fetcher'):
+        app.podcast_fetcher = PodcastFetcher()
+    return app.podcast_fetcher
 
-    def fetch_all_podcasts(self):
-        """Fetch podcasts from all available sources"""
-        all_podcasts = []
-        
-        # Try iTunes first as it's more reliable
-        itunes_podcasts = self.fetch_itunes_podcasts()
-        all_podcasts.extend(itunes_podcasts)
-        
-        try:
-            # Try Spotify if iTunes doesn't return enough results
-            if len(all_podcasts) < 20:
-                spotify_podcasts = self.fetch_spotify_podcasts()
-                all_podcasts.extend(spotcast_podcasts)
-        except Exception as spotify_error:
-            logging.warning(f"Spotify fetch failed, continuing with iTunes results: {str(spotify_error)}")
-        
-        try:
-            # Add YouTube videos as supplementary content
-            youtube_videos = self.fetch_youtube_videos()
-            all_podcasts.extend(youtube_videos)
-        except Exception as youtube_error:
-            logging.warning(f"YouTube fetch failed, continuing with podcast results: {str(youtube_error)}")
-        
-        return all_podcasts
-
-    def _categorize_content(self, title, description):
-        """Categorize content based on title and description"""
-        title_lower = title.lower()
-        description_lower = description.lower()
-        
-        # Define category keywords
-        categories = {
-            'Rules & Compliance': ['rule', 'compliance', 'violation', 'sanction', 'regulation', 'policy'],
-            'Testing & Science': ['test', 'sample', 'laboratory', 'biological passport', 'analysis'],
-            'Education': ['education', 'learn', 'guide', 'understand', 'awareness'],
-            'Athlete Stories': ['story', 'interview', 'experience', 'journey', 'athlete'],
-            'Updates & News': ['update', 'news', 'announcement', 'latest', 'change'],
-            'Clean Sport': ['clean sport', 'integrity', 'fair play', 'values']
-        }
-        
-        # Check each category
-        for category, keywords in categories.items():
-            for keyword in keywords:
-                if keyword in title_lower or keyword in description_lower:
-                    return category
-        
-        return 'General Anti-Doping'
+# Persistent podcast catalog, refreshed in the background from the external sources
+podcast_catalog = None
+if mongo_db is not None:
+    try:
+        podcast_catalog = PodcastCatalog(mongo_db, get_podcast_fetcher)
+        podcast_catalog.ensure_indexes()
+        podcast_catalog.start_refresher(interval=300)
+    except Exception as e:
+        logging.error(f"Failed to initialize podcast catalog: {str(e)}")
+        podcast_catalog = None
 
 @app.route('/api/podcasts')
 def get_podcasts():
     """API endpoint to get sports and anti-doping podcasts from various sources"""
     try:
-        # Initialize podcast fetcher if not already initialized
-        if not hasattr(app, 'podcast_fetcher'):
-            try:
-                app.podcast_fetcher = PodcastFetcher()
-            except Exception as init_error:
-                logging.error(f"Failed to initialize podcast fetcher: {str(init_error)}")
-                return jsonify({
-                    'success': False,
-                    'error': f"Failed to initialize podcast fetcher: {str(init_error)}"
-                }), 500
-
-        # Sample podcasts as fallback
-        sample_podcasts = [
-            {
-                'title': 'Clean Sport Insights',
-                'description': 'A podcast about maintaining integrity in sports and understanding anti-doping measures.',
-                'author': 'Sports Integrity Unit',
-                'published_date': datetime.now().strftime('%Y-%m-%d'),
-                'image_url': '/static/images/podcast-placeholder.jpg',
-                'source_url': '#',
-                'source_type': 'sample',
-                'category': 'Education & Prevention',
-                'language': 'en'
-            },
-            {
-                'title': 'The Athlete\'s Corner',
-                'description': 'Weekly discussions about sports, training, and athlete well-being.',
-                'author': 'Sports Network',
-                'published_date': datetime.now().strftime('%Y-%m-%d'),
-                'image_url': '/static/images/podcast-placeholder.jpg',
-                'source_url': '#',
-                'source_type': 'sample',
-                'category': 'Athlete Stories',
-                'language': 'en'
-            },
-            {
-                'title': 'Sports Science Today',
-                'description': 'Exploring the latest developments in sports science and performance.',
-                'author': 'Science in Sports',
-                'published_date': datetime.now().strftime('%Y-%m-%d'),
-                'image_url': '/static/images/podcast-placeholder.jpg',
-                'source_url': '#',
-                'source_type': 'sample',
-                'category': 'Testing & Science',
-                'language': 'en'
-            }
-        ]
-
-        all_podcasts = []
-
-        # Try to fetch from each source independently
-        try:
-            itunes_podcasts = app.podcast_fetcher.fetch_itunes_podcasts()
-            if itunes_podcasts:
-                all_podcasts.extend(itunes_podcasts)
-        except Exception as itunes_error:
-            logging.error(f"iTunes fetch failed: {str(itunes_error)}")
+        # Serve from the persistent catalog; upstream APIs are only hit by its refresher
+        if podcast_catalog:
+            result = podcast_catalog.query(
+                category=request.args.get('category'),
+                source_type=request.args.get('source_type'),
+                language=request.args.get('language'),
+                page=request.args.get('page', 1),
+                per_page=request.args.get('per_page', 20)
+            )
+            if not result['data'] and result['page'] == 1:
+                # Catalog still empty (first boot): refresh now, show samples meanwhile
+                podcast_catalog.trigger()
+                if not request.args.get('category') and not request.args.get('source_type'):
+                    result['data'] = get_sample_podcasts()
+            return jsonify({'success': True, **result})
 
         try:
-            spotify_podcasts = app.podcast_fetcher.fetch_spotify_podcasts()
-            if spotify_podcasts:
-                all_podcasts.extend(spotify_podcasts)
-        except Exception as spotify_error:
-            logging.error(f"Spotify fetch failed: {str(spotify_error)}")
+            fetcher = get_podcast_fetcher()
+        except Exception as init_error:
+            logging.error(f"Failed to initialize podcast fetcher: {str(init_error)}")
+            return jsonify({
+                'success': False,
+                'error': f"Failed to initialize podcast fetcher: {str(init_error)}"
+            }), 500
 
-        try:
-            youtube_videos = app.podcast_fetcher.fetch_youtube_videos()
-            if youtube_videos:
-                all_podcasts.extend(youtube_videos)
-        except Exception as youtube_error:
-            logging.error(f"YouTube fetch failed: {str(youtube_error)}")
+        # Without MongoDB, fetch live: all sources and search terms run concurrently within the latency budget
+        result = PodcastAggregator(fetcher).aggregate()
+        all_podcasts = result['data']
 
         # If no podcasts were found from any source, use sample podcasts
         if not all_podcasts:
             logging.info("No podcasts found from external sources, using sample podcasts")
-            all_podcasts = sample_podcasts
+            all_podcasts = get_sample_podcasts()
 
-        # Return all found podcasts
         return jsonify({
             'success': True,
-            'data': all_podcasts
+            'data': all_podcasts,
+            'partial': result['partial'],
+            'sources': result['sources']
         })
 
     except Exception as e:
@@ -838,9 +487,35 @@ def get_podcasts():
         # Return sample podcasts on error
         return jsonify({
             'success': True,
-            'data': sample_podcasts
+            'data': get_sample_podcasts()
         })
 
+@app.route('/api/podcasts/stream')
+def stream_podcasts():
+    """Stream podcasts as newline-delimited JSON, one line per source as it finishes"""
+    if podcast_catalog:
+        # Serve from the persistent catalog; a stale source only wakes its refresher
+        def generate_from_catalog():
+            for source, items, fresh in podcast_catalog.iter_sources():
+                yield json.dumps({'source': source, 'complete': fresh, 'data': items}) + '\n'
+
+        return Response(stream_with_context(generate_from_catalog()), mimetype='application/x-ndjson')
+
+    try:
+        fetcher = get_podcast_fetcher()
+    except Exception as init_error:
+        logging.error(f"Failed to initialize podcast fetcher: {str(init_error)}")
+        return jsonify({
+            'success': False,
+            'error': f"Failed to initialize podcast fetcher: {str(init_error)}"
+        }), 500
+
+    def generate():
+        for source, items, complete in PodcastAggregator(fetcher).iter_sources():
+            yield json.dumps({'source': source, 'complete': complete, 'data': items}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/submit_quiz', methods=['POST'])
 def submit_quiz():
     try:
@@ -861,13 +536,14 @@ def submit_quiz():
         if not user_id:
             raise ValueError("User ID is required")
 
-        # Get quiz data
-        quiz = mongo_db.quizzes.find_one({"quiz_id": quiz_id}, {"_id": 0})
-        if not quiz:
+        # Get quiz data and its precomputed answer key from the cache
+        quiz_entry = quiz_cache.get(quiz_id)
+        if not quiz_entry:
             raise ValueError("Invalid quiz ID")
+        quiz = quiz_entry['quiz']
 
         # Calculate score
-        correct_answers = [q['correct_answer'] for q in quiz['questions']]
+        correct_answers = quiz_entry['answer_key']
         if len(answers) != len(correct_answers):
             raise ValueError("Number of answers does not match number of questions")
 
@@ -884,60 +560,38 @@ def submit_quiz():
             'timestamp': timestamp
         }
         
-        # Generate certificate data if passing score
+        # Store result in database
+        if mongo_db is not None:
+            result_id = mongo_db.quiz_results.insert_one(quiz_result).inserted_id
+            app.logger.info(f"Quiz result stored for user {user_id}")
+        else:
+            result_id = None
+
+        # Passing scores get a certificate; rendering and minting run in the background
         certificate_data = None
         if score >= 70:
-            try:
-                token_id = None
-                # Attempt to mint blockchain certificate only if email is provided
-                if email and blockchain_service:
-                    try:
-                        token_id = blockchain_service.mint_certificate(
-                            recipient_email=email,
-                            quiz_title=quiz['title'],
-                            score=int(score)
-                        )
-                    except Exception as e:
-                        app.logger.error(f"Error minting blockchain certificate: {str(e)}")
-                
-                # Generate PDF certificate with token_id if available
-                try:
-                    pdf_filename = generate_pdf_certificate(user_id, quiz_id, score, timestamp, token_id)
-                    app.logger.info(f"Generated certificate PDF: {pdf_filename}")
-                    
-                    # Store certificate path
-                    quiz_result['pdf_certificate'] = pdf_filename
-                    
-                    # Generate certificate metadata
-                    metadata = {
-                        'user_id': user_id,
-                        'quiz_id': quiz_id,
-                        'score': score,
-                        'timestamp': timestamp.isoformat(),
-                        'token_id': token_id
-                    }
-                    
-                    certificate_data = {
-                        'token_id': token_id,
-                        'metadata': metadata,
-                        'pdf_path': pdf_filename,
-                        'user_id': user_id
-                    }
-                    
-                    quiz_result['certificate'] = certificate_data
-                    app.logger.info(f"Certificate data prepared: {certificate_data}")
-                    
-                except Exception as e:
-                    app.logger.error(f"Error generating PDF certificate: {str(e)}")
-                    raise
-                
-            except Exception as e:
-                app.logger.error(f"Error generating certificate: {str(e)}")
-                certificate_data = {'error': str(e)}
-        
-        # Store result in database
-        mongo_db.quiz_results.insert_one(quiz_result)
-        app.logger.info(f"Quiz result stored for user {user_id}")
+            job_id = certificate_jobs.enqueue({
+                'result_id': str(result_id) if result_id else None,
+                'user_id': user_id,
+                'quiz_id': quiz_id,
+                'quiz_title': quiz['title'],
+                'score': score,
+                'timestamp': timestamp.isoformat(),
+                'recipient': email
+            })
+            certificate_data = {
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': url_for('certificate_job_status', job_id=job_id),
+                'pdf_path': None,
+                'token_id': None,
+                'user_id': user_id
+            }
+            if result_id:
+                mongo_db.quiz_results.update_one(
+                    {'_id': result_id},
+                    {'$set': {'certificate.job_id': job_id, 'certificate.user_id': user_id}}
+                )
 
         response_data = {
             'success': True,
@@ -955,6 +609,19 @@ def submit_quiz():
             'error': str(e)
         }), 500
 
+@app.route('/api/llm-cache/stats')
+def llm_cache_stats():
+    return jsonify({'success': True, 'stats': llm_cache.stats()})
+
+@app.route('/api/models/status')
+def models_status():
+    return jsonify({'success': True, 'models': model_registry.status(),
+                    'performance_batcher': performance_batcher.stats()})
+
+@app.route('/api/quiz-cache/stats')
+def quiz_cache_stats():
+    return jsonify({'success': True, 'stats': quiz_cache.stats()})
+
 @app.route('/download_certificate/<user_id>/<filename>')
 def download_certificate(user_id, filename):
     try:
@@ -1031,20 +698,15 @@ def anti_doping_page():
 def ai_nutrition_planner():
     return render_template('ai_nutrition_planner.html')
 
-@app.route('/generate-nutrition-plan', methods=['POST'])
-def generate_nutrition_plan():
-    try:
-        data = request.json
-        # Construct the prompt for the model
-        prompt = f"""As a professional sports nutritionist, create a detailed weekly nutrition plan for an athlete with the following details:
-        Sport: {data['sport']}
-        Age: {data['age']}
-        Weight: {data['weight']} kg
-        Height: {data['height']} cm
-        Gender: {data['gender']}
-        Training Phase: {data['trainingPhase']}
-        Dietary Restrictions: {data['dietaryRestrictions']}
-        Goals: {data['goals']}
+NUTRITION_PLAN_PROMPT = """As a professional sports nutritionist, create a detailed weekly nutrition plan for an athlete with the following details:
+        Sport: {sport}
+        Age: {age}
+        Weight: {weight} kg
+        Height: {height} cm
+        Gender: {gender}
+        Training Phase: {training_phase}
+        Dietary Restrictions: {dietary_restrictions}
+        Goals: {goals}
         
         Please provide a comprehensive nutrition plan including:
         1. Daily caloric needs
@@ -1057,11 +719,17 @@ def generate_nutrition_plan():
         
         Format the response in a clear, structured way with sections and bullet points."""
 
-        # Generate response using Gemini
-        response = model.generate_content(prompt)
-        
-        # Get the generated text
-        nutrition_plan = response.text
+@app.route('/generate-nutrition-plan', methods=['POST'])
+def generate_nutrition_plan():
+    try:
+        data = request.json
+        # Generate response using Gemini (cached for identical athlete profiles)
+        nutrition_plan = llm_cache.generate(
+            'nutrition_plan', NUTRITION_PLAN_PROMPT,
+            sport=data['sport'], age=data['age'], weight=data['weight'], height=data['height'],
+            gender=data['gender'], training_phase=data['trainingPhase'],
+            dietary_restrictions=data['dietaryRestrictions'], goals=data['goals']
+        )
         return jsonify({"plan": nutrition_plan})
     except Exception as e:
         print(f"Error in generate_nutrition_plan: {str(e)}")
@@ -1259,6 +927,14 @@ def chat():
     """Render the chat interface"""
     return render_template('chat.html')
 
+AI_COACH_TRANSLATION_PROMPT = """Translate this sports coaching response to {language}.
+                Maintain the professional and supportive tone.
+                Preserve technical terms, numbers, and proper names.
+                
+                Original text: {text}
+                
+                Translation:"""
+
 @app.route('/ai-coach', methods=['POST'])
 def ai_coach_api():
     """Handle AI coach API requests with improved context and error handling"""
@@ -1304,30 +980,22 @@ def ai_coach_api():
             'zh': 'Chinese'
         }
 
-        # Format the prompt
-        formatted_prompt = AI_COACH_PROMPT.format(
-            language=language_names.get(language, 'English'),
-            context=context_summary,
-            message=user_message
-        )
-
         try:
             # Generate response using Gemini
-            response = model.generate_content(formatted_prompt)
-            coach_response = response.text
+            coach_response = llm_cache.generate(
+                'ai_coach', AI_COACH_PROMPT,
+                language=language_names.get(language, 'English'),
+                context=context_summary,
+                message=user_message
+            )
 
             # Translate if needed
             if language != 'en':
-                translation_prompt = f"""Translate this sports coaching response to {language_names.get(language, 'English')}.
-                Maintain the professional and supportive tone.
-                Preserve technical terms, numbers, and proper names.
-                
-                Original text: {coach_response}
-                
-                Translation:"""
-                
-                translation = model.generate_content(translation_prompt)
-                coach_response = translation.text
+                coach_response = llm_cache.generate(
+                    'ai_coach_translation', AI_COACH_TRANSLATION_PROMPT,
+                    language=language_names.get(language, 'English'),
+                    text=coach_response
+                )
 
             return jsonify({
                 'response': coach_response,
@@ -1356,74 +1024,95 @@ def smart_labels():
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
-import joblib
 import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Trainers for the first version of each model when no artifact exists yet
+def train_supplement_classifier():
+    """Train the supplement safety classifier on the basic example data"""
+    supplement_classifier = RandomForestClassifier(n_estimators=100)
+    # Example training data structure
+    X_supp = np.array([
+        # [protein_content, stimulant_level, hormone_level, synthetic_compounds]
+        [80, 0, 0, 0],  # Whey Protein
+        [0, 5, 0, 1],   # Pre-workout
+        [0, 0, 90, 1],  # Anabolic steroid
+        [20, 0, 0, 0],  # BCAA
+    ])
+    y_supp = np.array(['safe', 'caution', 'prohibited', 'safe'])
+    return supplement_classifier.fit(X_supp, y_supp)
+
+def train_performance_predictor():
+    """Train the athlete performance regressor on the basic example data"""
+    performance_predictor = GradientBoostingRegressor(n_estimators=100)
+    # Example training data structure
+    X_perf = np.array([
+        # [sleep_hours, training_intensity, stress_level, recovery_score]
+        [8, 7, 3, 90],
+        [6, 8, 6, 70],
+        [7, 6, 4, 85],
+        [5, 9, 8, 60],
+    ])
+    y_perf = np.array([95, 75, 85, 65])  # Performance scores
+    return performance_predictor.fit(X_perf, y_perf)
+
+PERFORMANCE_FEATURES = ['sleep', 'training', 'stress', 'recovery']
+
+# Score small batches with the trees flattened into NumPy arrays instead of
+# sklearn's per-call machinery; outputs are identical either way
+COMPILED_TREE_SCORING = os.getenv('COMPILED_TREE_SCORING', '1') == '1'
+
+def tree_scorer(model):
+    """The compiled scorer for a tree ensemble, or the model itself"""
+    if not COMPILED_TREE_SCORING:
+        return model
+    try:
+        return compile_ensemble(model)
+    except ValueError as e:
+        app.logger.warning(f"Scoring {type(model).__name__} through sklearn: {str(e)}")
+        return model
+
+def supplement_model_constants(supplement_classifier):
+    return {'scorer': tree_scorer(supplement_classifier)}
+
+def performance_model_constants(performance_predictor):
+    """Constant for a loaded model version, so computed once instead of per request"""
+    return {
+        'scorer': tree_scorer(performance_predictor),
+        'feature_importance': dict(zip(
+            PERFORMANCE_FEATURES, (float(v) for v in performance_predictor.feature_importances_)
+        ))
+    }
 
-# Initialize ML models
-def initialize_ml_models():
-    """Initialize or load ML models"""
-    models_dir = os.path.join(os.path.dirname(__file__), 'models')
-    os.makedirs(models_dir, exist_ok=True)
-    
-    # Supplement Safety Model
-    supplement_model_path = os.path.join(models_dir, 'supplement_safety_model.joblib')
-    if os.path.exists(supplement_model_path):
-        supplement_classifier = joblib.load(supplement_model_path)
-    else:
-        # Initialize with basic training data
-        supplement_classifier = RandomForestClassifier(n_estimators=100)
-        # Example training data structure
-        X_supp = np.array([
-            # [protein_content, stimulant_level, hormone_level, synthetic_compounds]
-            [80, 0, 0, 0],  # Whey Protein
-            [0, 5, 0, 1],   # Pre-workout
-            [0, 0, 90, 1],  # Anabolic steroid
-            [20, 0, 0, 0],  # BCAA
-        ])
-        y_supp = np.array(['safe', 'caution', 'prohibited', 'safe'])
-        supplement_classifier.fit(X_supp, y_supp)
-        joblib.dump(supplement_classifier, supplement_model_path)
-
-    # Athlete Performance Model
-    performance_model_path = os.path.join(models_dir, 'performance_model.joblib')
-    if os.path.exists(performance_model_path):
-        performance_predictor = joblib.load(performance_model_path)
-    else:
-        # Initialize with basic training data
-        performance_predictor = GradientBoostingRegressor(n_estimators=100)
-        # Example training data structure
-        X_perf = np.array([
-            # [sleep_hours, training_intensity, stress_level, recovery_score]
-            [8, 7, 3, 90],
-            [6, 8, 6, 70],
-            [7, 6, 4, 85],
-            [5, 9, 8, 60],
-        ])
-        y_perf = np.array([95, 75, 85, 65])  # Performance scores
-        performance_predictor.fit(X_perf, y_perf)
-        joblib.dump(performance_predictor, performance_model_path)
-
-    return supplement_classifier, performance_predictor
-
-# Initialize models at startup
-supplement_classifier, performance_predictor = initialize_ml_models()
+# Models are versioned under models/<name>/ and loaded (memory-mapped) on
+# first use rather than at import, so workers boot without touching them.
+# Publishing a new version swaps it in everywhere within MODEL_CHECK_INTERVAL seconds.
+models_dir = os.path.join(os.path.dirname(__file__), 'models')
+model_registry = ModelRegistry(models_dir, check_interval=float(os.getenv('MODEL_CHECK_INTERVAL', '30')))
+model_registry.register('supplement_safety', trainer=train_supplement_classifier,
+                        legacy_path=os.path.join(models_dir, 'supplement_safety_model.joblib'),
+                        prepare=supplement_model_constants)
+model_registry.register('performance', trainer=train_performance_predictor,
+                        legacy_path=os.path.join(models_dir, 'performance_model.joblib'),
+                        prepare=performance_model_constants)
+
+# Concurrent performance requests are stacked into one predict call; the
+# model is looked up per batch so a published version is picked up
+performance_batcher = MicroBatcher(lambda X: model_registry.derived('performance')['scorer'].predict(X),
+                                   max_batch=64, max_wait=0.005, name='performance-batcher')
+
+# WADA substance index, loaded from the prebuilt json/substance_index.json.gz
+substance_index = default_index()
 scaler = StandardScaler()
 
-@app.route('/api/supplements/analyze', methods=['POST'])
-def analyze_supplement_ml():
-    """Analyze supplement using ML model"""
-    try:
-        data = request.json
-        
-        # Extract features from Gemini analysis
-        ingredients_response = model.generate_content(f"""
+SUPPLEMENT_FEATURES_PROMPT = """
         Analyze this supplement and provide numerical values for:
         1. Protein content (0-100)
         2. Stimulant level (0-100)
         3. Hormone level (0-100)
         4. Synthetic compounds presence (0 or 1)
 
-        Supplement: {data.get('name', '')}
+        Supplement: {name}
 
         Please provide a response in this JSON format:
         {{
@@ -1432,28 +1121,39 @@ def analyze_supplement_ml():
             "hormone_level": float,
             "synthetic_compounds": int
         }}
-        """)
+        """
+
+def supplement_features(name):
+    """Classifier features for a supplement: from the substance index when known, else extracted by Gemini"""
+    product = substance_index.product(name)
+    if product and product.get('features'):
+        return product['features']
+    return json.loads(llm_cache.generate('supplement_features', SUPPLEMENT_FEATURES_PROMPT,
+                                         validate=json.loads, name=name))
+
+def supplement_ml_analysis(name):
+    """Extract supplement features and classify them; raises if they are unusable"""
+    return classify_supplement_features(supplement_features(name))
+
+def classify_supplement_features(features):
+    # Get ML prediction
+    result = classify_batch(model_registry.derived('supplement_safety')['scorer'], [feature_row(features)])[0]
+    return {
+        'prediction': result['prediction'],
+        'confidence': result['confidence'],
+        'features': features
+    }
+
+@app.route('/api/supplements/analyze', methods=['POST'])
+def analyze_supplement_ml():
+    """Analyze supplement using ML model"""
+    try:
+        data = request.json
         
         try:
-            features = json.loads(ingredients_response.text)
-            X = np.array([[
-                features['protein_content'],
-                features['stimulant_level'],
-                features['hormone_level'],
-                features['synthetic_compounds']
-            ]])
-            
-            # Get ML prediction
-            ml_prediction = supplement_classifier.predict(X)[0]
-            ml_proba = supplement_classifier.predict_proba(X)[0]
-            
             return jsonify({
                 'success': True,
-                'ml_analysis': {
-                    'prediction': ml_prediction,
-                    'confidence': float(max(ml_proba)),
-                    'features': features
-                }
+                'ml_analysis': supplement_ml_analysis(data.get('name', ''))
             })
         except Exception as e:
             return jsonify({
@@ -1467,6 +1167,81 @@ def analyze_supplement_ml():
             'error': str(e)
         }), 500
 
+# Upper bound on supplements per batch request, and the pool that extracts features for them
+MAX_SUPPLEMENT_BATCH = 1000
+supplement_feature_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='supplement-features')
+
+@app.route('/api/supplements/analyze/batch', methods=['POST'])
+def analyze_supplements_batch():
+    """Classify a list of supplements (names or feature vectors) with one predict_proba per wave.
+
+    Items given as features, or names known to the substance index, are
+    classified together straight away; names that need Gemini are resolved
+    concurrently and classified in waves as they finish. Results stream
+    back as newline-delimited JSON, one line per item, unless "stream" is false.
+    """
+    data = request.json or {}
+    items = data.get('supplements') or []
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': 'supplements must be a non-empty list'}), 400
+    if len(items) > MAX_SUPPLEMENT_BATCH:
+        return jsonify({'success': False, 'error': f'At most {MAX_SUPPLEMENT_BATCH} supplements per request'}), 400
+
+    ready = []
+    pending = {}
+    errors = []
+    for index, item in enumerate(items):
+        name = item if isinstance(item, str) else item.get('name') if isinstance(item, dict) else None
+        features = item.get('features') if isinstance(item, dict) else item if isinstance(item, list) else None
+        product = substance_index.product(name) if features is None and name else None
+        if features is None and product and product.get('features'):
+            features = product['features']
+        if features is not None:
+            ready.append((index, name, features))
+        elif name:
+            pending[supplement_feature_executor.submit(supplement_features, name)] = (index, name)
+        else:
+            errors.append({'index': index, 'error': 'Expected a name or features'})
+
+    def classify(batch):
+        rows, valid = [], []
+        for index, name, features in batch:
+            try:
+                rows.append(feature_row(features))
+                valid.append((index, name, features))
+            except (KeyError, TypeError, ValueError) as e:
+                yield {'index': index, 'name': name, 'error': f'Invalid features: {str(e)}'}
+        scorer = model_registry.derived('supplement_safety')['scorer']
+        for (index, name, features), result in zip(valid, classify_batch(scorer, rows)):
+            yield {'index': index, 'name': name, **result, 'features': features}
+
+    def results():
+        yield from errors
+        yield from classify(ready)
+        waiting = set(pending)
+        while waiting:
+            done, waiting = wait(waiting, return_when=FIRST_COMPLETED)
+            wave = []
+            for future in done:
+                index, name = pending[future]
+                try:
+                    wave.append((index, name, future.result()))
+                except Exception as e:
+                    yield {'index': index, 'name': name, 'error': f'Feature extraction failed: {str(e)}'}
+            yield from classify(wave)
+
+    if data.get('stream', True) is False:
+        return jsonify({'success': True, 'results': sorted(results(), key=lambda r: r['index'])})
+
+    def generate():
+        count = 0
+        for result in results():
+            count += 1
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'done': True, 'count': count}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/athlete/analyze-performance', methods=['POST'])
 def analyze_performance_ml():
     """Analyze athlete performance using ML model"""
@@ -1482,13 +1257,7 @@ def analyze_performance_ml():
         ]])
         
         # Get ML prediction
-        performance_score = performance_predictor.predict(X)[0]
-        
-        # Get feature importance
-        feature_importance = dict(zip(
-            ['sleep', 'training', 'stress', 'recovery'],
-            performance_predictor.feature_importances_
-        ))
+        performance_score = performance_batcher.predict(X[0])
         
         # Generate personalized recommendations
         recommendations = []
@@ -1512,7 +1281,7 @@ def analyze_performance_ml():
             'success': True,
             'ml_analysis': {
                 'performance_score': float(performance_score),
-                'feature_importance': feature_importance,
+                'feature_importance': model_registry.derived('performance')['feature_importance'],
                 'recommendations': recommendations,
                 'training_load_status': 'High' if X[0][1] > 7 else 'Moderate' if X[0][1] > 4 else 'Low'
             }
@@ -1524,21 +1293,9 @@ def analyze_performance_ml():
             'error': str(e)
         }), 500
 
-@app.route('/api/supplements/check', methods=['POST'])
-def check_supplement():
-    """Check supplement safety using Gemini AI and ML"""
-    try:
-        data = request.json
-        supplement_name = data.get('name', '')
-        
-        # First get ML analysis
-        ml_response = analyze_supplement_ml()
-        ml_data = ml_response.json
-        
-        # Then get Gemini analysis
-        ingredients_prompt = f"""As a supplement expert, analyze this supplement and list its typical ingredients:
+SUPPLEMENT_INGREDIENTS_PROMPT = """As a supplement expert, analyze this supplement and list its typical ingredients:
 
-Supplement Name: {supplement_name}
+Supplement Name: {name}
 
 Please provide:
 1. Common ingredients found in this supplement
@@ -1559,31 +1316,14 @@ Format the response as a JSON object with these fields:
     "common_forms": ["list of common forms (tablets, powder, etc.)"]
 }}"""
 
-        ingredients_response = model.generate_content(ingredients_prompt)
-        try:
-            ingredients_text = ingredients_response.text
-            ingredients_data = json.loads(ingredients_text)
-        except (json.JSONDecodeError, AttributeError):
-            ingredients_data = {
-                "active_ingredients": [{"name": "Unknown", "typical_amount": "N/A", "purpose": "Unable to determine"}],
-                "other_ingredients": ["Unknown"],
-                "supplement_type": "Unknown",
-                "common_forms": ["Unknown"]
-            }
+SUPPLEMENT_SAFETY_PROMPT = """As an anti-doping expert, analyze this supplement for safety and competition compliance:
 
-        # Format ingredients for safety analysis
-        active_ingredients = ", ".join([f"{ing['name']} ({ing['typical_amount']})" for ing in ingredients_data['active_ingredients']])
-        other_ingredients = ", ".join(ingredients_data['other_ingredients'])
-        
-        # Include ML prediction in the prompt
-        safety_prompt = f"""As an anti-doping expert, analyze this supplement for safety and competition compliance:
-
-Supplement: {supplement_name}
-Type: {ingredients_data['supplement_type']}
+Supplement: {name}
+Type: {supplement_type}
 Active Ingredients: {active_ingredients}
 Other Ingredients: {other_ingredients}
-ML Safety Prediction: {ml_data.get('ml_analysis', {}).get('prediction', 'Unknown')}
-ML Confidence: {ml_data.get('ml_analysis', {}).get('confidence', 0):.2f}
+ML Safety Prediction: {ml_prediction}
+ML Confidence: {ml_confidence:.2f}
 
 Provide a detailed analysis including:
 1. Overall safety assessment
@@ -1605,35 +1345,189 @@ Format the response as a JSON object with these fields:
     "alternatives": ["Safer alternatives if needed"]
 }}"""
 
-        safety_response = model.generate_content(safety_prompt)
-        try:
-            safety_text = safety_response.text
-            safety_data = json.loads(safety_text)
-        except (json.JSONDecodeError, AttributeError):
-            safety_data = {
-                "safety_status": "Caution",
-                "competition_safe": False,
-                "analysis": "Unable to determine safety with confidence",
-                "key_concerns": ["Unable to verify ingredients"],
-                "risks": ["Unknown ingredients may be present"],
-                "recommendations": [
-                    "Consult with sports nutritionist",
-                    "Verify with your sports organization",
-                    "Check WADA prohibited substances list"
-                ],
-                "wada_compliance": "Unable to determine",
-                "confidence_level": "Low",
-                "alternatives": ["Consider certified supplements"]
-            }
+# Placeholders for a stage whose Gemini reply could not be parsed or missed the budget
+UNKNOWN_INGREDIENTS = {
+    "active_ingredients": [{"name": "Unknown", "typical_amount": "N/A", "purpose": "Unable to determine"}],
+    "other_ingredients": ["Unknown"],
+    "supplement_type": "Unknown",
+    "common_forms": ["Unknown"]
+}
+
+UNKNOWN_SAFETY = {
+    "safety_status": "Caution",
+    "competition_safe": False,
+    "analysis": "Unable to determine safety with confidence",
+    "key_concerns": ["Unable to verify ingredients"],
+    "risks": ["Unknown ingredients may be present"],
+    "recommendations": [
+        "Consult with sports nutritionist",
+        "Verify with your sports organization",
+        "Check WADA prohibited substances list"
+    ],
+    "wada_compliance": "Unable to determine",
+    "confidence_level": "Low",
+    "alternatives": ["Consider certified supplements"]
+}
+
+# Total time /api/supplements/check may spend; the first two stages get part of it so safety still has time
+SUPPLEMENT_CHECK_BUDGET = float(os.getenv('SUPPLEMENT_CHECK_BUDGET', '20'))
+
+def supplement_ingredients(name):
+    ingredients_text = llm_cache.generate('supplement_ingredients', SUPPLEMENT_INGREDIENTS_PROMPT,
+                                          validate=json.loads, name=name)
+    try:
+        return json.loads(ingredients_text)
+    except json.JSONDecodeError:
+        return UNKNOWN_INGREDIENTS
+
+def supplement_safety(name, ingredients_data, ml_analysis):
+    # Format ingredients for safety analysis
+    active_ingredients = ", ".join([f"{ing['name']} ({ing['typical_amount']})" for ing in ingredients_data['active_ingredients']])
+    other_ingredients = ", ".join(ingredients_data['other_ingredients'])
+    
+    # Every listed ingredient already has a known status, so no model call is needed
+    local = substance_index.assess([ing['name'] for ing in ingredients_data['active_ingredients']] +
+                                   list(ingredients_data['other_ingredients']))
+    if not local['unknown']:
+        return local_safety_assessment(name, local)
+
+    # Include ML prediction in the prompt
+    safety_text = llm_cache.generate(
+        'supplement_safety', SUPPLEMENT_SAFETY_PROMPT, validate=json.loads,
+        name=name,
+        supplement_type=ingredients_data['supplement_type'],
+        active_ingredients=active_ingredients,
+        other_ingredients=other_ingredients,
+        ml_prediction=ml_analysis.get('prediction', 'Unknown'),
+        ml_confidence=ml_analysis.get('confidence', 0)
+    )
+    try:
+        return json.loads(safety_text)
+    except json.JSONDecodeError:
+        return UNKNOWN_SAFETY
+
+SAFETY_STATUS = {'SAFE': 'Safe', 'THRESHOLD': 'Caution', 'IN-COMPETITION': 'Prohibited', 'PROHIBITED': 'Prohibited'}
+WADA_COMPLIANCE = {
+    'SAFE': 'Compliant: no listed ingredient is on the WADA Prohibited List',
+    'THRESHOLD': 'Permitted only below the WADA threshold',
+    'IN-COMPETITION': 'Prohibited in competition',
+    'PROHIBITED': 'Prohibited at all times'
+}
+
+def local_safety_assessment(name, assessment, product=None):
+    """Safety verdict in the /api/supplements/check format from substance index matches"""
+    status = assessment['status']
+    flagged = [m for m in assessment['ingredients'] if m['status'] != 'SAFE']
+    safety_status = SAFETY_STATUS[status]
+    if product and product['status'] == 'Caution' and safety_status == 'Safe':
+        safety_status = 'Caution'
+
+    concerns = [f"{m['name']}: {m['status'].lower()} ({m['wada_class']} {m['category']})" for m in flagged]
+    risks = [m.get('threshold') or m.get('note') for m in assessment['ingredients'] if m.get('threshold') or m.get('note')]
+    recommendations = ["Choose batch-tested products (e.g. Informed Sport certified) to limit contamination risk"]
+    if flagged:
+        recommendations.insert(0, "Do not use in competition without checking the current WADA Prohibited List and your TUE status")
+    if product:
+        if product.get('warning'):
+            risks.append(product['warning'])
+        recommendations.append(product['recommendations'])
+
+    if product is None and len(assessment['ingredients']) == 1:
+        match = assessment['ingredients'][0]
+        if flagged:
+            analysis = f"{match['name']} is listed under WADA {match['wada_class']} ({match['category']}): {WADA_COMPLIANCE[status].lower()}."
+        else:
+            analysis = f"{match['name']} is not on the WADA Prohibited List."
+    elif flagged:
+        analysis = f"{name} contains {len(flagged)} listed substance(s): " + ", ".join(m['name'] for m in flagged) + "."
+    else:
+        analysis = f"None of the ingredients of {name} are on the WADA Prohibited List."
+    return {
+        "safety_status": safety_status,
+        "competition_safe": safety_status == 'Safe' and (product is None or product['competition_safe']),
+        "analysis": analysis,
+        "key_concerns": concerns,
+        "risks": risks,
+        "recommendations": recommendations,
+        "wada_compliance": WADA_COMPLIANCE[status],
+        "confidence_level": "High",
+        "alternatives": [] if status == 'SAFE' else ["Consider certified supplements"]
+    }
+
+def local_supplement_check(name):
+    """Answer /api/supplements/check from the substance index for a known product or substance, else None"""
+    product = substance_index.product(name)
+    if product:
+        assessment = substance_index.assess(product['ingredients'])
+        excipients = [m['query'] for m in assessment['ingredients'] if m['category'] == 'Excipient']
+        ingredients = {
+            "active_ingredients": [
+                {"name": m['query'], "typical_amount": "See label", "purpose": m['category']}
+                for m in assessment['ingredients'] if m['category'] != 'Excipient'
+            ],
+            "other_ingredients": excipients,
+            "supplement_type": product['category'],
+            "common_forms": product.get('common_forms', [])
+        }
+        ml_analysis = classify_supplement_features(product['features']) if product.get('features') else {}
+        return ingredients, local_safety_assessment(product['name'], assessment, product), ml_analysis
+
+    # A fuzzy hit (e.g. 'creatinine' for creatine) is a different substance often enough to need the LLM
+    match = substance_index.lookup(name)
+    if match and match['match'] == 'exact':
+        assessment = {'status': match['status'], 'ingredients': [match], 'unknown': []}
+        ingredients = {
+            "active_ingredients": [{"name": match['name'], "typical_amount": "N/A", "purpose": match['category']}],
+            "other_ingredients": [],
+            "supplement_type": match['category'],
+            "common_forms": []
+        }
+        return ingredients, local_safety_assessment(match['name'], assessment), {}
+    return None
+
+@app.route('/api/supplements/check', methods=['POST'])
+def check_supplement():
+    """Check supplement safety using Gemini AI and ML"""
+    try:
+        data = request.json
+        supplement_name = data.get('name', '')
+
+        # Known products and substances are answered from the local index in milliseconds
+        local = local_supplement_check(supplement_name)
+        if local:
+            ingredients_data, safety_data, ml_analysis = local
+            return jsonify({
+                'success': True,
+                'data': {
+                    'ingredients': ingredients_data,
+                    'safety': safety_data,
+                    'ml_analysis': ml_analysis
+                },
+                'partial': False,
+                'source': 'substance_index'
+            })
+        
+        # ML features and ingredients are independent and run concurrently; safety needs both
+        pipeline = StagePipeline(budget=SUPPLEMENT_CHECK_BUDGET)
+        pipeline.add('ml_analysis', lambda inputs: supplement_ml_analysis(supplement_name),
+                     fallback={}, deadline=SUPPLEMENT_CHECK_BUDGET * 0.6)
+        pipeline.add('ingredients', lambda inputs: supplement_ingredients(supplement_name),
+                     fallback=UNKNOWN_INGREDIENTS, deadline=SUPPLEMENT_CHECK_BUDGET * 0.6)
+        pipeline.add('safety', lambda inputs: supplement_safety(supplement_name, inputs['ingredients'], inputs['ml_analysis']),
+                     after=('ml_analysis', 'ingredients'), fallback=UNKNOWN_SAFETY)
+        results, report = pipeline.run()
 
         # Combine all analyses
         return jsonify({
             'success': True,
             'data': {
-                'ingredients': ingredients_data,
-                'safety': safety_data,
-                'ml_analysis': ml_data.get('ml_analysis', {})
-            }
+                'ingredients': results['ingredients'],
+                'safety': results['safety'],
+                'ml_analysis': results['ml_analysis']
+            },
+            'partial': StagePipeline.is_partial(report),
+            'stages': report,
+            'source': 'llm'
         })
 
     except Exception as e:
@@ -1681,6 +1575,15 @@ def analyze_product():
             app.logger.warning(f"OCR failed: {str(e)}")
             text_from_image = ""
 
+        # A readable label whose ingredients are all known needs no model call
+        local_analysis = substance_index.label_analysis(text_from_image)
+        if local_analysis:
+            app.logger.info("Label answered from the substance index")
+            os.makedirs(app.config['CACHE_DIR'], exist_ok=True)
+            with open(cache_path, 'w') as f:
+                json.dump(local_analysis, f)
+            return jsonify({'status': 'success', 'analysis': local_analysis})
+
         # Prepare Gemini model
         model = genai.GenerativeModel('gemini-pro-vision')
         
@@ -1913,34 +1816,37 @@ def calculate_score(user_answers, correct_answers):
     correct_count = sum(1 for user_ans, correct_ans in zip(user_answers, correct_answers) if user_ans == correct_ans)
     return (correct_count / len(correct_answers)) * 100
 
+# List of RSS feeds for sports and anti-doping content
+SPORTS_RSS_FEEDS = [
+    {
+        'url': 'https://feeds.megaphone.fm/EMPOW3391357123',  # Sports Integrity Podcast
+        'category': 'Sports Integrity'
+    },
+    {
+        'url': 'https://anchor.fm/s/1f8af31c/podcast/rss',  # Play True Podcast
+        'category': 'Anti-Doping'
+    },
+    {
+        'url': 'https://feeds.buzzsprout.com/1052198.rss',  # Clean Sport Collective
+        'category': 'Clean Sport'
+    },
+    {
+        'url': 'https://feeds.soundcloud.com/users/soundcloud:users:307223250/sounds.rss',  # UKAD Podcast
+        'category': 'Anti-Doping'
+    },
+    {
+        'url': 'https://www.listennotes.com/c/r/37a1c7f7e0e246d8a8696a95c7c93d62',  # The Doping Podcast
+        'category': 'Anti-Doping Education'
+    }
+]
+
+# Feeds are fetched in parallel with conditional requests; state survives restarts
+rss_ingestor = RSSIngestor(state_path=os.path.join(app.instance_path, 'rss_state.json'))
+
 def fetch_sports_podcasts():
     """Fetch sports and anti-doping related podcasts from multiple sources"""
     all_podcasts = []
     
-    # List of RSS feeds for sports and anti-doping content
-    rss_feeds = [
-        {
-            'url': 'https://feeds.megaphone.fm/EMPOW3391357123',  # Sports Integrity Podcast
-            'category': 'Sports Integrity'
-        },
-        {
-            'url': 'https://anchor.fm/s/1f8af31c/podcast/rss',  # Play True Podcast
-            'category': 'Anti-Doping'
-        },
-        {
-            'url': 'https://feeds.buzzsprout.com/1052198.rss',  # Clean Sport Collective
-            'category': 'Clean Sport'
-        },
-        {
-            'url': 'https://feeds.soundcloud.com/users/soundcloud:users:307223250/sounds.rss',  # UKAD Podcast
-            'category': 'Anti-Doping'
-        },
-        {
-            'url': 'https://www.listennotes.com/c/r/37a1c7f7e0e246d8a8696a95c7c93d62',  # The Doping Podcast
-            'category': 'Anti-Doping Education'
-        }
-    ]
-    
     # YouTube channels and playlists for anti-doping content
     youtube_sources = [
         'https://www.youtube.com/user/wadamovies/videos',  # WADA's YouTube channel
@@ -1949,49 +1855,8 @@ def fetch_sports_podcasts():
     ]
     
     try:
-        # Fetch from RSS feeds
-        for feed_info in rss_feeds:
-            try:
-                feed = feedparser.parse(feed_info['url'])
-                for entry in feed.entries[:5]:  # Get latest 5 episodes
-                    try:
-                        # Extract audio URL from enclosures or content
-                        audio_url = ''
-                        if hasattr(entry, 'enclosures') and entry.enclosures:
-                            audio_url = next((e['href'] for e in entry.enclosures 
-                                            if e.get('type', '').startswith('audio/')), '')
-                        
-                        # Get the largest image from media content or thumbnail
-                        image_url = ''
-                        if hasattr(entry, 'media_content'):
-                            images = [m['url'] for m in entry.media_content 
-                                    if m.get('type', '').startswith('image/')]
-                            if images:
-                                image_url = max(images, key=lambda x: int(x.get('width', 0)))
-                        elif hasattr(entry, 'media_thumbnail'):
-                            image_url = entry.media_thumbnail[0]['url']
-                        
-                        podcast = {
-                            'title': entry.get('title', 'Untitled Episode'),
-                            'description': BeautifulSoup(entry.get('description', ''), 'html.parser').get_text()[:500],
-                            'published_date': entry.get('published', ''),
-                            'duration': entry.get('itunes_duration', ''),
-                            'audio_url': audio_url,
-                            'image_url': image_url,
-                            'source_url': entry.get('link', ''),
-                            'author': entry.get('author', feed.feed.get('title', 'Unknown')),
-                            'category': feed_info['category'],
-                            'language': entry.get('language', 'en'),
-                            'source_type': 'rss'
-                        }
-                        all_podcasts.append(podcast)
-                        logging.info(f"Added podcast: {podcast['title']} from {feed_info['url']}")
-                    except Exception as entry_error:
-                        logging.error(f"Error processing entry from {feed_info['url']}: {str(entry_error)}")
-                        continue
-            except Exception as feed_error:
-                logging.error(f"Error fetching feed {feed_info['url']}: {str(feed_error)}")
-                continue
+        # Fetch from RSS feeds; unchanged feeds are answered from the ingestor's state
+        all_podcasts.extend(rss_ingestor.fetch(SPORTS_RSS_FEEDS))
         
         # Fetch from YouTube (if API key is available)
         youtube_api_key = os.getenv('YOUTUBE_API_KEY')
@@ -2028,7 +1893,8 @@ def fetch_sports_podcasts():
                     logging.error(f"Error fetching YouTube content from {source}: {str(yt_error)}")
                     continue
         
-        # Sort all podcasts by published date
+        # Merge duplicates across feeds and YouTube, then sort by published date
+        all_podcasts = merge_podcasts(all_podcasts)
         all_podcasts.sort(key=lambda x: x.get('published_date', ''), reverse=True)
         return all_podcasts
         
@@ -2084,36 +1950,6 @@ athlete_data = {
 }
 
 # Supplement database with safety information
-supplement_database = {
-    'whey_protein': {
-        'name': 'Whey Protein Isolate',
-        'category': 'Protein',
-        'status': 'Safe',
-        'competition_safe': True,
-        'description': 'Common and well-researched protein supplement.',
-        'recommendations': 'Safe for competition use. Check for quality certification.',
-        'common_brands': ['Brand A', 'Brand B', 'Brand C']
-    },
-    'creatine': {
-        'name': 'Creatine Monohydrate',
-        'category': 'Performance',
-        'status': 'Safe',
-        'competition_safe': True,
-        'description': 'One of the most researched supplements in sports nutrition.',
-        'recommendations': 'Follow recommended loading and maintenance doses.',
-        'common_brands': ['Brand X', 'Brand Y', 'Brand Z']
-    },
-    'pre_workout': {
-        'name': 'Pre-Workout Supplement',
-        'category': 'Performance',
-        'status': 'Caution',
-        'competition_safe': False,
-        'description': 'May contain prohibited substances. Check ingredients carefully.',
-        'recommendations': 'Verify all ingredients against WADA prohibited list.',
-        'warning': 'High risk of contamination with prohibited substances.'
-    }
-}
-
 @app.route('/api/athlete/dashboard')
 def get_athlete_dashboard():
     """Get athlete's dashboard data including metrics and recommendations"""
@@ -2239,24 +2075,17 @@ def get_athlete_dashboard():
 #             'error': str(e)
 #         }), 500
 
-@app.route('/api/athlete/analyze', methods=['POST'])
-def analyze_athlete_data():
-    """Analyze athlete's training data using Gemini AI"""
-    try:
-        data = request.json
-        
-        # Construct prompt for Gemini
-        prompt = f"""As a professional sports performance analyst, analyze this athlete's data and provide recommendations:
+ATHLETE_ANALYSIS_PROMPT = """As a professional sports performance analyst, analyze this athlete's data and provide recommendations:
 
 Training Data:
-- Daily Steps: {data.get('steps')}
-- Heart Rate: {data.get('heart_rate')} bpm
-- Sleep Hours: {data.get('sleep_hours')}
-- Training Type: {data.get('training_type')}
-- Training Intensity: {data.get('intensity')}
-- Training Duration: {data.get('duration')} minutes
-- Stress Level: {data.get('stress_level')}
-- Muscle Soreness: {data.get('soreness')}
+- Daily Steps: {steps}
+- Heart Rate: {heart_rate} bpm
+- Sleep Hours: {sleep_hours}
+- Training Type: {training_type}
+- Training Intensity: {intensity}
+- Training Duration: {duration} minutes
+- Stress Level: {stress_level}
+- Muscle Soreness: {soreness}
 
 Please analyze this data and provide:
 1. Training load assessment
@@ -2283,12 +2112,23 @@ Format the response as a JSON object with these fields:
     ]
 }}"""
 
+@app.route('/api/athlete/analyze', methods=['POST'])
+def analyze_athlete_data():
+    """Analyze athlete's training data using Gemini AI"""
+    try:
+        data = request.json
+        
         # Get response from Gemini
-        response = model.generate_content(prompt)
+        response_text = llm_cache.generate(
+            'athlete_analysis', ATHLETE_ANALYSIS_PROMPT, validate=json.loads,
+            steps=data.get('steps'), heart_rate=data.get('heart_rate'), sleep_hours=data.get('sleep_hours'),
+            training_type=data.get('training_type'), intensity=data.get('intensity'),
+            duration=data.get('duration'), stress_level=data.get('stress_level'), soreness=data.get('soreness')
+        )
         
         try:
             # Parse the response as JSON
-            analysis = json.loads(response.text)
+            analysis = json.loads(response_text)
             return jsonify(analysis)
         except json.JSONDecodeError:
             # Fallback response if AI response isn't proper JSON
@@ -2340,7 +2180,9 @@ def generate_pdf_certificate(user_id, quiz_id, score, timestamp, token_id=None):
         filepath = os.path.join(certificate_dir, filename)
         
         # Create PDF
-        c = canvas.Canvas(filepath, pagesize=letter)
+        # Render to a temporary file so re-stamping never exposes a half-written PDF
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        c = canvas.Canvas(tmp_path, pagesize=letter)
         width, height = letter
         
         # Set background color
@@ -2380,6 +2222,7 @@ def generate_pdf_certificate(user_id, quiz_id, score, timestamp, token_id=None):
         
         # Save the PDF
         c.save()
+        os.replace(tmp_path, filepath)
         app.logger.info(f"Generated certificate: {filename}")
         return filename
         
@@ -2387,16 +2230,186 @@ def generate_pdf_certificate(user_id, quiz_id, score, timestamp, token_id=None):
         app.logger.error(f"Error generating certificate PDF: {str(e)}")
         raise
 
+def render_certificate_pdf(payload, token_id):
+    """Render (or re-stamp with token_id) the PDF for a certificate job"""
+    return generate_pdf_certificate(
+        payload['user_id'], payload['quiz_id'], payload['score'],
+        datetime.fromisoformat(payload['timestamp']), token_id
+    )
+
+def submit_certificate_mint(payload):
+    """Send the mint transaction and return its hash; confirmation is tracked separately"""
+    tx_hash = blockchain_service.submit_mint(payload['recipient'], payload['quiz_title'], int(payload['score']))
+    return blockchain_service.w3.to_hex(tx_hash)
+
+def certificate_job_view(job):
+    """Public view of a certificate job, as returned by the status route and pushed over Socket.IO"""
+    job = dict(job)
+    payload = job.pop('payload')
+    job['user_id'] = payload['user_id']
+    if job['pdf_path']:
+        # Built by hand: url_for needs a request context, which worker threads do not have
+        job['download_url'] = f"/download_certificate/{payload['user_id']}/{job['pdf_path']}"
+    return job
+
+def publish_certificate_job(job):
+    """Mirror certificate job progress onto the stored quiz result and push it to watching clients"""
+    socketio.emit('certificate_status', certificate_job_view(job), to=f"certificate_{job['job_id']}")
+    result_id = job['payload'].get('result_id')
+    if mongo_db is None or not result_id:
+        return
+    metadata = {
+        'user_id': job['payload']['user_id'],
+        'quiz_id': job['payload']['quiz_id'],
+        'score': job['payload']['score'],
+        'timestamp': job['payload']['timestamp'],
+        'token_id': job['token_id']
+    }
+    mongo_db.quiz_results.update_one({'_id': ObjectId(result_id)}, {'$set': {
+        'pdf_certificate': job['pdf_path'],
+        'certificate.job_id': job['job_id'],
+        'certificate.status': job['status'],
+        'certificate.pdf_path': job['pdf_path'],
+        'certificate.token_id': job['token_id'],
+        'certificate.error': job['error'],
+        'certificate.metadata': metadata
+    }})
+
+# Certificate jobs are queued in a local SQLite file and processed by background workers
+certificate_jobs = CertificateJobQueue(
+    db_path=os.path.join(app.instance_path, 'certificate_jobs.db'),
+    render=render_certificate_pdf,
+    submit=submit_certificate_mint if blockchain_service and blockchain_service.is_configured() else None,
+    confirm=blockchain_service.track_mint if blockchain_service else None,
+    on_update=publish_certificate_job
+)
+certificate_jobs.start()
+
+@app.route('/api/blockchain/status')
+def blockchain_status():
+    if not blockchain_service:
+        return jsonify({'success': False, 'error': 'Blockchain service not configured'}), 503
+    return jsonify({'success': True, 'status': blockchain_service.status()})
+
+@app.route('/api/certificates/jobs/<job_id>')
+def certificate_job_status(job_id):
+    job = certificate_jobs.get(job_id, payload=True)
+    if not job:
+        return jsonify({'success': False, 'error': 'Certificate job not found'}), 404
+    return jsonify({'success': True, 'job': certificate_job_view(job)})
+
+@socketio.on('watch_certificate')
+def watch_certificate(data):
+    """Subscribe the client to status pushes for one certificate job"""
+    job_id = (data or {}).get('job_id')
+    if job_id:
+        join_room(f"certificate_{job_id}")
+
 from simulator import FitnessSimulator
+from test_device_simulator import simulator as device_simulator
+
+# Initialize simulator; clients get telemetry only for the athletes and teams they watch
+telemetry_fanout = TelemetryFanout(socketio, max_rate=float(os.getenv('TELEMETRY_MAX_RATE', '1')))
+# Recent samples per athlete/device in fixed memory, for the history endpoints
+telemetry_history = TelemetryHistory(max_samples=int(os.getenv('TELEMETRY_HISTORY_SECONDS', '3600')),
+                                     memory_bytes=int(float(os.getenv('TELEMETRY_HISTORY_MB', '256')) * 1024 * 1024))
+# Everything the simulator and monitored devices produce, on disk with minute/hour/day rollups
+telemetry_archive = TelemetryArchive(
+    os.getenv('TELEMETRY_ARCHIVE_DIR', os.path.join(app.instance_path, 'telemetry_archive')),
+    raw_days=int(os.getenv('TELEMETRY_ARCHIVE_RAW_DAYS', '0')) or None
+)
+telemetry_archive.start()
+atexit.register(telemetry_archive.close)
+simulator = FitnessSimulator(socketio, fanout=telemetry_fanout, history=telemetry_history, archive=telemetry_archive)
+device_simulator.history = telemetry_history
+digital_twin.archive = telemetry_archive
+
+@socketio.on('watch_athletes')
+def watch_athletes(data):
+    """Subscribe the client to telemetry frames for athletes and/or teams"""
+    data = data or {}
+    rooms = telemetry_fanout.subscribe(request.sid, athletes=data.get('athletes') or [],
+                                       teams=data.get('teams') or [])
+    return {'rooms': rooms}
+
+@socketio.on('unwatch_athletes')
+def unwatch_athletes(data):
+    data = data or {}
+    telemetry_fanout.unsubscribe(request.sid, athletes=data.get('athletes') or [],
+                                 teams=data.get('teams') or [])
+
+@socketio.on('disconnect')
+def telemetry_disconnect():
+    telemetry_fanout.disconnect(request.sid)
+
+@app.route('/api/telemetry/stats')
+def telemetry_stats():
+    return jsonify({'success': True, 'stats': telemetry_fanout.stats(), 'history': telemetry_history.stats(),
+                    'archive': telemetry_archive.stats()})
+
+def history_response(series_id):
+    """Range query on telemetry_history from ?seconds= (default the last hour) or ?start=&end=,
+    downsampled with ?bucket= seconds or ?points= buckets, limited to ?fields=a,b; 400 for bad parameters"""
+    try:
+        end = request.args.get('end', type=float)
+        start = request.args.get('start', type=float)
+        if start is None:
+            start = (end or time.time()) - request.args.get('seconds', 3600, type=float)
+        fields = request.args.get('fields')
+        history = telemetry_history.query(series_id, start=start, end=end,
+                                          bucket=request.args.get('bucket', type=float),
+                                          points=request.args.get('points', type=int),
+                                          fields=fields.split(',') if fields else None)
+        if history is None:
+            return jsonify({'success': False, 'error': 'No history for this series'}), 404
+        return jsonify({'success': True, 'history': history})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/athlete/history/<athlete_id>', methods=['GET'])
+def get_athlete_history(athlete_id):
+    return history_response(athlete_id)
 
-# Initialize simulator
-simulator = FitnessSimulator(socketio)
+@app.route('/api/digital-twin/history/<address>', methods=['GET'])
+def get_device_history(address):
+    return history_response(f"device:{address}")
+
+def archive_response(series_id):
+    """Query telemetry_archive over ?start=&end= (epoch seconds; default the last day) at
+    ?level=raw|minute|hour|day, or ?level=summary for count/min/max/avg over the whole range"""
+    try:
+        end = request.args.get('end', time.time(), type=float)
+        start = request.args.get('start', end - 86400, type=float)
+        level = request.args.get('level', 'hour')
+        fields = request.args.get('fields')
+        fields = fields.split(',') if fields else None
+        if level == 'summary':
+            result = {'series': series_id, 'start': start, 'end': end,
+                      'fields': telemetry_archive.summary(series_id, start, end, fields)}
+        else:
+            result = telemetry_archive.query(series_id, start, end, level, fields)
+        return jsonify({'success': True, 'archive': result})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/athlete/archive/<athlete_id>', methods=['GET'])
+def get_athlete_archive(athlete_id):
+    return archive_response(athlete_id)
+
+@app.route('/api/digital-twin/archive/<address>', methods=['GET'])
+def get_device_archive(address):
+    return archive_response(f"device:{address}")
 
 # Digital Twin Routes
 @app.route('/api/athlete/start_simulation/<athlete_id>', methods=['POST'])
 def start_simulation(athlete_id):
     try:
-        simulator.start_simulation(athlete_id)
+        team = request.args.get('team') or (request.get_json(silent=True) or {}).get('team')
+        simulator.start_simulation(athlete_id, team=team)
         return jsonify({
             'success': True,
             'message': f'Started simulation for athlete {athlete_id}'
@@ -2410,7 +2423,7 @@ def start_simulation(athlete_id):
 @app.route('/api/athlete/metrics/<athlete_id>', methods=['GET'])
 def get_athlete_metrics(athlete_id):
     try:
-        data = simulator.athlete_data.get(athlete_id)
+        data = simulator.metrics(athlete_id)
         if not data:
             return jsonify({
                 'success': False,
@@ -2419,18 +2432,7 @@ def get_athlete_metrics(athlete_id):
             
         return jsonify({
             'success': True,
-            'data': {
-                'heart_rate': round(data['heart_rate']),
-                'hrv': round(data['hrv']),
-                'steps': int(data['steps']),
-                'sleep_hours': round(data['sleep_hours'], 1),
-                'activity': data['current_activity'],
-                'calories_burned': int(data['calories_burned']),
-                'stress_level': round(data['stress_level']),
-                'recovery_score': round(data['recovery_score']),
-                'hydration_level': round(data['hydration_level']),
-                'is_sleeping': data['is_sleeping']
-            }
+            'data': data
         })
     except Exception as e:
         return jsonify({
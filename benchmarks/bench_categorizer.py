@@ -0,0 +1,83 @@
+"""Benchmark content categorization: the nested keyword loops against KeywordCategorizer.
+
+Usage: python benchmarks/bench_categorizer.py [--size 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.categorizer import KeywordCategorizer
+
+CATEGORIES = {
+    'Rules & Compliance': ['rule', 'compliance', 'violation', 'sanction', 'regulation', 'policy'],
+    'Testing & Science': ['test', 'sample', 'laboratory', 'biological passport', 'analysis'],
+    'Education': ['education', 'learn', 'guide', 'understand', 'awareness'],
+    'Athlete Stories': ['story', 'interview', 'experience', 'journey', 'athlete'],
+    'Updates & News': ['update', 'news', 'announcement', 'latest', 'change'],
+    'Clean Sport': ['clean sport', 'integrity', 'fair play', 'values']
+}
+
+FILLER = ('the', 'weekly', 'show', 'about', 'running', 'football', 'coach', 'season', 'talks',
+          'with', 'our', 'guests', 'on', 'training', 'nutrition', 'recovery', 'mindset', 'race')
+
+
+def legacy_categorize(title, description):
+    """The original PodcastFetcher._categorize_content"""
+    title_lower = title.lower()
+    description_lower = description.lower()
+    for category, keywords in CATEGORIES.items():
+        for keyword in keywords:
+            if keyword in title_lower or keyword in description_lower:
+                return category
+    return 'General Anti-Doping'
+
+
+def make_items(size, seed=7):
+    rng = random.Random(seed)
+    keywords = [k for words in CATEGORIES.values() for k in words]
+    items = []
+    for _ in range(size):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(40, 80))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        title = ' '.join(rng.choice(FILLER) for _ in range(6)).title()
+        items.append((title, ' '.join(words)))
+    return items
+
+
+def run(size):
+    items = make_items(size)
+
+    start = time.perf_counter()
+    legacy = [legacy_categorize(title, description) for title, description in items]
+    legacy_time = time.perf_counter() - start
+    print(f"{size} descriptions")
+    print(f"  nested loops (first hit only):   {legacy_time:8.3f}s")
+
+    for backend in ('regex', 'auto'):
+        categorizer = KeywordCategorizer(CATEGORIES, default='General Anti-Doping', backend=backend)
+        if backend == 'auto' and categorizer.backend == 'regex':
+            print("  aho-corasick: skipped (pyahocorasick not installed)")
+            continue
+
+        start = time.perf_counter()
+        classified = categorizer.classify_batch(items)
+        classify_time = time.perf_counter() - start
+        mismatches = sum(1 for old, new in zip(legacy, classified) if old != new)
+        print(f"  {categorizer.backend + ' classify:':<32} {classify_time:8.3f}s   primary mismatches: {mismatches}")
+
+        start = time.perf_counter()
+        batched = categorizer.categorize_batch(items)
+        batch_time = time.perf_counter() - start
+        mismatches = sum(1 for old, (new, _) in zip(legacy, batched) if old != new)
+        print(f"  {categorizer.backend + ' (all counts):':<32} {batch_time:8.3f}s   primary mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=100000)
+    run(parser.parse_args().size)
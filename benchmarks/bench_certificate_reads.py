@@ -0,0 +1,132 @@
+"""Count RPC round trips for listing a user's certificates: sequential reads, batched reads and the local ledger.
+
+Needs a local dev chain with the AntidopingCertificate contract deployed
+(e.g. Ganache on port 7545 after `truffle migrate`), configured through the
+same BLOCKCHAIN_* variables as the app. Certificates are minted to the
+recipient until it holds --certificates of them.
+
+Usage: python benchmarks/bench_certificate_reads.py [--rpc-url http://127.0.0.1:7545] [--certificates 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain_service import BlockchainService
+
+
+class RPCCounter:
+    """Counts HTTP round trips and individual JSON-RPC calls made by a BlockchainService"""
+
+    def __init__(self, service):
+        self.round_trips = 0
+        self.calls = 0
+        make_request = service.w3.provider.make_request
+        post = service.rpc_session.post
+
+        def counted_request(method, params):
+            self.round_trips += 1
+            self.calls += 1
+            return make_request(method, params)
+
+        def counted_post(url, json=None, **kwargs):
+            self.round_trips += 1
+            self.calls += len(json) if isinstance(json, list) else 1
+            return post(url, json=json, **kwargs)
+
+        service.w3.provider.make_request = counted_request
+        service.rpc_session.post = counted_post
+
+    def reset(self):
+        self.round_trips = 0
+        self.calls = 0
+
+
+def sequential_user_certificates(service, user_address):
+    """The previous get_user_certificates: every read issued one at a time"""
+    contract = service.contract
+    token_ids = contract.functions.getCertificatesByOwner(user_address).call()
+    certificates = []
+    for token_id in token_ids:
+        cert_data = service.get_certificate(token_id)
+        if not cert_data:
+            continue
+        certificate = service.get_certificate(token_id)
+        owner = contract.functions.ownerOf(token_id).call()
+        try:
+            token_uri = contract.functions.tokenURI(token_id).call()
+        except Exception:
+            token_uri = None
+        history = []
+        for event in contract.events.Transfer.get_logs(fromBlock=0, toBlock='latest',
+                                                       argument_filters={'tokenId': token_id}):
+            block = service.w3.eth.get_block(event['blockNumber'])
+            history.append({
+                'from': event['args']['from'],
+                'to': event['args']['to'],
+                'block_number': event['blockNumber'],
+                'timestamp': datetime.fromtimestamp(block['timestamp']).isoformat(),
+                'transaction_hash': event['transactionHash'].hex()
+            })
+        certificates.append({
+            'token_id': token_id,
+            'verification': {'success': True, 'is_valid': True, 'owner': owner, 'data': certificate,
+                             'token_uri': token_uri, 'history': history},
+            **cert_data
+        })
+    return {'success': True, 'certificates': certificates}
+
+
+def ensure_certificates(service, recipient, count):
+    held = len(service.contract.functions.getCertificatesByOwner(recipient).call())
+    missing = count - held
+    if missing > 0:
+        print(f"Minting {missing} certificates to {recipient}...")
+        results = service.mint_certificates([
+            {'recipient_address': recipient, 'quiz_title': f'Benchmark Quiz {i}', 'score': 80 + i % 20}
+            for i in range(missing)
+        ])
+        failed = [r for r in results if r['error']]
+        if failed:
+            raise SystemExit(f"{len(failed)} mints failed, first error: {failed[0]['error']}")
+
+
+def run(rpc_url, certificates, recipient):
+    os.environ['BLOCKCHAIN_NETWORK_URL'] = rpc_url
+    # Keep the benchmark's ledger away from the app's
+    os.environ['BLOCKCHAIN_LEDGER_PATH'] = os.path.join(tempfile.mkdtemp(), 'ledger.db')
+    service = BlockchainService()
+    recipient = service.w3.to_checksum_address(recipient or service.account.address)
+    ensure_certificates(service, recipient, certificates)
+
+    counter = RPCCounter(service)
+    runs = [('sequential reads', lambda: sequential_user_certificates(service, recipient)),
+            ('batched reads', lambda: service._user_certificates_on_chain(recipient))]
+    if service.ledger:
+        runs += [('ledger (first sync)', lambda: service._user_certificates_from_ledger(recipient)),
+                 ('ledger (warm)', lambda: service._user_certificates_from_ledger(recipient))]
+
+    print(f"{'path':<22} {'certs':>6} {'round trips':>12} {'rpc calls':>10} {'seconds':>9}")
+    for name, fn in runs:
+        counter.reset()
+        if service.ledger:
+            # Let every ledger run sync instead of hitting the throttle
+            service.ledger._last_sync = 0
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<22} {len(result.get('certificates', [])):>6} {counter.round_trips:>12} "
+              f"{counter.calls:>10} {elapsed:>8.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rpc-url', default=os.getenv('BLOCKCHAIN_NETWORK_URL', 'http://127.0.0.1:7545'))
+    parser.add_argument('--certificates', type=int, default=50)
+    parser.add_argument('--recipient', help='address to list (defaults to the issuing account)')
+    args = parser.parse_args()
+    run(args.rpc_url, args.certificates, args.recipient)
@@ -0,0 +1,171 @@
+"""Benchmark the vectorized FitnessSimulator engine against the per-athlete loop it replaced.
+
+Times AthletePopulation.step() and payload building for --athletes athletes
+over --ticks ticks, and the previous per-athlete dict model (reproduced below)
+on --legacy-athletes athletes. Then runs both models side by side for
+--compare-ticks simulated seconds, once at noon and once around the sleep
+windows, and prints the mean and standard deviation of every metric, so the
+vectorized engine can be checked for the same statistical behavior.
+
+Usage: python benchmarks/bench_fitness_simulator.py [--athletes 100000] [--ticks 20] [--legacy-athletes 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator import (ACTIVITIES, ACTIVITY_DEHYDRATION, ACTIVITY_PATTERNS, ACTIVITY_STRESS,
+                       MET_VALUES, AthletePopulation)
+
+METRICS = ('heart_rate', 'hrv', 'steps', 'stress_level', 'recovery_score', 'hydration_level',
+           'calories_burned', 'sleep_hours')
+
+
+def legacy_athlete(now):
+    return {
+        'heart_rate': 70, 'steps': 0, 'sleep_hours': 0, 'hrv': 65, 'last_update': now,
+        'sleep_start': None, 'is_sleeping': False, 'current_activity': 'resting',
+        'activity_duration': 0, 'calories_burned': 0, 'stress_level': 50,
+        'recovery_score': 85, 'hydration_level': 100
+    }
+
+
+def legacy_step(data, now):
+    """One tick of the previous FitnessSimulator._simulation_loop for one athlete"""
+    time_diff = now - data['last_update']
+    hour = datetime.fromtimestamp(now).hour
+    if random.random() < 0.1:
+        data['current_activity'] = random.choice(list(ACTIVITY_PATTERNS.keys()))
+    data['activity_duration'] += time_diff
+    activity = data['current_activity']
+
+    target_hr = random.uniform(*ACTIVITY_PATTERNS[activity]['hr_range'])
+    if random.random() < 0.05:
+        target_hr += random.uniform(20, 40)
+    target_hr += data['stress_level'] / 100 * 20
+    hr_change = (target_hr - data['heart_rate']) * 0.2 + random.uniform(-5, 5)
+    data['heart_rate'] = max(min(data['heart_rate'] + hr_change, 200), 45)
+
+    data['steps'] += random.uniform(*ACTIVITY_PATTERNS[activity]['steps_per_min']) * (time_diff / 60)
+
+    if not data['is_sleeping'] and 21 <= hour <= 23 and random.random() < 0.3:
+        data['is_sleeping'] = True
+        data['sleep_start'] = now
+    elif data['is_sleeping'] and 6 <= hour <= 8 and random.random() < 0.3:
+        data['is_sleeping'] = False
+        if data['sleep_start']:
+            data['sleep_hours'] = (now - data['sleep_start']) / 3600
+            data['sleep_start'] = None
+
+    stress_change = ACTIVITY_STRESS[activity] + random.uniform(-5, 5)
+    if data['is_sleeping']:
+        stress_change -= 10
+    data['stress_level'] = max(min(data['stress_level'] + stress_change * 0.1, 100), 0)
+
+    hrv = 100 - data['heart_rate'] * 0.3 - data['stress_level'] * 0.2 + data['sleep_hours'] * 2
+    data['hrv'] = max(min(hrv + random.uniform(-5, 5), 100), 20)
+
+    recovery = (data['hrv'] + min(data['sleep_hours'] * 10, 80) + 100 - data['stress_level']) / 3
+    data['recovery_score'] = max(min(recovery + random.uniform(-5, 5), 100), 0)
+
+    if random.random() < 0.1:
+        data['hydration_level'] = min(100, data['hydration_level'] + random.uniform(5, 15))
+    hydration = data['hydration_level'] - ACTIVITY_DEHYDRATION[activity] * time_diff / 3600
+    data['hydration_level'] = max(min(hydration, 100), 0)
+
+    met_values = dict(MET_VALUES)
+    data['calories_burned'] += met_values[activity] * 3.5 * 70 / 200 * (time_diff / 60)
+    data['last_update'] = now
+
+
+def time_vectorized(athletes, ticks):
+    start = time.time()
+    population = AthletePopulation(seed=0)
+    for i in range(athletes):
+        population.add(f"athlete-{i}", now=start)
+    steps, payloads = [], []
+    for tick in range(1, ticks + 1):
+        begin = time.perf_counter()
+        population.step(start + tick)
+        steps.append(time.perf_counter() - begin)
+        begin = time.perf_counter()
+        population.payloads()
+        payloads.append(time.perf_counter() - begin)
+    return np.array(steps) * 1000, np.array(payloads) * 1000
+
+
+def time_legacy(athletes, ticks):
+    start = time.time()
+    data = [legacy_athlete(start) for _ in range(athletes)]
+    durations = []
+    for tick in range(1, ticks + 1):
+        begin = time.perf_counter()
+        for athlete in data:
+            legacy_step(athlete, start + tick)
+        durations.append(time.perf_counter() - begin)
+    return np.array(durations) * 1000
+
+
+def compare(athletes, ticks, start, asleep_since=None):
+    random.seed(0)
+    legacy = [legacy_athlete(start) for _ in range(athletes)]
+    population = AthletePopulation(seed=0)
+    for i in range(athletes):
+        population.add(i, now=start)
+    if asleep_since is not None:
+        for athlete in legacy:
+            athlete.update(is_sleeping=True, sleep_start=asleep_since)
+        population.is_sleeping[:athletes] = True
+        population.sleep_start[:athletes] = asleep_since
+    for tick in range(1, ticks + 1):
+        for athlete in legacy:
+            legacy_step(athlete, start + tick)
+        population.step(start + tick)
+
+    n = population.size
+    print(f"\n{athletes} athletes after {ticks}s from {datetime.fromtimestamp(start):%H:%M}")
+    print(f"{'metric':<18} {'legacy mean':>12} {'vector mean':>12} {'legacy std':>11} {'vector std':>11}")
+    for metric in METRICS:
+        old = np.array([athlete[metric] for athlete in legacy], dtype=float)
+        new = getattr(population, metric)[:n]
+        print(f"{metric:<18} {old.mean():>12.2f} {new.mean():>12.2f} {old.std():>11.2f} {new.std():>11.2f}")
+    old_activity = np.array([ACTIVITIES.index(athlete['current_activity']) for athlete in legacy])
+    print(f"{'activity shares':<18} legacy {np.bincount(old_activity, minlength=4) / athletes}, "
+          f"vector {np.bincount(population.activity[:n], minlength=4) / n}")
+    print(f"{'sleeping':<18} legacy {np.mean([athlete['is_sleeping'] for athlete in legacy]):.3f}, "
+          f"vector {population.is_sleeping[:n].mean():.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--athletes', type=int, default=100000)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--legacy-athletes', type=int, default=2000)
+    parser.add_argument('--compare-athletes', type=int, default=2000)
+    parser.add_argument('--compare-ticks', type=int, default=600)
+    args = parser.parse_args()
+
+    steps, payloads = time_vectorized(args.athletes, args.ticks)
+    legacy = time_legacy(args.legacy_athletes, args.ticks)
+    print(f"{'engine':<28} {'athletes':>9} {'p50 ms':>9} {'max ms':>9} {'athletes/s':>12}")
+    print(f"{'vectorized step':<28} {args.athletes:>9} {np.median(steps):>9.1f} {steps.max():>9.1f} "
+          f"{args.athletes / np.median(steps) * 1000:>12.0f}")
+    print(f"{'vectorized step + payloads':<28} {args.athletes:>9} {np.median(steps + payloads):>9.1f} "
+          f"{(steps + payloads).max():>9.1f} {args.athletes / np.median(steps + payloads) * 1000:>12.0f}")
+    print(f"{'per-athlete loop':<28} {args.legacy_athletes:>9} {np.median(legacy):>9.1f} {legacy.max():>9.1f} "
+          f"{args.legacy_athletes / np.median(legacy) * 1000:>12.0f}")
+    budget = 'within' if steps.max() < 1000 else 'OVER'
+    print(f"Slowest vectorized step for {args.athletes} athletes: {steps.max():.1f} ms ({budget} the 1 s tick)")
+
+    today = datetime.now().replace(minute=0, second=0, microsecond=0)
+    for hour in (12, 22):
+        compare(args.compare_athletes, args.compare_ticks, today.replace(hour=hour).timestamp())
+    # Everyone asleep since 22:30 and waking from 06:00 on; sleep_hours only changes on waking
+    wake_window = today.replace(hour=6).timestamp()
+    compare(args.compare_athletes, args.compare_ticks, wake_window, asleep_since=wake_window - 7.5 * 3600)
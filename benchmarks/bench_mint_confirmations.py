@@ -0,0 +1,160 @@
+"""Exercise mint confirmation against a dev chain: batched receipt polling, retries after a timeout and nonce resync.
+
+Runs against Ganache (after `truffle migrate`, configured through the same
+BLOCKCHAIN_* variables as the app) or, with --tester, against an in-process
+EthereumTesterProvider that deploys the compiled Truffle artifact. Checks
+that:
+  - confirm_mints() resolves every mint with one round trip per poll
+  - mint_certificate() keeps waiting on the same transaction when its first
+    confirmation times out, so a slow block never mints twice
+  - a confirmation timeout resyncs a nonce counter that ran ahead of the node
+
+Usage: python benchmarks/bench_mint_confirmations.py [--rpc-url http://127.0.0.1:7545 | --tester] [--mints 20]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web3 import EthereumTesterProvider, Web3
+
+from blockchain_service import BlockchainService
+from utils.rpc_batch import JSONRPCBatch
+
+
+class BatchCounter:
+    """Counts JSON-RPC batches sent (one HTTP round trip each) and the requests they carried"""
+
+    def __init__(self):
+        self.batches = 0
+        self.requests = 0
+        send = JSONRPCBatch._send
+
+        def counted_send(batch, chunk):
+            self.batches += 1
+            self.requests += len(chunk)
+            return send(batch, chunk)
+
+        JSONRPCBatch._send = counted_send
+
+
+def tester_service(artifact_path):
+    """A BlockchainService on EthereumTesterProvider with the contract freshly deployed by its account"""
+    with open(artifact_path) as f:
+        artifact = json.load(f)
+    service = BlockchainService()
+    service.w3 = Web3(EthereumTesterProvider())
+    service.w3.eth.default_account = service.account.address
+    funder = service.w3.eth.accounts[0]
+    service.w3.eth.wait_for_transaction_receipt(service.w3.eth.send_transaction(
+        {'from': funder, 'to': service.account.address, 'value': 10 ** 20}))
+
+    # Deploy from the service account, which the contract makes its owner
+    factory = service.w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+    tx = factory.constructor().build_transaction({
+        'from': service.account.address,
+        'nonce': service.w3.eth.get_transaction_count(service.account.address)
+    })
+    signed = service.w3.eth.account.sign_transaction(tx, private_key=service.private_key)
+    receipt = service.w3.eth.wait_for_transaction_receipt(service.w3.eth.send_raw_transaction(signed.rawTransaction))
+    service.contract_path = artifact_path
+    service.contract_address = receipt['contractAddress']
+    service._healthy.set()
+    return service
+
+
+def delay_sends(service, seconds):
+    """Hold raw transactions back for seconds, as a slow block would, while returning their hash at once"""
+    send = service.w3.eth.send_raw_transaction
+
+    def delayed(raw_transaction):
+        threading.Timer(seconds, send, args=(raw_transaction,)).start()
+        return Web3.keccak(raw_transaction)
+
+    service.w3.eth.send_raw_transaction = delayed
+    return lambda: setattr(service.w3.eth, 'send_raw_transaction', send)
+
+
+def minted_to(service, recipient, from_block):
+    """Token ids minted to recipient since from_block, read from the Transfer logs"""
+    events = service.contract.events.Transfer.get_logs(
+        fromBlock=from_block, toBlock='latest',
+        argument_filters={'from': '0x' + '00' * 20, 'to': recipient}
+    )
+    return [event['args']['tokenId'] for event in events]
+
+
+def check_batched(service, recipient, mints):
+    tx_hashes = [service.submit_mint(recipient, f'Confirmation Quiz {i}', 90) for i in range(mints)]
+    counter = BatchCounter()
+    start = time.perf_counter()
+    results = service.confirm_mints(tx_hashes, timeout=60, poll_interval=0.2)
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results.values() if isinstance(result, Exception)]
+    token_ids = {result for result in results.values() if not isinstance(result, Exception)}
+    print(f"confirm_mints: {mints} mints, {len(token_ids)} distinct token ids, {len(failed)} failed, "
+          f"{counter.requests} receipt requests in {counter.batches} batches, {elapsed:.3f}s")
+    assert not failed and len(token_ids) == mints, results
+
+
+def check_retry_after_timeout(service, recipient):
+    from_block = service.w3.eth.block_number + 1
+    outcome = {}
+    # The transaction reaches the node only after the first attempt has timed out
+    restore = delay_sends(service, 1.5)
+    try:
+        outcome['token_id'] = service.mint_certificate(recipient, 'Slow Block Quiz', 75, timeout=1)
+    except Exception as e:
+        outcome['error'] = e
+    finally:
+        restore()
+
+    minted = minted_to(service, recipient, from_block)
+    print(f"mint_certificate after a timeout: result {outcome}, tokens minted {minted}")
+    assert 'token_id' in outcome and len(minted) == 1, (outcome, minted)
+
+
+def check_nonce_resync(service, recipient):
+    # A counter ahead of the node, as if the node had dropped three sends
+    with service.nonces.reserve():
+        pass
+    service.nonces._next += 3
+    never_sent = '0x' + '11' * 32
+    result = service.confirm_mints([never_sent], timeout=0)[never_sent]
+    resynced = service.nonces._next is None
+    token_id = service.mint_certificate(recipient, 'Resync Quiz', 80, timeout=30)
+    print(f"nonce resync: {type(result).__name__} then counter reset={resynced}, next mint token {token_id}")
+    assert isinstance(result, TimeoutError) and resynced, result
+
+
+def run(rpc_url, tester, artifact, mints):
+    os.environ['BLOCKCHAIN_NETWORK_URL'] = rpc_url
+    # Keep the harness's ledger away from the app's
+    os.environ['BLOCKCHAIN_LEDGER_PATH'] = os.path.join(tempfile.mkdtemp(), 'ledger.db')
+    if tester:
+        service = tester_service(artifact or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'blockchain', 'build', 'contracts', 'AntidopingCertificate.json'))
+    else:
+        service = BlockchainService()
+    recipient = service.w3.to_checksum_address(service.account.address)
+
+    check_batched(service, recipient, mints)
+    check_retry_after_timeout(service, recipient)
+    check_nonce_resync(service, recipient)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rpc-url', default=os.getenv('BLOCKCHAIN_NETWORK_URL', 'http://127.0.0.1:7545'))
+    parser.add_argument('--tester', action='store_true', help='use an in-process EthereumTesterProvider')
+    parser.add_argument('--artifact', help='compiled Truffle artifact to deploy with --tester')
+    parser.add_argument('--mints', type=int, default=20)
+    args = parser.parse_args()
+    run(args.rpc_url, args.tester, args.artifact, args.mints)
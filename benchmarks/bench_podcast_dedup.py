@@ -0,0 +1,80 @@
+"""Benchmark podcast deduplication: the old any() scan against PodcastMerger.
+
+Usage: python benchmarks/bench_podcast_dedup.py [--sizes 10000 50000 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.podcast_dedup import PodcastMerger
+
+# The quadratic baseline is only timed up to this size; beyond it a run takes minutes
+BASELINE_LIMIT = 20000
+
+
+def make_catalog(size, duplicate_ratio=0.3, seed=42):
+    """Synthetic catalog where a share of items reappear on another platform or with tracking params"""
+    rng = random.Random(seed)
+    unique = int(size * (1 - duplicate_ratio))
+    items = []
+    for i in range(unique):
+        items.append({
+            'title': f"Clean sport conversations episode {i} with guest {rng.randint(0, 10**6)}",
+            'author': f"Publisher {i % 500}",
+            'source_url': f"https://open.spotify.com/episode/{i:012d}",
+            'source_type': 'spotify'
+        })
+    for _ in range(size - unique):
+        original = items[rng.randrange(unique)]
+        if rng.random() < 0.5:
+            # Same listing with tracking parameters
+            duplicate = dict(original, source_url=original['source_url'] + '?si=abc&utm_source=share')
+        else:
+            # Same episode on another platform
+            duplicate = dict(original, source_url=f"https://podcasts.apple.com/podcast/id{rng.randint(0, 10**9)}",
+                             source_type='itunes', title=original['title'].upper() + ' | Podcast')
+        items.append(duplicate)
+    rng.shuffle(items)
+    return items
+
+
+def dedup_any_scan(items):
+    """The previous approach used in every PodcastFetcher method"""
+    podcasts = []
+    for podcast in items:
+        if not any(p['source_url'] == podcast['source_url'] for p in podcasts):
+            podcasts.append(podcast)
+    return podcasts
+
+
+def dedup_merger(items):
+    return PodcastMerger().extend(items).items()
+
+
+def time_it(fn, items):
+    start = time.perf_counter()
+    result = fn(items)
+    return time.perf_counter() - start, len(result)
+
+
+def run(sizes):
+    print(f"{'items':>8} {'any() scan':>14} {'merger':>10} {'unique (scan)':>14} {'unique (merger)':>16}")
+    for size in sizes:
+        items = make_catalog(size)
+        merger_time, merger_count = time_it(dedup_merger, items)
+        if size <= BASELINE_LIMIT:
+            scan_time, scan_count = time_it(dedup_any_scan, items)
+            scan = f"{scan_time:12.3f}s"
+        else:
+            scan, scan_count = f"{'skipped':>13}", '-'
+        print(f"{size:>8} {scan:>14} {merger_time:9.3f}s {scan_count:>14} {merger_count:>16}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000])
+    run(parser.parse_args().sizes)
@@ -0,0 +1,98 @@
+"""Benchmark supplement classification: per-row predict + predict_proba against one batched predict_proba.
+
+Uses the same RandomForestClassifier setup as app.train_supplement_classifier, or a
+saved model with --model.
+
+Usage: python benchmarks/bench_supplement_classifier.py [--rows 500] [--model models/supplement_safety_model.joblib]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.batch_classify import classify_batch
+
+
+def default_classifier():
+    """Same training data as app.train_supplement_classifier"""
+    classifier = RandomForestClassifier(n_estimators=100, random_state=0)
+    X_supp = np.array([
+        [80, 0, 0, 0],  # Whey Protein
+        [0, 5, 0, 1],   # Pre-workout
+        [0, 0, 90, 1],  # Anabolic steroid
+        [20, 0, 0, 0],  # BCAA
+    ])
+    y_supp = np.array(['safe', 'caution', 'prohibited', 'safe'])
+    return classifier.fit(X_supp, y_supp)
+
+
+def random_rows(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0, 100, count),
+        rng.uniform(0, 100, count),
+        rng.uniform(0, 100, count),
+        rng.integers(0, 2, count)
+    ]).tolist()
+
+
+def per_row_legacy(classifier, rows):
+    """The previous /api/supplements/analyze: predict then predict_proba, one row per request"""
+    results = []
+    for row in rows:
+        X = np.array([row])
+        prediction = classifier.predict(X)[0]
+        proba = classifier.predict_proba(X)[0]
+        results.append((prediction, float(max(proba))))
+    return results
+
+
+def per_row_single(classifier, rows):
+    """One predict_proba per row (the current single-item path)"""
+    return [classify_batch(classifier, [row])[0] for row in rows]
+
+
+def batched(classifier, rows):
+    return classify_batch(classifier, rows)
+
+
+def run(rows, model_path=None, repeat=3):
+    if model_path:
+        import joblib
+        classifier = joblib.load(model_path)
+    else:
+        classifier = default_classifier()
+
+    data = random_rows(rows)
+    legacy = per_row_legacy(classifier, data)
+    batch = batched(classifier, data)
+    mismatches = sum(1 for (label, confidence), result in zip(legacy, batch)
+                     if label != result['prediction'] or abs(confidence - result['confidence']) > 1e-12)
+    print(f"{rows} rows, {classifier.n_estimators} trees, mismatches between paths: {mismatches}")
+
+    print(f"{'path':<32} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+    baseline = None
+    for name, fn in (('per-row predict + predict_proba', per_row_legacy),
+                     ('per-row predict_proba', per_row_single),
+                     ('batched predict_proba', batched)):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(classifier, data)
+            best = min(best, time.perf_counter() - start)
+        baseline = baseline or best
+        print(f"{name:<32} {best:>8.3f}s {rows / best:>12.0f} {baseline / best:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--model', help='joblib file to load instead of training the default classifier')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.model, args.repeat)
@@ -0,0 +1,101 @@
+"""Benchmark the telemetry archive: ingest rate for a simulated population and query latency.
+
+Runs FitnessSimulator with a TelemetryArchive in a temporary directory for
+--minutes simulated minutes of 1 Hz ticks with --athletes athletes, as
+fast as it can, and reports the tick cost the archive adds, the writer
+thread's throughput and disk use. Real time has to stay below simulated
+time for the archive to keep up at 1 Hz. Then times raw, rollup and
+summary queries for single athletes against the files just written.
+
+Usage: python benchmarks/bench_telemetry_archive.py [--athletes 10000] [--minutes 10] [--dir /tmp/archive]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from flask import Flask
+from flask_socketio import SocketIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator import FitnessSimulator
+from utils.telemetry_archive import TelemetryArchive
+
+
+def disk_usage(root):
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(root) for name in names)
+
+
+def ingest(root, athletes, minutes):
+    socketio = SocketIO(Flask(__name__))
+    archive = TelemetryArchive(root)
+    archive.start()
+    simulator = FitnessSimulator(socketio, seed=0, archive=archive)
+    # Start on a minute boundary so every flush holds whole minutes
+    start = (time.time() // 60 - minutes - 1) * 60
+    for i in range(athletes):
+        simulator.population.add(f"athlete-{i}", now=start)
+
+    durations = []
+    begin = time.perf_counter()
+    for tick in range(1, minutes * 60 + 1):
+        started = time.perf_counter()
+        simulator.tick(start + tick)
+        durations.append(time.perf_counter() - started)
+    ticking = time.perf_counter() - begin
+    archive.flush()
+    elapsed = time.perf_counter() - begin
+    return archive, start, np.array(durations) * 1000, ticking, elapsed
+
+
+def time_query(fn, repeat=20):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    return np.median(durations) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--athletes', type=int, default=10000)
+    parser.add_argument('--minutes', type=int, default=10)
+    parser.add_argument('--dir', default=None, help='archive directory (default: a temporary one, removed after)')
+    args = parser.parse_args()
+
+    root = args.dir or tempfile.mkdtemp(prefix='telemetry_archive_')
+    try:
+        archive, start, ticks, ticking, elapsed = ingest(root, args.athletes, args.minutes)
+        simulated = args.minutes * 60
+        samples = args.athletes * simulated
+        stats = archive.stats()
+        print(f"{args.athletes} athletes, {simulated} simulated seconds at 1 Hz ({samples} samples)")
+        print(f"tick incl. archive: p50 {np.median(ticks):.1f} ms, p99 {np.percentile(ticks, 99):.1f} ms, "
+              f"max {ticks.max():.1f} ms")
+        print(f"wall time: {ticking:.1f} s ticking, {elapsed:.1f} s until written "
+              f"({samples / elapsed:,.0f} samples/s, {simulated / elapsed:.1f}x real time)")
+        print(f"writer: {stats['files_written']} file appends, {stats['bytes_written'] / 2 ** 20:.1f} MB, "
+              f"{stats['write_errors']} errors; on disk {disk_usage(root) / 2 ** 20:.1f} MB")
+        verdict = 'keeps up with' if elapsed < simulated else 'FALLS BEHIND'
+        print(f"The archive {verdict} {args.athletes} athletes at 1 Hz")
+
+        end = start + simulated + 1
+        athlete = f"athlete-{args.athletes // 2}"
+        print(f"\n{'query (one athlete)':<40} {'p50 ms':>8}")
+        for label, fn in (
+            (f'raw, {args.minutes} min', lambda: archive.samples(athlete, start, end)),
+            ('raw, 1 min', lambda: archive.samples(athlete, end - 60, end)),
+            ('minute rollups, JSON', lambda: archive.query(athlete, start, end, 'minute')),
+            ('hour rollups, JSON', lambda: archive.query(athlete, start, end, 'hour')),
+            ('summary, unaligned range', lambda: archive.summary(athlete, start + 17.5, end - 23.5)),
+            ('summary, last 30 days', lambda: archive.summary(athlete, end - 30 * 86400, end)),
+        ):
+            print(f"{label:<40} {time_query(fn):>8.2f}")
+    finally:
+        if not args.dir:
+            shutil.rmtree(root, ignore_errors=True)
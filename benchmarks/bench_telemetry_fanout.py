@@ -0,0 +1,100 @@
+"""Benchmark telemetry fan-out: server time and bytes per tick against how much is watched.
+
+Simulates --athletes athletes and, for each watcher setup, subscribes Socket.IO
+test clients (one per watched athlete, plus one client watching a team of
+--team-size) and measures FitnessSimulator.tick() plus sending. It reports
+the JSON bytes of the frames actually emitted per tick. For comparison, the
+previous fan-out built and emitted one full athlete_update per athlete per
+tick to everyone.
+
+Usage: python benchmarks/bench_telemetry_fanout.py [--athletes 100000] [--ticks 10] [--max-rate 1]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from flask import Flask, request
+from flask_socketio import SocketIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator import FitnessSimulator
+from utils.telemetry_fanout import TelemetryFanout
+
+
+def build(athletes, team_size, max_rate, start):
+    app = Flask(__name__)
+    socketio = SocketIO(app)
+    fanout = TelemetryFanout(socketio, max_rate=max_rate)
+    simulator = FitnessSimulator(socketio, seed=0, fanout=fanout)
+
+    @socketio.on('watch_athletes')
+    def watch(data):
+        return {'rooms': fanout.subscribe(request.sid, athletes=data.get('athletes') or [],
+                                          teams=data.get('teams') or [])}
+
+    for i in range(athletes):
+        simulator.population.add(f"athlete-{i}", now=start, team='squad' if i < team_size else None)
+    return app, socketio, simulator
+
+
+def run_setup(athletes, watched, team_size, ticks, max_rate):
+    start = time.time()
+    app, socketio, simulator = build(athletes, team_size, max_rate, start)
+    clients = []
+    for i in range(watched):
+        client = socketio.test_client(app)
+        client.emit('watch_athletes', {'athletes': [f"athlete-{i * (athletes // max(watched, 1))}"]})
+        clients.append(client)
+    if team_size:
+        client = socketio.test_client(app)
+        client.emit('watch_athletes', {'teams': ['squad']})
+        clients.append(client)
+
+    durations, sent = [], []
+    for tick in range(1, ticks + 1):
+        begin = time.perf_counter()
+        frames = simulator.tick(start + tick)
+        simulator.fanout.send(frames)
+        durations.append(time.perf_counter() - begin)
+        sent.append(sum(len(json.dumps(payload)) for payload, _ in frames))
+        for client in clients:
+            client.get_received()
+    # First tick includes the initial full frames
+    return np.array(durations[1:]) * 1000, np.array(sent[1:])
+
+
+def run_legacy(athletes, ticks):
+    start = time.time()
+    _, _, simulator = build(athletes, 0, 1.0, start)
+    durations, sent = [], []
+    for tick in range(1, ticks + 1):
+        begin = time.perf_counter()
+        simulator.population.step(start + tick)
+        payloads = simulator.population.payloads()
+        sent.append(sum(len(json.dumps({'athlete_id': athlete_id, 'data': data})) for athlete_id, data in payloads))
+        durations.append(time.perf_counter() - begin)
+    return np.array(durations[1:]) * 1000, np.array(sent[1:])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--athletes', type=int, default=100000)
+    parser.add_argument('--ticks', type=int, default=10)
+    parser.add_argument('--max-rate', type=float, default=1.0, help='frames per second per room')
+    args = parser.parse_args()
+
+    print(f"{args.athletes} athletes, {args.ticks} ticks, max {args.max_rate} frames/s per room")
+    print(f"{'setup':<36} {'tick p50 ms':>12} {'tick max ms':>12} {'KB/tick':>10}")
+    for label, watched, team_size in (('nobody watching', 0, 0),
+                                      ('10 athlete watchers', 10, 0),
+                                      ('1000 athlete watchers', 1000, 0),
+                                      ('1 team of 500', 0, 500)):
+        durations, sent = run_setup(args.athletes, watched, team_size, args.ticks, args.max_rate)
+        print(f"{label:<36} {np.median(durations):>12.1f} {durations.max():>12.1f} {sent.mean() / 1024:>10.1f}")
+    durations, sent = run_legacy(args.athletes, args.ticks)
+    print(f"{'previous: full update per athlete':<36} {np.median(durations):>12.1f} {durations.max():>12.1f} "
+          f"{sent.mean() / 1024:>10.1f}  (payloads only, before emitting)")
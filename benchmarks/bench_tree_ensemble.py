@@ -0,0 +1,117 @@
+"""Parity and speed of compiled tree-ensemble scoring against scikit-learn.
+
+For the supplement classifier (RandomForestClassifier) and the performance
+predictor (GradientBoostingRegressor), trained like app.train_supplement_classifier
+and app.train_performance_predictor, or on --train-rows synthetic rows for
+deeper trees, this checks that utils.tree_ensemble produces bit-identical
+outputs on --rows random rows, then times single-row latency, --batch row
+batches and bulk throughput of both paths. Exits non-zero on any mismatch.
+
+Usage: python benchmarks/bench_tree_ensemble.py [--rows 100000] [--single 200] [--batch 64] [--train-rows 0]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.tree_ensemble import BULK_ROWS, compile_ensemble
+
+
+def app_models(train_rows, seed=0):
+    classifier = RandomForestClassifier(n_estimators=100, random_state=seed)
+    regressor = GradientBoostingRegressor(n_estimators=100, random_state=seed)
+    if not train_rows:
+        classifier.fit(np.array([[80, 0, 0, 0], [0, 5, 0, 1], [0, 0, 90, 1], [20, 0, 0, 0]]),
+                       np.array(['safe', 'caution', 'prohibited', 'safe']))
+        regressor.fit(np.array([[8, 7, 3, 90], [6, 8, 6, 70], [7, 6, 4, 85], [5, 9, 8, 60]]),
+                      np.array([95, 75, 85, 65]))
+        return classifier, regressor
+
+    rng = np.random.default_rng(seed)
+    X = random_rows(train_rows, seed)
+    score = X[:, 0] - X[:, 1] + 2 * X[:, 2] + rng.normal(0, 10, train_rows)
+    labels = np.where(score > 120, 'prohibited', np.where(score > 60, 'caution', 'safe'))
+    classifier.fit(X, labels)
+    regressor.fit(X, score)
+    return classifier, regressor
+
+
+def random_rows(count, seed=1):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0, 100, count),
+        rng.uniform(0, 100, count),
+        rng.uniform(0, 100, count),
+        rng.integers(0, 2, count)
+    ])
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def single_row_us(fn, rows):
+    latencies = []
+    for row in rows:
+        X = row.reshape(1, -1)
+        start = time.perf_counter()
+        fn(X)
+        latencies.append(time.perf_counter() - start)
+    ms = np.array(latencies) * 1e6
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def batch_us(fn, data, batch, repeat):
+    """Best time to score data in consecutive batches, in microseconds per batch"""
+    batches = [data[i:i + batch] for i in range(0, min(len(data), batch * 50), batch)]
+    return best_of(lambda: [fn(X) for X in batches], repeat) / len(batches) * 1e6
+
+
+def run(rows, single, batch, train_rows, repeat):
+    classifier, regressor = app_models(train_rows)
+    data = random_rows(rows)
+    failures = 0
+
+    print(f"{rows} rows, trained on {train_rows or 4} rows, batches of {batch}")
+    print(f"{'model':<36} {'path':<10} {'p50 us':>8} {'p99 us':>8} {'batch us':>9} {'bulk rows/s':>12} {'speedup':>8}  parity")
+    for name, model, method in (('RandomForestClassifier', classifier, 'predict_proba'),
+                                ('GradientBoostingRegressor', regressor, 'predict')):
+        # bulk_rows=None times the compiled traversal itself, never the sklearn hand-off
+        compiled = compile_ensemble(model, bulk_rows=None)
+        identical = all(np.array_equal(getattr(model, method)(X), getattr(compiled, method)(X))
+                        for X in (data, data[:batch], data[:1]))
+        failures += not identical
+        label = f"{name} (depth {compiled.trees.max_depth})"
+
+        baseline = None
+        for path, scorer in (('sklearn', model), ('compiled', compiled), ('default', compile_ensemble(model))):
+            fn = getattr(scorer, method)
+            p50, p99 = single_row_us(fn, data[:single])
+            seconds = best_of(lambda: fn(data), repeat)
+            baseline = baseline or seconds
+            parity = '' if path == 'sklearn' else ('identical' if identical else 'MISMATCH')
+            print(f"{label:<36} {path:<10} {p50:>8.0f} {p99:>8.0f} {batch_us(fn, data, batch, repeat):>9.0f} "
+                  f"{rows / seconds:>12.0f} {baseline / seconds:>7.1f}x  {parity}")
+    print(f"'default' is compile_ensemble's scorer, which hands batches of {BULK_ROWS}+ rows to sklearn")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--single', type=int, default=200, help='rows scored one at a time for latency')
+    parser.add_argument('--batch', type=int, default=64, help='rows per batch, as sent by the micro-batcher')
+    parser.add_argument('--train-rows', type=int, default=0, help='synthetic training rows (0 = the app data)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    sys.exit(1 if run(args.rows, args.single, args.batch, args.train_rows, args.repeat) else 0)
@@ -0,0 +1,116 @@
+"""Load test for performance prediction: throughput and latency percentiles under concurrent callers.
+
+In-process (default), each of --threads callers loops for --duration seconds,
+once calling performance_predictor.predict directly per request and once going
+through MicroBatcher. The model is the same GradientBoostingRegressor setup as
+app.train_performance_predictor. With --url, the same load is sent over HTTP to
+/api/athlete/analyze-performance of a running app instead.
+
+Usage: python benchmarks/load_performance_predictor.py [--threads 32] [--duration 5] [--url http://127.0.0.1:5000]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.micro_batcher import MicroBatcher
+
+
+def default_predictor():
+    """Same training data as app.train_performance_predictor"""
+    predictor = GradientBoostingRegressor(n_estimators=100, random_state=0)
+    X_perf = np.array([
+        [8, 7, 3, 90],
+        [6, 8, 6, 70],
+        [7, 6, 4, 85],
+        [5, 9, 8, 60],
+    ])
+    y_perf = np.array([95, 75, 85, 65])
+    return predictor.fit(X_perf, y_perf)
+
+
+def random_row(rng):
+    return [rng.uniform(4, 10), rng.uniform(0, 10), rng.uniform(0, 10), rng.uniform(40, 100)]
+
+
+def drive(call, threads, duration):
+    """Run call(row) from `threads` threads for `duration` seconds; returns per-request latencies"""
+    latencies = [[] for _ in range(threads)]
+    stop = time.monotonic() + duration
+    barrier = threading.Barrier(threads)
+
+    def worker(slot):
+        rng = random.Random(slot)
+        barrier.wait()
+        while time.monotonic() < stop:
+            row = random_row(rng)
+            start = time.perf_counter()
+            call(row)
+            latencies[slot].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return [latency for slot in latencies for latency in slot]
+
+
+def report(name, latencies, duration, extra=''):
+    ms = np.array(latencies) * 1000
+    print(f"{name:<22} {len(ms) / duration:>10.0f} {np.percentile(ms, 50):>9.2f} {np.percentile(ms, 99):>9.2f} "
+          f"{ms.max():>9.2f}  {extra}")
+
+
+def run_in_process(threads, duration, max_batch, max_wait, idle_wait):
+    predictor = default_predictor()
+    batcher = MicroBatcher(predictor.predict, max_batch=max_batch, max_wait=max_wait, idle_wait=idle_wait)
+
+    print(f"{threads} threads, {duration}s per run, max_batch={max_batch}, max_wait={max_wait * 1000:.1f}ms, "
+          f"idle_wait={idle_wait * 1000:.1f}ms")
+    print(f"{'path':<22} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    report('direct predict', drive(lambda row: predictor.predict(np.array([row]))[0], threads, duration), duration)
+    latencies = drive(batcher.predict, threads, duration)
+    stats = batcher.stats()
+    report('micro-batched', latencies, duration, f"mean batch {stats['mean_batch_size']}, largest {stats['largest_batch']}")
+
+
+def run_http(url, threads, duration):
+    import requests
+
+    local = threading.local()
+
+    def call(row):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.post(f"{url.rstrip('/')}/api/athlete/analyze-performance", json={
+            'sleep_hours': row[0], 'training_intensity': row[1], 'stress_level': row[2], 'recovery_score': row[3]
+        }, timeout=30)
+        response.raise_for_status()
+
+    print(f"{threads} threads, {duration}s against {url}")
+    print(f"{'path':<22} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    report('HTTP', drive(call, threads, duration), duration)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait', type=float, default=0.005, help='seconds a batch waits to fill')
+    parser.add_argument('--idle-wait', type=float, default=0.0005, help='seconds without arrivals that close a batch')
+    parser.add_argument('--url', help='base URL of a running app to load over HTTP instead')
+    args = parser.parse_args()
+    if args.url:
+        run_http(args.url, args.threads, args.duration)
+    else:
+        run_in_process(args.threads, args.duration, args.max_batch, args.max_wait, args.idle_wait)
@@ -1,14 +1,86 @@
 from web3 import Web3
 import json
 import os
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
 from eth_account import Account
-from typing import Optional
+from hexbytes import HexBytes
+from typing import List, Optional
+import threading
 import time
+import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from web3.exceptions import TransactionNotFound
+from web3.logs import DISCARD
+
+from utils.certificate_ledger import CertificateLedger
+from utils.confirmation_tracker import ConfirmationTracker
+from utils.rpc_batch import JSONRPCBatch
+
+
+class TransactionReplaced(Exception):
+    """A mint that can never be mined because another transaction took its nonce"""
+
+
+class NonceManager:
+    """Hands out sequential nonces for one account without asking the node each time.
+
+    The first reservation reads the pending transaction count; later ones
+    count up locally. The lock is held while the caller signs and sends,
+    so transactions reach the node in nonce order even from many threads.
+    A send that fails drops the local counter and the next reservation
+    resyncs from the node. So does resync() when the node's mined count
+    disagrees with the counter, e.g. after a confirmation timed out because
+    the node dropped a transaction and left a gap that would stall every
+    later nonce.
+    """
+
+    def __init__(self, w3, address):
+        self.w3 = w3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next = None
+
+    @contextmanager
+    def reserve(self):
+        with self._lock:
+            if self._next is None:
+                self._next = self.w3.eth.get_transaction_count(self.address, 'pending')
+            try:
+                yield self._next
+            except Exception:
+                self._next = None
+                raise
+            self._next += 1
+
+    def reset(self):
+        with self._lock:
+            self._next = None
+
+    def resync(self):
+        """Drop the local counter if the node's latest transaction count has moved away from it"""
+        with self._lock:
+            if self._next is None:
+                return
+            latest = self.w3.eth.get_transaction_count(self.address, 'latest')
+            if latest != self._next:
+                self._next = None
+
 
 class BlockchainService:
-    def __init__(self):
+    """Client for the certificate contract.
+
+    Construction only reads configuration; nothing touches the network or
+    the Truffle artifact. The artifact, contract, nonce manager and ledger
+    are loaded on first use. A background probe tracks node health,
+    retrying with exponential backoff while the node is down, and a call
+    that needs the node waits for it for at most connect_timeout seconds.
+    All RPC traffic goes through one pooled HTTP session.
+    """
+
+    def __init__(self, connect_timeout: float = 10, probe_interval: float = 30, max_backoff: float = 60):
         try:
             # Load environment variables
             load_dotenv()
@@ -17,18 +89,110 @@ class BlockchainService:
             self.network_url = os.getenv('BLOCKCHAIN_NETWORK_URL', 'http://127.0.0.1:7545')
             self.private_key = os.getenv('BLOCKCHAIN_PRIVATE_KEY', '0x54cd5a0f68b87c1c828e2a872dc1f0e199ae902cf93f30948bda55bf5e5dd24c')
             self.contract_address = os.getenv('BLOCKCHAIN_CONTRACT_ADDRESS')
+            self.contract_path = os.path.join(os.path.dirname(__file__), 'blockchain', 'build', 'contracts', 'AntidopingCertificate.json')
+            self.connect_timeout = connect_timeout
+            self.probe_interval = probe_interval
+            self.max_backoff = max_backoff
+            
+            # One pooled session for every RPC call, single and batched
+            self.rpc_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+            self.rpc_session.mount('http://', adapter)
+            self.rpc_session.mount('https://', adapter)
+            self.w3 = Web3(Web3.HTTPProvider(self.network_url, session=self.rpc_session, request_kwargs={'timeout': 30}))
+            
+            # Set up account with private key
+            self.account = Account.from_key(self.private_key)
+            self.w3.eth.default_account = self.account.address
             
-            # Connect to blockchain network
-            self.w3 = Web3(Web3.HTTPProvider(self.network_url))
-            if not self.w3.is_connected():
-                raise Exception(f"Failed to connect to Ethereum network at {self.network_url}")
+            self._load_lock = threading.Lock()
+            self._contract = None
+            self._nonces = None
+            self._ledger = None
+            self._gas_estimates = {}
+            # Nonce of every mint sent by this process and not confirmed yet
+            self._sent_nonces = {}
+            
+            # Confirmations for submitted mints are resolved from one asyncio loop
+            self.tracker = ConfirmationTracker(self.network_url, ws_url=os.getenv('BLOCKCHAIN_WS_URL'))
+            
+            self._healthy = threading.Event()
+            self._wake = threading.Event()
+            self._probe = None
+            self._pid = None
+            self.last_error = None
+            
+        except Exception as e:
+            print(f"Error initializing blockchain service: {str(e)}")
+            raise
+
+    def start(self):
+        """Start the health probe for the current process"""
+        # Threads do not survive a fork, so every gunicorn worker needs its own probe
+        if self._probe and self._probe.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._probe = threading.Thread(target=self._probe_loop, name='blockchain-health-probe')
+        self._probe.daemon = True
+        self._probe.start()
+
+    def is_configured(self) -> bool:
+        """True if a contract is configured, without loading it"""
+        return bool(self.contract_address) or os.path.exists(self.contract_path)
+
+    @property
+    def is_connected(self) -> bool:
+        return self._healthy.is_set()
+
+    def status(self) -> dict:
+        return {
+            'network_url': self.network_url,
+            'connected': self.is_connected,
+            'loaded': self._contract is not None,
+            'contract_address': self.contract_address,
+            'last_error': self.last_error
+        }
+
+    @property
+    def contract(self):
+        self._load()
+        return self._contract
+
+    @contract.setter
+    def contract(self, contract):
+        self._contract = contract
+
+    @property
+    def nonces(self):
+        self._load()
+        return self._nonces
+
+    @nonces.setter
+    def nonces(self, nonces):
+        self._nonces = nonces
+
+    @property
+    def ledger(self):
+        self._load()
+        return self._ledger
+
+    @ledger.setter
+    def ledger(self, ledger):
+        self._ledger = ledger
+
+    def _load(self):
+        """Load the contract artifact and build everything that depends on it (no network)"""
+        if self._contract is not None:
+            return
+        with self._load_lock:
+            if self._contract is not None:
+                return
             
             # Load contract ABI and address
-            contract_path = os.path.join(os.path.dirname(__file__), 'blockchain', 'build', 'contracts', 'AntidopingCertificate.json')
-            if not os.path.exists(contract_path):
-                raise Exception(f"Contract file not found at {contract_path}")
+            if not os.path.exists(self.contract_path):
+                raise Exception(f"Contract file not found at {self.contract_path}")
                 
-            with open(contract_path) as f:
+            with open(self.contract_path) as f:
                 contract_json = json.load(f)
                 self.contract_abi = contract_json['abi']
                 
@@ -43,93 +207,92 @@ class BlockchainService:
             print(f"Contract address: {self.contract_address}")
             
             # Initialize contract
-            self.contract = self.w3.eth.contract(
+            contract = self.w3.eth.contract(
                 address=self.w3.to_checksum_address(self.contract_address),
                 abi=self.contract_abi
             )
             
-            # Set up account with private key
-            self.account = Account.from_key(self.private_key)
-            self.w3.eth.default_account = self.account.address
+            # Nonces are handed out locally so concurrent and batched mints never collide
+            self._nonces = NonceManager(self.w3, self.account.address)
             
+            # Local index of certificate events, used for verification and listing
+            try:
+                self._ledger = CertificateLedger(
+                    self.w3,
+                    contract,
+                    db_path=os.getenv('BLOCKCHAIN_LEDGER_PATH', os.path.join(os.path.dirname(__file__), 'instance', 'certificate_ledger.db')),
+                    start_block=int(os.getenv('BLOCKCHAIN_LEDGER_START_BLOCK', '0')),
+                    confirmations=int(os.getenv('BLOCKCHAIN_LEDGER_CONFIRMATIONS', '0')),
+                    session=self.rpc_session
+                )
+            except Exception as e:
+                print(f"Certificate ledger unavailable, reading from chain: {str(e)}")
+                self._ledger = None
+            
+            self._contract = contract
             print(f"Blockchain service initialized with account: {self.account.address}")
+
+    def _require_node(self, timeout: Optional[float] = None):
+        """Block until the node is reachable, for at most connect_timeout seconds"""
+        if self._healthy.is_set():
+            return
+        self.start()
+        self._wake.set()
+        if not self._healthy.wait(self.connect_timeout if timeout is None else timeout):
+            raise ConnectionError(f"Ethereum node at {self.network_url} is unavailable: {self.last_error}")
+
+    def _probe_loop(self):
+        backoff = 1
+        while True:
+            try:
+                connected = self.w3.is_connected()
+                self.last_error = None if connected else 'not connected'
+            except Exception as e:
+                connected = False
+                self.last_error = str(e)
             
-        except Exception as e:
-            print(f"Error initializing blockchain service: {str(e)}")
-            raise
+            if connected:
+                if not self._healthy.is_set():
+                    print(f"Connected to Ethereum network at {self.network_url}")
+                self._healthy.set()
+                backoff = 1
+                delay = self.probe_interval
+            else:
+                if self._healthy.is_set():
+                    print(f"Lost connection to Ethereum network at {self.network_url}")
+                self._healthy.clear()
+                delay = backoff
+                backoff = min(backoff * 2, self.max_backoff)
+            
+            self._wake.wait(delay)
+            self._wake.clear()
 
-    def mint_certificate(self, recipient_address: str, quiz_title: str, score: int, ipfs_hash: Optional[str] = None) -> str:
+    def mint_certificate(self, recipient_address: str, quiz_title: str, score: int, ipfs_hash: Optional[str] = None,
+                         timeout: int = 120) -> str:
         max_retries = 3
         retry_delay = 2
+        # A transaction that timed out may still be mined, so later attempts keep
+        # waiting on it; only a send error or a failed transaction mints again
+        tx_hash = None
         
         for attempt in range(max_retries):
             try:
                 print(f"\n=== Minting Certificate (Attempt {attempt + 1}) ===")
                 print(f"Recipient: {recipient_address}")
-                date = datetime.now().strftime('%Y-%m-%d')
-                ipfs_hash = ipfs_hash or ''
-                
-                # Convert address to checksum format
-                recipient_address = self.w3.to_checksum_address(recipient_address)
-                
-                # Get optimized gas price (10% higher than base for faster confirmation)
-                gas_price = int(self.w3.eth.gas_price * 1.1)
-                
-                print(f"Gas Price: {gas_price}")
-                print(f"Sender Account: {self.account.address}")
-                
-                # Estimate gas with the actual parameters
-                try:
-                    estimated_gas = self.contract.functions.mintCertificate(
-                        recipient_address,
-                        quiz_title,
-                        score,
-                        date,
-                        ipfs_hash
-                    ).estimate_gas({'from': self.account.address})
-                    print(f"Estimated Gas: {estimated_gas}")
-                except Exception as e:
-                    print(f"Error estimating gas: {str(e)}")
-                    raise
-                
-                # Add 20% buffer to estimated gas
-                gas_limit = int(estimated_gas * 1.2)
-                
-                # Build transaction with optimized parameters
-                tx = self.contract.functions.mintCertificate(
-                    recipient_address,
-                    quiz_title,
-                    score,
-                    date,
-                    ipfs_hash
-                ).build_transaction({
-                    'from': self.account.address,
-                    'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                    'gas': gas_limit,
-                    'gasPrice': gas_price,
-                })
-                
-                print(f"Transaction built with gas limit: {gas_limit}")
-                
-                # Sign and send transaction
-                signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=self.private_key)
-                tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-                print(f"Transaction sent with hash: {self.w3.to_hex(tx_hash)}")
+                if tx_hash is None:
+                    tx_hash = self.submit_mint(recipient_address, quiz_title, score, ipfs_hash)
+                    print(f"Transaction sent with hash: {self.w3.to_hex(tx_hash)}")
+                else:
+                    print(f"Still waiting for transaction {self.w3.to_hex(tx_hash)}")
                 
                 # Wait for transaction receipt with timeout
-                receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-                print(f"Transaction confirmed in block {receipt['blockNumber']}")
-                
-                if receipt['status'] == 1:
-                    # Get the token ID from the event logs
-                    transfer_event = self.contract.events.Transfer().process_receipt(receipt)
-                    if transfer_event:
-                        token_id = transfer_event[0]['args']['tokenId']
-                        print(f"Certificate minted with token ID: {token_id}")
-                        return str(token_id)
-                    return self.w3.to_hex(tx_hash)
-                else:
-                    raise Exception("Transaction failed")
+                result = self.confirm_mints([tx_hash], timeout=timeout)[tx_hash]
+                if isinstance(result, Exception):
+                    if not isinstance(result, TimeoutError):
+                        tx_hash = None
+                    raise result
+                print(f"Certificate minted with token ID: {result}")
+                return result
                 
             except Exception as e:
                 if attempt < max_retries - 1:
@@ -140,100 +303,399 @@ class BlockchainService:
                 print(f"\nAll attempts failed. Last error: {str(e)}")
                 raise Exception(f"Failed to mint certificate after {max_retries} attempts: {str(e)}")
 
+    def mint_certificates(self, requests: List[dict], timeout: int = 600) -> List[dict]:
+        """Mint many certificates: submit every transaction, then collect the receipts together.
+
+        Each request is a dict with recipient_address, quiz_title, score and
+        optionally ipfs_hash. Returns one {'tx_hash', 'token_id', 'error'}
+        dict per request, in order.
+        """
+        gas_price = self._gas_price()
+        submitted = []
+        for request in requests:
+            try:
+                tx_hash = self.submit_mint(
+                    request['recipient_address'],
+                    request['quiz_title'],
+                    request['score'],
+                    request.get('ipfs_hash'),
+                    gas_price=gas_price
+                )
+                submitted.append((tx_hash, None))
+            except Exception as e:
+                submitted.append((None, e))
+
+        receipts = self.confirm_mints([tx_hash for tx_hash, _ in submitted if tx_hash], timeout=timeout)
+
+        results = []
+        for tx_hash, error in submitted:
+            outcome = receipts.get(tx_hash) if tx_hash else error
+            failed = isinstance(outcome, Exception)
+            results.append({
+                'tx_hash': self.w3.to_hex(tx_hash) if tx_hash else None,
+                'token_id': None if failed else outcome,
+                'error': str(outcome) if failed else None
+            })
+        return results
+
+    def submit_mint(self, recipient_address: str, quiz_title: str, score: int,
+                    ipfs_hash: Optional[str] = None, gas_price: Optional[int] = None):
+        """Sign and send a mintCertificate transaction without waiting for it; returns the tx hash"""
+        self._require_node()
+        date = datetime.now().strftime('%Y-%m-%d')
+        ipfs_hash = ipfs_hash or ''
+        
+        # Convert address to checksum format
+        recipient_address = self.w3.to_checksum_address(recipient_address)
+        call = self.contract.functions.mintCertificate(recipient_address, quiz_title, score, date, ipfs_hash)
+        
+        # Calls with the same shape cost the same gas, so one estimate serves them all
+        shape = ('mintCertificate', len(quiz_title.encode()) // 32, len(ipfs_hash.encode()) // 32)
+        estimated_gas = self._gas_estimates.get(shape)
+        if estimated_gas is None:
+            estimated_gas = call.estimate_gas({'from': self.account.address})
+            self._gas_estimates[shape] = estimated_gas
+        
+        # Add 20% buffer to estimated gas
+        tx_params = {
+            'from': self.account.address,
+            'gas': int(estimated_gas * 1.2),
+            'gasPrice': gas_price or self._gas_price(),
+        }
+        
+        with self.nonces.reserve() as nonce:
+            tx = call.build_transaction(dict(tx_params, nonce=nonce))
+            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=self.private_key)
+            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            self._sent_nonces[self.w3.to_hex(tx_hash)] = nonce
+            return tx_hash
+
+    def confirm_mints(self, tx_hashes: list, timeout: int = 120, poll_interval: float = 1.0) -> dict:
+        """Wait for many mint transactions at once.
+
+        Returns {tx_hash: token_id or Exception}. Each poll asks for every
+        pending receipt in one JSON-RPC batch, once per poll_interval,
+        instead of one round trip per transaction. If any transaction times
+        out the nonce counter is checked against the node, in case it
+        dropped one.
+        """
+        results = {}
+        pending = list(dict.fromkeys(tx_hashes))
+        deadline = time.monotonic() + timeout
+        while pending:
+            batch = JSONRPCBatch(self.w3, session=self.rpc_session)
+            for tx_hash in pending:
+                batch.add_receipt(tx_hash)
+            still_pending = []
+            for tx_hash, receipt in zip(pending, batch.execute()):
+                # An error for one receipt is retried with the next poll
+                if receipt is None or isinstance(receipt, Exception):
+                    still_pending.append(tx_hash)
+                else:
+                    results[tx_hash] = self._token_id_from_receipt(receipt, tx_hash)
+            pending = still_pending
+            if pending and time.monotonic() >= deadline:
+                for tx_hash in pending:
+                    results[tx_hash] = TimeoutError(f"Transaction {self.w3.to_hex(HexBytes(tx_hash))} not confirmed after {timeout}s")
+                self._resync_nonces()
+                break
+            if pending:
+                time.sleep(poll_interval)
+        return results
+
+    def track_mint(self, tx_hash, timeout: int = 600) -> Future:
+        """Future resolved with the token id once a submitted mint is confirmed, without blocking a thread"""
+        result = Future()
+        
+        def resolve(receipt_future):
+            try:
+                token_id = self._token_id_from_receipt(receipt_future.result(), tx_hash)
+            except TimeoutError as e:
+                # Checking the node blocks, so keep it off the tracker's event loop
+                threading.Thread(target=self._settle_timeout, args=(tx_hash, e, result), daemon=True).start()
+                return
+            except Exception as e:
+                token_id = e
+            if isinstance(token_id, Exception):
+                result.set_exception(token_id)
+            else:
+                result.set_result(token_id)
+        
+        self.tracker.track(tx_hash, timeout=timeout).add_done_callback(resolve)
+        return result
+
+    def _settle_timeout(self, tx_hash, error, result):
+        """Fail a timed-out track_mint() with TransactionReplaced if its nonce went elsewhere, else with the timeout"""
+        self._resync_nonces()
+        try:
+            if self.is_replaced(tx_hash):
+                error = TransactionReplaced(f"Transaction {tx_hash} was replaced; its nonce is used by another transaction")
+        except Exception as e:
+            print(f"Could not check whether {tx_hash} was replaced: {str(e)}")
+        result.set_exception(error)
+
+    def is_replaced(self, tx_hash) -> bool:
+        """True only if tx_hash can never be mined: it has no receipt and the account has mined past its nonce"""
+        tx_hash = self.w3.to_hex(HexBytes(tx_hash))
+        try:
+            transaction = self.w3.eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            transaction = None
+        if transaction is not None and transaction['blockNumber'] is None:
+            return False
+        nonce = transaction['nonce'] if transaction is not None else self._sent_nonces.get(tx_hash)
+        if nonce is None:
+            # Sent before a restart and since forgotten by the node; nothing proves it is gone
+            return False
+        if self.w3.eth.get_transaction_count(self.account.address, 'latest') <= nonce:
+            return False
+        try:
+            return self.w3.eth.get_transaction_receipt(tx_hash) is None
+        except TransactionNotFound:
+            return True
+
+    def _resync_nonces(self):
+        """Called when a receipt never arrived; a dropped transaction would otherwise stall later nonces"""
+        try:
+            self.nonces.resync()
+        except Exception as e:
+            print(f"Nonce resync failed: {str(e)}")
+
+    def _token_id_from_receipt(self, receipt, tx_hash):
+        print(f"Transaction confirmed in block {receipt['blockNumber']}")
+        self._sent_nonces.pop(self.w3.to_hex(HexBytes(tx_hash)), None)
+        if receipt['status'] != 1:
+            return Exception("Transaction failed")
+        # Get the token ID from the event logs
+        transfer_event = self.contract.events.Transfer().process_receipt(receipt, errors=DISCARD)
+        if transfer_event:
+            return str(transfer_event[0]['args']['tokenId'])
+        return tx_hash if isinstance(tx_hash, str) else self.w3.to_hex(tx_hash)
+
+    def _gas_price(self) -> int:
+        # Get optimized gas price (10% higher than base for faster confirmation)
+        return int(self.w3.eth.gas_price * 1.1)
+
     def verify_certificate(self, token_id: int, expected_recipient: Optional[str] = None) -> dict:
         try:
-            # Get certificate data
-            certificate = self.get_certificate(token_id)
-            if not certificate:
-                return {
+            ledger = self.ledger
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        if ledger:
+            try:
+                verification = self._verify_from_ledger(token_id, expected_recipient)
+                if verification:
+                    return verification
+            except Exception as e:
+                print(f"Ledger lookup failed for certificate {token_id}, reading from chain: {str(e)}")
+        return self._verify_on_chain(token_id, expected_recipient)
+
+    def _verify_from_ledger(self, token_id, expected_recipient=None, sync=True) -> Optional[dict]:
+        """verify_certificate() answered from the local ledger; None if the token is not indexed yet"""
+        if sync:
+            self._sync_ledger()
+        certificate = self.ledger.get(token_id)
+        if not certificate:
+            return None
+        owner = certificate.pop('owner')
+        return {
+            'success': True,
+            'is_valid': not certificate['is_revoked'],
+            'owner': owner,
+            'matches_recipient': not expected_recipient or owner.lower() == expected_recipient.lower(),
+            'data': certificate,
+            # The contract never sets a token URI, so tokenURI() is always empty
+            'token_uri': '',
+            'history': self.ledger.history(token_id)
+        }
+
+    def _verify_on_chain(self, token_id: int, expected_recipient: Optional[str] = None) -> dict:
+        try:
+            return self.get_certificates_bulk([token_id], expected_recipient)[int(token_id)]
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def get_certificates_bulk(self, token_ids: list, expected_recipient: Optional[str] = None) -> dict:
+        """verify_certificate() for many tokens in a constant number of RPC round trips.
+
+        All getCertificate/ownerOf/tokenURI/getCertificateTimestamp reads go
+        out as one JSON-RPC batch, one log query covers every token's
+        transfers, and the block timestamps for those transfers are fetched
+        in a second batch.
+        Returns {token_id: verification}.
+        """
+        token_ids = [int(token_id) for token_id in token_ids]
+        if not token_ids:
+            return {}
+        self._require_node()
+        
+        batch = JSONRPCBatch(self.w3, session=self.rpc_session)
+        slots = {
+            token_id: (
+                batch.add_call(self.contract.functions.getCertificate(token_id)),
+                batch.add_call(self.contract.functions.ownerOf(token_id)),
+                batch.add_call(self.contract.functions.tokenURI(token_id)),
+                batch.add_call(self.contract.functions.getCertificateTimestamp(token_id))
+            )
+            for token_id in token_ids
+        }
+        reads = batch.execute()
+        
+        # Transfer history for every token in one log query
+        transfer_events = self.contract.events.Transfer.get_logs(
+            fromBlock=0,
+            toBlock='latest',
+            argument_filters={'tokenId': token_ids}
+        )
+        
+        # Block timestamps for those transfers in one batch
+        block_numbers = sorted({event['blockNumber'] for event in transfer_events})
+        for number in block_numbers:
+            batch.add_block_timestamp(number)
+        timestamps = dict(zip(block_numbers, batch.execute()))
+        
+        history = {token_id: [] for token_id in token_ids}
+        for event in transfer_events:
+            timestamp = timestamps[event['blockNumber']]
+            history[event['args']['tokenId']].append({
+                'from': event['args']['from'],
+                'to': event['args']['to'],
+                'block_number': event['blockNumber'],
+                'timestamp': None if isinstance(timestamp, Exception) else datetime.fromtimestamp(timestamp).isoformat(),
+                'transaction_hash': event['transactionHash'].hex()
+            })
+        
+        results = {}
+        for token_id, (certificate_slot, owner_slot, uri_slot, timestamp_slot) in slots.items():
+            certificate, owner, token_uri = reads[certificate_slot], reads[owner_slot], reads[uri_slot]
+            timestamp = reads[timestamp_slot]
+            if isinstance(certificate, Exception):
+                print(f"Error getting certificate {token_id}: {str(certificate)}")
+                results[token_id] = {
                     'success': False,
                     'error': 'Certificate not found'
                 }
-            
-            # Verify owner
-            owner = self.contract.functions.ownerOf(token_id).call()
-            
-            # Get token URI if available
-            token_uri = None
+                continue
+            if isinstance(owner, Exception):
+                results[token_id] = {
+                    'success': False,
+                    'error': str(owner)
+                }
+                continue
             try:
-                token_uri = self.contract.functions.tokenURI(token_id).call()
-            except:
-                pass
-            
-            # Get transfer history
-            transfer_events = self.contract.events.Transfer.get_logs(
-                fromBlock=0,
-                toBlock='latest',
-                argument_filters={'tokenId': token_id}
-            )
-            
-            # Get block timestamps for each transfer
-            transfers_with_time = []
-            for event in transfer_events:
-                block = self.w3.eth.get_block(event['blockNumber'])
-                transfers_with_time.append({
-                    'from': event['args']['from'],
-                    'to': event['args']['to'],
-                    'block_number': event['blockNumber'],
-                    'timestamp': datetime.fromtimestamp(block['timestamp']).isoformat(),
-                    'transaction_hash': event['transactionHash'].hex()
-                })
-            
-            return {
+                data = self._format_certificate(certificate, None if isinstance(timestamp, Exception) else timestamp)
+            except Exception as e:
+                print(f"Error formatting certificate {token_id}: {str(e)}")
+                results[token_id] = {
+                    'success': False,
+                    'error': str(e)
+                }
+                continue
+            results[token_id] = {
                 'success': True,
                 'is_valid': True,
                 'owner': owner,
                 'matches_recipient': not expected_recipient or owner.lower() == expected_recipient.lower(),
-                'data': certificate,
-                'token_uri': token_uri,
-                'history': transfers_with_time
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
+                'data': data,
+                'token_uri': None if isinstance(token_uri, Exception) else token_uri,
+                'history': history[token_id]
             }
+        return results
 
     def get_certificate(self, token_id: str) -> Optional[dict]:
         """Get certificate data from the blockchain"""
         try:
             # Convert token_id to int if it's a string
             token_id = int(token_id) if isinstance(token_id, str) else token_id
+            self._require_node()
             
             # Get certificate data from contract
             certificate = self.contract.functions.getCertificate(token_id).call()
-            
-            # Return formatted certificate data
-            return {
-                'recipient': certificate[0],
-                'quiz_title': certificate[1],
-                'score': certificate[2],
-                'date': certificate[3],
-                'ipfs_hash': certificate[4],
-                'timestamp': certificate[5],
-                'is_revoked': certificate[6]
-            }
+            timestamp = self.contract.functions.getCertificateTimestamp(token_id).call()
+            return self._format_certificate(certificate, timestamp)
         except Exception as e:
             print(f"Error getting certificate {token_id}: {str(e)}")
             return None
 
+    @staticmethod
+    def _format_certificate(certificate, timestamp: Optional[int] = None) -> dict:
+        # getCertificate() returns (quizTitle, score, date, recipient, ipfsHash) and
+        # reverts for revoked tokens, so anything it returns is not revoked
+        quiz_title, score, date, recipient, ipfs_hash = certificate
+        return {
+            'recipient': recipient,
+            'quiz_title': quiz_title,
+            'score': score,
+            'date': date,
+            'ipfs_hash': ipfs_hash,
+            'timestamp': timestamp,
+            'is_revoked': False
+        }
+
     def get_user_certificates(self, user_address: str) -> dict:
+        try:
+            ledger = self.ledger
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        if ledger:
+            try:
+                return self._user_certificates_from_ledger(user_address)
+            except Exception as e:
+                print(f"Ledger listing failed for {user_address}, reading from chain: {str(e)}")
+        return self._user_certificates_on_chain(user_address)
+
+    def _sync_ledger(self):
+        try:
+            # Don't wait on a node the probe already knows is down; answer from the index
+            self._require_node(timeout=0 if self.last_error else None)
+            self.ledger.sync()
+        except Exception as e:
+            print(f"Ledger sync skipped, serving the local index: {str(e)}")
+
+    def _user_certificates_from_ledger(self, user_address: str) -> dict:
+        self._sync_ledger()
+        certificates = []
+        for token_id in self.ledger.tokens_of(user_address):
+            verification = self._verify_from_ledger(token_id, sync=False)
+            # getCertificate() reverts for revoked tokens, so they are not listed
+            if verification and verification['is_valid']:
+                certificates.append({
+                    'token_id': token_id,
+                    'verification': verification,
+                    **verification['data']
+                })
+        return {
+            'success': True,
+            'certificates': certificates
+        }
+
+    def _user_certificates_on_chain(self, user_address: str) -> dict:
         try:
             # Convert address to checksum format
             user_address = self.w3.to_checksum_address(user_address)
+            self._require_node()
             
             token_ids = self.contract.functions.getCertificatesByOwner(user_address).call()
             certificates = []
             
+            # Read every certificate and its verification details in bulk
+            verifications = self.get_certificates_bulk(token_ids)
             for token_id in token_ids:
-                cert_data = self.get_certificate(token_id)
-                if cert_data:
-                    # Get verification details
-                    verification = self.verify_certificate(token_id)
+                verification = verifications[int(token_id)]
+                if verification['success']:
                     certificates.append({
                         'token_id': token_id,
                         'verification': verification,
-                        **cert_data
+                        **verification['data']
                     })
             
             return {
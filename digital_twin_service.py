@@ -12,6 +12,8 @@ class DigitalTwin:
         self.alerts = []
         self.connected_device = None
         self.last_scan_result = None
+        # Optional utils.telemetry_archive.TelemetryArchive that keeps monitoring data
+        self.archive = None
     
     async def initialize(self, device_address=None):
         """Initialize the digital twin with a device."""
@@ -87,6 +89,8 @@ class DigitalTwin:
             if result["status"] == "success":
                 # Process and analyze the data
                 data_points = result["data"]
+                if self.archive is not None:
+                    self.archive_points(data_points)
                 
                 # Calculate statistics
                 heart_rates = [point['heart_rate'] for point in data_points]
@@ -117,6 +121,16 @@ class DigitalTwin:
             logger.error(f"Error getting monitoring data: {str(e)}")
             return {"status": "error", "message": str(e)}
     
+    def archive_points(self, data_points):
+        """Append monitoring data points to the telemetry archive of the connected device"""
+        series_id = f"device:{self.connected_device['address']}"
+        try:
+            for point in data_points:
+                timestamp = datetime.fromisoformat(point['timestamp']).timestamp()
+                self.archive.record(series_id, timestamp, point)
+        except Exception as e:
+            logger.error(f"Error archiving monitoring data: {str(e)}")
+
     async def disconnect_current_device(self):
         """Disconnect from the current device."""
         try:
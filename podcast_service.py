@@ -0,0 +1,723 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from functools import partial
+
+import requests
+import spotipy
+from spotipy.oauth2 import SpotifyClientCredentials
+from googleapiclient.discovery import build
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from utils.categorizer import KeywordCategorizer
+from utils.podcast_dedup import PodcastMerger, merge_podcasts
+
+logger = logging.getLogger(__name__)
+
+# Seconds each source may take before its results are returned as they stand
+DEFAULT_SOURCE_DEADLINES = {
+    'itunes': 5.0,
+    'spotify': 8.0,
+    'youtube': 6.0
+}
+
+# Category keyword table; the first matching category in this order is the primary one
+CONTENT_CATEGORIES = {
+    'Rules & Compliance': ['rule', 'compliance', 'violation', 'sanction', 'regulation', 'policy'],
+    'Testing & Science': ['test', 'sample', 'laboratory', 'biological passport', 'analysis'],
+    'Education': ['education', 'learn', 'guide', 'understand', 'awareness'],
+    'Athlete Stories': ['story', 'interview', 'experience', 'journey', 'athlete'],
+    'Updates & News': ['update', 'news', 'announcement', 'latest', 'change'],
+    'Clean Sport': ['clean sport', 'integrity', 'fair play', 'values']
+}
+CONTENT_CATEGORIZER = KeywordCategorizer(CONTENT_CATEGORIES, default='General Anti-Doping')
+
+# How long catalog entries from each source stay fresh before the source is refetched
+DEFAULT_SOURCE_TTLS = {
+    'itunes': timedelta(hours=24),
+    'spotify': timedelta(hours=6),
+    'youtube': timedelta(hours=2)
+}
+
+
+class PodcastFetcher:
+    def __init__(self):
+        """Initialize the podcast fetcher with API clients"""
+        # Initialize Spotify client
+        self.spotify = spotipy.Spotify(client_credentials_manager=SpotifyClientCredentials())
+
+        # YouTube clients are built per thread because googleapiclient's
+        # HTTP transport is not thread-safe
+        self._youtube_api_key = os.environ.get('YOUTUBE_API_KEY')
+        self._thread_local = threading.local()
+
+        # Anti-doping related keywords for content filtering
+        self.antidoping_keywords = [
+            'anti-doping', 'antidoping', 'doping', 'wada', 'usada', 'clean sport',
+            'drug testing', 'prohibited substances', 'banned substances', 'athlete integrity',
+            'sports integrity', 'fair play', 'clean athlete', 'performance enhancing',
+            'drug free sport', 'anti doping violation', 'therapeutic use exemption', 'tue',
+            'whereabouts', 'testing pool', 'biological passport', 'prohibited list',
+            'anti-doping rule', 'sample collection', 'doping control', 'adams',
+            'world anti-doping', 'national anti-doping', 'doping test'
+        ]
+
+        # Search queries for finding relevant content
+        self.search_queries = [
+            'anti-doping podcast',
+            'clean sport podcast',
+            'doping in sports podcast',
+            'sports integrity podcast',
+            'wada podcast',
+            'usada podcast'
+        ]
+
+        # Broader per-source search terms
+        self.spotify_search_terms = ['sports', 'athlete', 'olympic', 'fitness', 'training', 'health']
+        self.youtube_search_terms = ['sports', 'athlete', 'fitness', 'training', 'olympics']
+        self.itunes_search_terms = ['sports', 'athlete', 'fitness', 'training', 'olympics']
+
+        # YouTube channel IDs
+        self.youtube_channels = [
+            'UCQxkGRRkhVeOQpwR9WEsV3A',  # World Anti-Doping Agency (WADA)
+            'UCuJcLm5uNXtXUVHHLs2W_-Q',  # U.S. Anti-Doping Agency (USADA)
+            'UC5nU0k_KnOXAwK_6cLvjfDQ'   # UK Anti-Doping (UKAD)
+        ]
+
+        # Rate limiting attributes, shared by every fetch thread
+        self._rate_lock = threading.Lock()
+        self.spotify_calls = deque(maxlen=30)  # Track last 30 Spotify API calls
+        self.itunes_calls = deque(maxlen=20)  # iTunes allows roughly 20 searches per minute
+        self.youtube_quota = {
+            'daily_limit': 10000,
+            'used': 0,
+            'reset_time': datetime.now()
+        }
+
+        # Add iTunes search URL
+        self.itunes_search_url = "https://itunes.apple.com/search"
+
+    @property
+    def youtube(self):
+        """YouTube client for the calling thread"""
+        client = getattr(self._thread_local, 'youtube', None)
+        if client is None:
+            client = build('youtube', 'v3', developerKey=self._youtube_api_key)
+            self._thread_local.youtube = client
+        return client
+
+    def is_antidoping_content(self, title, description):
+        """Check if content is related to sports or anti-doping based on title and description"""
+        # Make the filter more lenient by always returning True to get all content
+        return True
+
+    def _reserve_slot(self, calls, limit, window):
+        """Record a call if it fits in the sliding window; returns 0, or the seconds until one would"""
+        with self._rate_lock:
+            now = time.time()
+            while calls and calls[0] < now - window:
+                calls.popleft()
+            if len(calls) < limit:
+                calls.append(now)
+                return 0
+            return max(window - (now - calls[0]), 0.001)
+
+    def _wait_for_slot(self, calls, limit, window):
+        """Block until a call fits in the sliding window, then record it.
+
+        Calls run through run_reserved() already hold a slot and return at
+        once; only direct callers ever sleep here.
+        """
+        if getattr(self._thread_local, 'slot_reserved', False):
+            self._thread_local.slot_reserved = False
+            return
+        while True:
+            sleep_time = self._reserve_slot(calls, limit, window)
+            if not sleep_time:
+                return
+            time.sleep(sleep_time)
+
+    def reserve_slot(self, source):
+        """Reserve one rate-limited call for source without blocking; 0 if reserved, else seconds to wait"""
+        limits = {
+            'spotify': (self.spotify_calls, 30, 1),
+            'itunes': (self.itunes_calls, 20, 60)
+        }
+        if source not in limits:
+            return 0
+        return self._reserve_slot(*limits[source])
+
+    def run_reserved(self, fn, arg):
+        """Call fn(arg) using the rate-limit slot the caller reserved with reserve_slot()"""
+        self._thread_local.slot_reserved = True
+        try:
+            return fn(arg)
+        finally:
+            self._thread_local.slot_reserved = False
+
+    def _check_spotify_rate_limit(self):
+        """Implement Spotify rate limiting - 30 requests per second"""
+        self._wait_for_slot(self.spotify_calls, 30, 1)
+
+    def _check_itunes_rate_limit(self):
+        """Implement iTunes rate limiting - 20 requests per minute"""
+        self._wait_for_slot(self.itunes_calls, 20, 60)
+
+    def _check_youtube_quota(self, cost=1):
+        """Check YouTube API quota"""
+        with self._rate_lock:
+            now = datetime.now()
+
+            # Reset quota if it's a new day
+            if now.date() > self.youtube_quota['reset_time'].date():
+                self.youtube_quota['used'] = 0
+                self.youtube_quota['reset_time'] = now
+
+            # Check if we have enough quota
+            if self.youtube_quota['used'] + cost > self.youtube_quota['daily_limit']:
+                raise Exception("YouTube API daily quota exceeded")
+
+            self.youtube_quota['used'] += cost
+
+    def search_spotify_shows(self, query, known_shows=None, confirm=None):
+        """Search Spotify for shows matching one query.
+
+        Shows listed in known_shows ({show_id: total_episodes}) are skipped
+        when their episode count has not changed since they were last fetched;
+        confirm(show_id) is called for each of them, as they still exist.
+        """
+        self._check_spotify_rate_limit()
+        results = self.spotify.search(q=query, type='show', market='US', limit=10)
+
+        if not results or 'shows' not in results or 'items' not in results['shows']:
+            return []
+        known_shows = known_shows or {}
+        shows = []
+        for show in results['shows']['items']:
+            if not show:
+                continue
+            if show['id'] in known_shows and known_shows[show['id']] == show.get('total_episodes'):
+                if confirm:
+                    confirm(show['id'])
+            else:
+                shows.append(show)
+        return shows
+
+    def fetch_spotify_show_episodes(self, show):
+        """Fetch the latest episodes of one Spotify show"""
+        self._check_spotify_rate_limit()
+        episodes = self.spotify.show_episodes(show['id'], limit=5, market='US')
+
+        podcasts = []
+        texts = []
+        if not episodes or 'items' not in episodes:
+            return podcasts
+
+        for episode in episodes['items']:
+            try:
+                podcast = {
+                    'title': episode['name'],
+                    'description': episode.get('description', '')[:500],
+                    'author': show['publisher'],
+                    'published_date': episode.get('release_date', ''),
+                    'image_url': episode['images'][0]['url'] if episode.get('images') and episode['images'] else None,
+                    'source_url': episode['external_urls']['spotify'] if episode.get('external_urls') else '',
+                    'source_type': 'spotify',
+                    'language': episode.get('language', 'en'),
+                    'duration_ms': episode.get('duration_ms', 0),
+                    'show_id': show['id'],
+                    'show_total_episodes': show.get('total_episodes')
+                }
+            except Exception:
+                continue
+            podcasts.append(podcast)
+            texts.append((episode['name'], episode.get('description', '')))
+        return self._categorize_items(podcasts, texts)
+
+    def search_youtube_term(self, term, published_after=None):
+        """Search YouTube for recent videos matching one term, optionally only those newer than published_after"""
+        self._check_youtube_quota(cost=1)
+
+        params = {
+            'part': "snippet",
+            'q': term,
+            'maxResults': 10,
+            'order': "date",
+            'type': "video"
+        }
+        if published_after:
+            params['publishedAfter'] = published_after
+        search_request = self.youtube.search().list(**params).execute()
+
+        videos = []
+        texts = []
+        for item in search_request.get('items', []):
+            try:
+                snippet = item['snippet']
+                video = {
+                    'title': snippet['title'],
+                    'description': snippet.get('description', '')[:500],
+                    'author': snippet['channelTitle'],
+                    'published_date': snippet['publishedAt'],
+                    'image_url': snippet.get('thumbnails', {}).get('high', {}).get('url'),
+                    'source_url': f"https://www.youtube.com/watch?v={item['id']['videoId']}",
+                    'source_type': 'youtube',
+                    'language': 'en'
+                }
+            except Exception:
+                continue
+            videos.append(video)
+            texts.append((snippet['title'], snippet.get('description', '')))
+        return self._categorize_items(videos, texts)
+
+    def youtube_videos_exist(self, video_ids):
+        """The subset of video_ids still available on YouTube (one quota unit per 50 ids)"""
+        existing = set()
+        video_ids = list(video_ids)
+        for i in range(0, len(video_ids), 50):
+            self._check_youtube_quota(cost=1)
+            response = self.youtube.videos().list(part='id', id=','.join(video_ids[i:i + 50]), maxResults=50).execute()
+            existing.update(item['id'] for item in response.get('items', []))
+        return existing
+
+    def search_itunes_term(self, query):
+        """Search the iTunes podcast directory for one term"""
+        self._check_itunes_rate_limit()
+        params = {
+            'term': query,
+            'entity': 'podcast',
+            'limit': 20,
+            'media': 'podcast'
+        }
+
+        response = requests.get(self.itunes_search_url, params=params, timeout=10)
+        if response.status_code != 200:
+            return []
+
+        podcasts = []
+        texts = []
+        for item in response.json().get('results', []):
+            try:
+                podcast = {
+                    'title': item.get('collectionName', ''),
+                    'description': item.get('description', '')[:500],
+                    'author': item.get('artistName', ''),
+                    # Release date of the latest episode, as YYYY-MM-DD like the other sources
+                    'published_date': (item.get('releaseDate') or '')[:10],
+                    'image_url': item.get('artworkUrl600', ''),
+                    'source_url': item.get('collectionViewUrl', ''),
+                    'source_type': 'itunes',
+                    'language': 'en'
+                }
+            except Exception:
+                continue
+            podcasts.append(podcast)
+            texts.append((item.get('collectionName', ''), item.get('description', '')))
+        return self._categorize_items(podcasts, texts)
+
+    def fetch_spotify_podcasts(self):
+        """Fetch sports and anti-doping related episodes from Spotify using search"""
+        return self._fetch_source('spotify')
+
+    def fetch_youtube_videos(self):
+        """Fetch sports and fitness related videos from YouTube"""
+        return self._fetch_source('youtube')
+
+    def fetch_itunes_podcasts(self):
+        """Fetch sports and fitness related podcasts from iTunes"""
+        return self._fetch_source('itunes')
+
+    def fetch_all_podcasts(self):
+        """Fetch podcasts from all available sources"""
+        return PodcastAggregator(self).aggregate()['data']
+
+    def _fetch_source(self, source):
+        """Fetch a single source through the aggregator so its terms run concurrently"""
+        aggregator = PodcastAggregator(self, sources=[source])
+        return aggregator.aggregate()['data']
+
+    def _categorize_items(self, items, texts):
+        """Set category and per-category match counts on items in one pass over their (title, description) texts"""
+        for item, (category, counts) in zip(items, CONTENT_CATEGORIZER.categorize_batch(texts)):
+            item['category'] = category
+            item['category_matches'] = counts
+        return items
+
+
+class PodcastAggregator:
+    """Runs every podcast source and search term concurrently.
+
+    Each source has its own deadline and the whole run shares one latency
+    budget. Whatever a source has returned by its deadline is reported as a
+    partial result rather than holding the response for a slow upstream.
+    Rate-limited calls are only handed to the shared pool once the fetcher
+    has granted them a slot, so throttled requests wait here, in the
+    aggregator, and never occupy pool threads that other sources need.
+    """
+
+    # Long-lived pool: work abandoned at a deadline finishes in the
+    # background instead of blocking the request that gave up on it
+    _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='podcast-fetch')
+
+    def __init__(self, fetcher, budget=8.0, deadlines=None, sources=None, cursors=None):
+        self.fetcher = fetcher
+        self.budget = budget
+        self.deadlines = {**DEFAULT_SOURCE_DEADLINES, **(deadlines or {})}
+        self.sources = sources or ['itunes', 'spotify', 'youtube']
+        # Incremental fetch state: {'spotify': {show_id: total_episodes}, 'youtube': RFC 3339 timestamp}
+        self.cursors = cursors or {}
+        # Known Spotify shows the search saw again but did not refetch
+        self.confirmed_shows = set()
+
+    def _source_specs(self):
+        """Map each source to (search terms, search function, optional per-result expansion)"""
+        f = self.fetcher
+        specs = {
+            'itunes': (f.itunes_search_terms, f.search_itunes_term, None),
+            'spotify': (
+                f.spotify_search_terms,
+                partial(f.search_spotify_shows, known_shows=self.cursors.get('spotify'),
+                        confirm=self.confirmed_shows.add),
+                f.fetch_spotify_show_episodes
+            ),
+            'youtube': (
+                f.youtube_search_terms,
+                partial(f.search_youtube_term, published_after=self.cursors.get('youtube')),
+                None
+            )
+        }
+        return {source: specs[source] for source in self.sources}
+
+    def iter_sources(self):
+        """Yield (source, items, complete) as each source finishes or reaches its deadline"""
+        start = time.monotonic()
+        specs = self._source_specs()
+
+        pending = {}  # future -> (source, expand)
+        throttled = {source: deque() for source in specs}  # calls waiting for a rate-limit slot
+        retry_at = {}
+        outstanding = {source: 0 for source in specs}
+        results = {source: [] for source in specs}
+        deadlines = {
+            source: start + min(self.deadlines.get(source, self.budget), self.budget)
+            for source in specs
+        }
+
+        def submit(source, fn, arg, expand):
+            outstanding[source] += 1
+            throttled[source].append((fn, arg, expand))
+
+        def release(source):
+            """Hand throttled calls to the pool while the source has rate-limit slots"""
+            while throttled[source]:
+                delay = self.fetcher.reserve_slot(source)
+                if delay:
+                    retry_at[source] = time.monotonic() + delay
+                    return
+                fn, arg, expand = throttled[source].popleft()
+                future = self._executor.submit(self.fetcher.run_reserved, fn, arg)
+                pending[future] = (source, expand)
+            retry_at.pop(source, None)
+
+        for source, (terms, search, expand) in specs.items():
+            for term in terms:
+                submit(source, search, term, expand)
+
+        open_sources = set(specs)
+        while open_sources:
+            now = time.monotonic()
+            for source in [s for s in specs if s in open_sources]:
+                timed_out = now >= deadlines[source]
+                if outstanding[source] and not timed_out:
+                    continue
+                open_sources.discard(source)
+                if timed_out and outstanding[source]:
+                    logger.warning(f"{source} missed its deadline with {outstanding[source]} requests outstanding")
+                    throttled[source].clear()
+                    retry_at.pop(source, None)
+                    for future, (owner, _) in list(pending.items()):
+                        if owner == source:
+                            future.cancel()
+                            del pending[future]
+                yield source, merge_podcasts(results[source]), not outstanding[source]
+
+            if not open_sources:
+                break
+
+            for source in open_sources:
+                if throttled[source] and retry_at.get(source, 0) <= time.monotonic():
+                    release(source)
+            wake = [deadlines[s] for s in open_sources] + [retry_at[s] for s in open_sources if s in retry_at]
+            timeout = max(min(wake) - time.monotonic(), 0)
+            if not pending:
+                time.sleep(timeout)
+                continue
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                source, expand = pending.pop(future)
+                outstanding[source] -= 1
+                try:
+                    items = future.result()
+                except Exception as e:
+                    logger.error(f"{source} fetch failed: {str(e)}")
+                    continue
+
+                if expand:
+                    for item in items:
+                        submit(source, expand, item, None)
+                else:
+                    results[source].extend(items)
+
+    def aggregate(self):
+        """Collect all sources within the budget, merging the same episode across platforms"""
+        merger = PodcastMerger()
+        sources = {}
+        for source, items, complete in self.iter_sources():
+            sources[source] = {'count': len(items), 'complete': complete}
+            merger.extend(items)
+
+        return {
+            'data': merger.items(),
+            'partial': not all(status['complete'] for status in sources.values()),
+            'sources': sources
+        }
+
+
+class PodcastCatalog:
+    """Persistent podcast catalog stored in MongoDB and keyed by source_url.
+
+    Page views read straight from the indexed collection. Upstream APIs are
+    only called by refresh_due_sources(), which refetches a source once its
+    TTL has passed and asks it only for content newer than what is stored.
+    Because stored entries are not refetched, each refresh separately
+    confirms that they still exist upstream (Spotify shows the search saw
+    again, YouTube videos checked by id) and extends their expiry, so only
+    content that has gone upstream is purged.
+    """
+
+    LEASE_ID = 'refresh_lease'
+
+    def __init__(self, db, fetcher_factory, ttls=None, retention=timedelta(days=30),
+                 collection_name='podcast_catalog'):
+        self.collection = db[collection_name]
+        self.state = db[collection_name + '_state']
+        self.fetcher_factory = fetcher_factory
+        self.ttls = {**DEFAULT_SOURCE_TTLS, **(ttls or {})}
+        self.retention = retention
+        self._fetcher = None
+        self._thread = None
+        self._wakeup = threading.Event()
+
+    def ensure_indexes(self):
+        """Create the lookup, filter and expiry indexes"""
+        self.collection.create_index([('source_url', ASCENDING)], unique=True)
+        self.collection.create_index([('published_date', DESCENDING)])
+        for field in ('category', 'source_type', 'language'):
+            self.collection.create_index([(field, ASCENDING), ('published_date', DESCENDING)])
+        # Entries nobody has seen upstream for the retention period are purged by MongoDB
+        self.collection.create_index(
+            [('expires_at', ASCENDING)],
+            expireAfterSeconds=int(self.retention.total_seconds())
+        )
+        self.collection.create_index([('show_id', ASCENDING)], sparse=True)
+
+    def query(self, category=None, source_type=None, language=None, page=1, per_page=20):
+        """Return one page of catalog entries matching the filters, newest first"""
+        filters = {}
+        if category:
+            filters['category'] = category
+        if source_type:
+            filters['source_type'] = source_type
+        if language:
+            filters['language'] = language
+
+        page = max(int(page), 1)
+        per_page = min(max(int(per_page), 1), 100)
+        # Fetch one extra row to learn whether another page exists without a count query
+        cursor = self.collection.find(
+            filters,
+            {'_id': 0, 'expires_at': 0, 'last_seen': 0, 'first_seen': 0, 'show_total_episodes': 0}
+        ).sort('published_date', DESCENDING).skip((page - 1) * per_page).limit(per_page + 1)
+        items = list(cursor)
+
+        return {
+            'data': items[:per_page],
+            'page': page,
+            'per_page': per_page,
+            'has_more': len(items) > per_page
+        }
+
+    def iter_sources(self, per_source=20):
+        """Yield (source, items, fresh) from the catalog, one source at a time.
+
+        Nothing is fetched here: a stale source only wakes the refresher,
+        which refetches it under the refresh lease.
+        """
+        due = set(self.due_sources())
+        if due:
+            self.trigger()
+        for source in self.ttls:
+            yield source, self.query(source_type=source, per_page=per_source)['data'], source not in due
+
+    def due_sources(self, now=None):
+        """Sources whose TTL has passed since their last successful refresh"""
+        now = now or datetime.utcnow()
+        refreshed = {doc['_id']: doc.get('refreshed_at') for doc in self.state.find({'_id': {'$in': list(self.ttls)}})}
+        return [
+            source for source, ttl in self.ttls.items()
+            if not refreshed.get(source) or refreshed[source] + ttl <= now
+        ]
+
+    def refresh_due_sources(self, budget=120.0):
+        """Fetch new content for every due source and upsert it into the catalog.
+
+        Returns the number of entries written. Only one worker refreshes at a
+        time; the others return 0 straight away.
+        """
+        if not self._acquire_lease(budget * 2):
+            return 0
+        try:
+            sources = self.due_sources()
+            if not sources:
+                return 0
+
+            if self._fetcher is None:
+                self._fetcher = self.fetcher_factory()
+            aggregator = PodcastAggregator(
+                self._fetcher,
+                budget=budget,
+                deadlines={source: budget for source in sources},
+                sources=sources,
+                cursors=self._cursors()
+            )
+
+            written = 0
+            for source, items, complete in aggregator.iter_sources():
+                written += self._upsert(source, items)
+                if source == 'spotify' and aggregator.confirmed_shows:
+                    self._touch(source, {'source_type': 'spotify', 'show_id': {'$in': list(aggregator.confirmed_shows)}})
+                elif source == 'youtube':
+                    self._confirm_youtube()
+                if complete:
+                    self.state.update_one(
+                        {'_id': source},
+                        {'$set': {'refreshed_at': datetime.utcnow()}},
+                        upsert=True
+                    )
+                logger.info(f"Catalog refresh for {source}: {len(items)} entries, complete={complete}")
+            return written
+        finally:
+            self.state.delete_one({'_id': self.LEASE_ID})
+
+    def start_refresher(self, interval=300):
+        """Run refresh_due_sources() on a daemon thread every interval seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._refresh_loop, args=(interval,), name='podcast-catalog')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def trigger(self):
+        """Wake the refresher thread before its next scheduled run"""
+        self._wakeup.set()
+
+    def _refresh_loop(self, interval):
+        while True:
+            try:
+                self.refresh_due_sources()
+            except Exception as e:
+                logger.error(f"Podcast catalog refresh failed: {str(e)}")
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+
+    def _acquire_lease(self, seconds):
+        """Take the cross-worker refresh lease, or return False if another worker holds it"""
+        now = datetime.utcnow()
+        try:
+            self.state.update_one(
+                {'_id': self.LEASE_ID, 'expires': {'$lt': now}},
+                {'$set': {'expires': now + timedelta(seconds=seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _cursors(self):
+        """Build the incremental fetch state from what the catalog already holds"""
+        known_shows = {
+            doc['_id']: doc['total']
+            for doc in self.collection.aggregate([
+                {'$match': {'source_type': 'spotify', 'show_id': {'$exists': True}}},
+                {'$group': {'_id': '$show_id', 'total': {'$max': '$show_total_episodes'}}}
+            ])
+        }
+        latest_video = self.collection.find_one(
+            {'source_type': 'youtube'},
+            {'published_date': 1},
+            sort=[('published_date', DESCENDING)]
+        )
+        return {
+            'spotify': known_shows,
+            'youtube': latest_video['published_date'] if latest_video else None
+        }
+
+    def _touch(self, source, filters):
+        """Extend the expiry of entries confirmed to still exist upstream"""
+        now = datetime.utcnow()
+        self.collection.update_many(filters, {'$set': {
+            'last_seen': now,
+            'expires_at': now + self.ttls.get(source, timedelta(hours=6))
+        }})
+
+    def _confirm_youtube(self):
+        """Check stored videos unseen for half the retention period, and extend the ones still online"""
+        prefix = 'https://www.youtube.com/watch?v='
+        stale = [
+            doc['source_url'][len(prefix):]
+            for doc in self.collection.find(
+                {'source_type': 'youtube', 'last_seen': {'$lt': datetime.utcnow() - self.retention / 2}},
+                {'source_url': 1}
+            )
+            if doc['source_url'].startswith(prefix)
+        ]
+        if not stale:
+            return
+        try:
+            existing = self._fetcher.youtube_videos_exist(stale)
+        except Exception as e:
+            logger.error(f"Could not confirm stored YouTube videos: {str(e)}")
+            return
+        if existing:
+            self._touch('youtube', {'source_url': {'$in': [prefix + video_id for video_id in existing]}})
+
+    def _upsert(self, source, items):
+        """Insert new entries and extend the expiry of ones seen again"""
+        now = datetime.utcnow()
+        expires_at = now + self.ttls.get(source, timedelta(hours=6))
+        operations = []
+        for item in merge_podcasts(items):
+            if not item.get('source_url'):
+                continue
+            fields = {k: v for k, v in item.items() if k not in ('sources', 'alternate_urls')}
+            operations.append(UpdateOne(
+                {'source_url': item['source_url']},
+                {
+                    '$set': {**fields, 'last_seen': now, 'expires_at': expires_at},
+                    '$setOnInsert': {'first_seen': now},
+                    '$addToSet': {
+                        'sources': {'$each': item.get('sources', [source])},
+                        'alternate_urls': {'$each': item.get('alternate_urls', [])}
+                    }
+                },
+                upsert=True
+            ))
+        if not operations:
+            return 0
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
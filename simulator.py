@@ -1,284 +1,384 @@
-import random
 import time
-from datetime import datetime, timedelta
 import threading
+from datetime import datetime
+
+import numpy as np
 from flask_socketio import SocketIO
 
+from utils.telemetry_fanout import TelemetryFanout
+from utils.telemetry_history import HISTORY_FIELDS
+
+# Activity codes index every per-activity table below
+ACTIVITIES = ('resting', 'walking', 'running', 'workout')
+
+ACTIVITY_PATTERNS = {
+    'resting': {'hr_range': (60, 75), 'steps_per_min': (0, 5)},
+    'walking': {'hr_range': (75, 100), 'steps_per_min': (85, 110)},
+    'running': {'hr_range': (140, 180), 'steps_per_min': (150, 180)},
+    'workout': {'hr_range': (120, 160), 'steps_per_min': (30, 60)}
+}
+ACTIVITY_STRESS = {'resting': -5, 'walking': 0, 'running': 10, 'workout': 15}
+ACTIVITY_DEHYDRATION = {'resting': 0.5, 'walking': 1, 'running': 3, 'workout': 2.5}
+MET_VALUES = {'resting': 1.0, 'walking': 3.5, 'running': 8.0, 'workout': 6.0}
+
+# Flagged when heart_rate > hr_above and hrv < hrv_below
+RISK_SCENARIOS = [
+    {
+        'name': 'High Intensity Training',
+        'hr_above': 170, 'hrv_below': 50,
+        'message': 'Extended high-intensity activity detected. Monitor recovery.',
+        'level': 'medium'
+    },
+    {
+        'name': 'Overtraining Risk',
+        'hr_above': 150, 'hrv_below': 40,
+        'message': 'Potential overtraining detected. Rest recommended.',
+        'level': 'high'
+    },
+    {
+        'name': 'Poor Recovery',
+        'hr_above': 80, 'hrv_below': 30,
+        'message': 'Poor recovery indicators. Consider rest day.',
+        'level': 'high'
+    }
+]
+
+
+# Columns of AthletePopulation.telemetry(), in order
+TELEMETRY_FIELDS = ('heart_rate', 'hrv', 'steps', 'sleep_hours', 'activity', 'calories_burned',
+                    'stress_level', 'recovery_score', 'hydration_level', 'is_sleeping', 'risks')
+HISTORY_COLUMNS = [TELEMETRY_FIELDS.index(field) for field in HISTORY_FIELDS]
+
+
+def _table(values):
+    return np.array([values[activity] for activity in ACTIVITIES], dtype=float)
+
+
+class AthletePopulation:
+    """State of every simulated athlete, one NumPy array per metric.
+
+    Athlete i lives in row i of each array (structure of arrays), so one
+    step() advances the whole population with a handful of vectorized
+    operations and one draw per random quantity from a seeded Generator.
+    The model is the one the per-athlete simulator used: activities switch
+    with 10% probability, heart rate moves 20% of the way towards a target
+    drawn from the activity's range (plus stress and occasional spikes),
+    stress, HRV, recovery and hydration follow from those, and sleep starts
+    between 21:00 and 23:00 and ends between 06:00 and 08:00.
+    """
+
+    def __init__(self, seed=None, capacity=1024):
+        self.rng = np.random.default_rng(seed)
+        self.size = 0
+        self.ids = []
+        self.index = {}
+        self.teams = {}
+        self._allocate(capacity)
+
+        self.hr_low = _table({a: ACTIVITY_PATTERNS[a]['hr_range'][0] for a in ACTIVITIES})
+        self.hr_high = _table({a: ACTIVITY_PATTERNS[a]['hr_range'][1] for a in ACTIVITIES})
+        self.steps_low = _table({a: ACTIVITY_PATTERNS[a]['steps_per_min'][0] for a in ACTIVITIES})
+        self.steps_high = _table({a: ACTIVITY_PATTERNS[a]['steps_per_min'][1] for a in ACTIVITIES})
+        self.stress_change = _table(ACTIVITY_STRESS)
+        self.dehydration = _table(ACTIVITY_DEHYDRATION)
+        self.calories_per_min = _table(MET_VALUES) * 3.5 * 70 / 200
+        self.risk_hr = np.array([scenario['hr_above'] for scenario in RISK_SCENARIOS], dtype=float)
+        self.risk_hrv = np.array([scenario['hrv_below'] for scenario in RISK_SCENARIOS], dtype=float)
+        risk_lists = [
+            [{'name': scenario['name'], 'message': scenario['message'], 'level': scenario['level']}
+             for bit, scenario in enumerate(RISK_SCENARIOS) if code >> bit & 1]
+            for code in range(1 << len(RISK_SCENARIOS))
+        ]
+        decoders = {
+            'sleep_hours': float,
+            'activity': lambda code: ACTIVITIES[int(code)],
+            'is_sleeping': bool,
+            'risks': lambda code: list(risk_lists[int(code)])
+        }
+        self._decoders = [decoders.get(field, int) for field in TELEMETRY_FIELDS]
+
+    def _allocate(self, capacity):
+        old = getattr(self, 'heart_rate', None)
+        fields = {
+            'heart_rate': float, 'steps': float, 'sleep_hours': float, 'hrv': float,
+            'activity': np.int8, 'activity_duration': float, 'calories_burned': float,
+            'stress_level': float, 'recovery_score': float, 'hydration_level': float,
+            'is_sleeping': bool, 'sleep_start': float, 'last_update': float
+        }
+        for name, dtype in fields.items():
+            array = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                array[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self, athlete_id, now=None, team=None):
+        """Add an athlete in the usual starting state; returns its row"""
+        if athlete_id in self.index:
+            return self.index[athlete_id]
+        if team is not None:
+            self.teams.setdefault(str(team), []).append(athlete_id)
+        if self.size == self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.size
+        self.heart_rate[i] = 70
+        self.steps[i] = 0
+        self.sleep_hours[i] = 0
+        self.hrv[i] = 65
+        self.activity[i] = ACTIVITIES.index('resting')
+        self.activity_duration[i] = 0
+        self.calories_burned[i] = 0
+        self.stress_level[i] = 50  # 0-100 scale
+        self.recovery_score[i] = 85  # 0-100 scale
+        self.hydration_level[i] = 100  # 0-100 scale
+        self.is_sleeping[i] = False
+        self.sleep_start[i] = np.nan
+        self.last_update[i] = time.time() if now is None else now
+        self.ids.append(athlete_id)
+        self.index[athlete_id] = i
+        self.size += 1
+        return i
+
+    def step(self, now=None):
+        """Advance every athlete to now (epoch seconds)"""
+        n = self.size
+        if not n:
+            return
+        now = time.time() if now is None else now
+        hour = datetime.fromtimestamp(now).hour
+        rng = self.rng
+        dt = now - self.last_update[:n]
+
+        # Activity: 10% chance to pick one of the four at random
+        activity = self.activity[:n]
+        switch = rng.random(n) < 0.1
+        activity[switch] = rng.integers(0, len(ACTIVITIES), int(switch.sum()))
+        self.activity_duration[:n] += dt
+
+        # Heart rate drifts towards a target from the activity's range
+        target = rng.uniform(self.hr_low[activity], self.hr_high[activity])
+        target += (rng.random(n) < 0.05) * rng.uniform(20, 40, n)  # 5% chance of a spike
+        target += self.stress_level[:n] / 100 * 20
+        heart_rate = self.heart_rate[:n]
+        heart_rate += (target - heart_rate) * 0.2 + rng.uniform(-5, 5, n)
+        np.clip(heart_rate, 45, 200, out=heart_rate)
+
+        self.steps[:n] += rng.uniform(self.steps_low[activity], self.steps_high[activity]) * (dt / 60)
+
+        # Sleep starts between 21:00 and 23:00, ends between 06:00 and 08:00
+        is_sleeping = self.is_sleeping[:n]
+        if 21 <= hour <= 23:
+            fall_asleep = ~is_sleeping & (rng.random(n) < 0.3)
+            is_sleeping[fall_asleep] = True
+            self.sleep_start[:n][fall_asleep] = now
+        elif 6 <= hour <= 8:
+            wake = is_sleeping & (rng.random(n) < 0.3)
+            is_sleeping[wake] = False
+            started = wake & ~np.isnan(self.sleep_start[:n])
+            self.sleep_hours[:n][started] = (now - self.sleep_start[:n][started]) / 3600
+            self.sleep_start[:n][wake] = np.nan
+
+        stress = self.stress_level[:n]
+        stress += (self.stress_change[activity] + rng.uniform(-5, 5, n) - 10 * is_sleeping) * 0.1
+        np.clip(stress, 0, 100, out=stress)
+
+        sleep_hours = self.sleep_hours[:n]
+        hrv = self.hrv[:n]
+        hrv[:] = 100 - heart_rate * 0.3 - stress * 0.2 + sleep_hours * 2 + rng.uniform(-5, 5, n)
+        np.clip(hrv, 20, 100, out=hrv)
+
+        recovery = self.recovery_score[:n]
+        recovery[:] = (hrv + np.minimum(sleep_hours * 10, 80) + (100 - stress)) / 3 + rng.uniform(-5, 5, n)
+        np.clip(recovery, 0, 100, out=recovery)
+
+        # 10% chance of a drink, then the activity's dehydration rate per hour
+        hydration = self.hydration_level[:n]
+        drink = rng.random(n) < 0.1
+        hydration[drink] = np.minimum(100, hydration[drink] + rng.uniform(5, 15, int(drink.sum())))
+        hydration -= self.dehydration[activity] * (dt / 3600)
+        np.clip(hydration, 0, 100, out=hydration)
+
+        self.calories_burned[:n] += self.calories_per_min[activity] * (dt / 60)
+        self.last_update[:n] = now
+
+    def telemetry(self, rows=None):
+        """Client-facing values of the given rows (default all) as a (rows x TELEMETRY_FIELDS) matrix.
+
+        Values are rounded the way clients see them, so two matrices differ
+        only where a client would notice; decode() turns a row back into
+        the JSON payload.
+        """
+        if rows is None:
+            # Slicing keeps the per-field reads below as views
+            rows, count = slice(0, self.size), self.size
+        else:
+            rows = np.asarray(rows, dtype=np.intp)
+            count = len(rows)
+        values = np.empty((count, len(TELEMETRY_FIELDS)))
+        values[:, 0] = np.rint(self.heart_rate[rows])
+        values[:, 1] = np.rint(self.hrv[rows])
+        values[:, 2] = np.trunc(self.steps[rows])
+        values[:, 3] = np.round(self.sleep_hours[rows], 1)
+        values[:, 4] = self.activity[rows]
+        values[:, 5] = np.trunc(self.calories_burned[rows])
+        values[:, 6] = np.rint(self.stress_level[rows])
+        values[:, 7] = np.rint(self.recovery_score[rows])
+        values[:, 8] = np.rint(self.hydration_level[rows])
+        values[:, 9] = self.is_sleeping[rows]
+        # Risk flags as a bitmask over RISK_SCENARIOS
+        flags = ((self.heart_rate[rows][:, np.newaxis] > self.risk_hr) &
+                 (self.hrv[rows][:, np.newaxis] < self.risk_hrv))
+        values[:, 10] = flags @ (1 << np.arange(len(RISK_SCENARIOS)))
+        return values
+
+    def decode(self, values, columns=None):
+        """Payload dict for one telemetry() row, limited to the given column positions"""
+        columns = range(len(TELEMETRY_FIELDS)) if columns is None else columns
+        return {TELEMETRY_FIELDS[c]: self._decoders[c](values[c]) for c in columns}
+
+    def snapshot(self, t, tick, base=None):
+        """A PopulationSnapshot of the current state; with base, only rows added since are computed"""
+        if base is None:
+            values = self.telemetry()
+        else:
+            values = np.concatenate([base.values, self.telemetry(np.arange(base.size, self.size))])
+        return PopulationSnapshot(t, tick, self.index, values)
+
+    def payloads(self, rows=None):
+        """(athlete_id, data) for the given rows (default all), as sent to clients"""
+        rows = np.arange(self.size) if rows is None else np.asarray(rows, dtype=np.intp)
+        return [(self.ids[row], self.decode(values)) for row, values in zip(rows.tolist(), self.telemetry(rows))]
+
+
+class PopulationSnapshot:
+    """Read-only view of every athlete's telemetry after one finished tick.
+
+    values is a frozen (athletes x TELEMETRY_FIELDS) matrix. index is the
+    population's own id -> row dict, shared rather than copied: rows are
+    only ever appended, so a row below size always belongs to the same
+    athlete, and a lookup never needs a lock.
+    """
+
+    __slots__ = ('t', 'tick', 'size', 'index', 'values')
+
+    def __init__(self, t, tick, index, values):
+        values.setflags(write=False)
+        self.t = t
+        self.tick = tick
+        self.size = len(values)
+        self.index = index
+        self.values = values
+
+    def get(self, athlete_id):
+        """The athlete's telemetry row, or None if it was not simulated at this tick"""
+        row = self.index.get(athlete_id)
+        if row is None or row >= self.size:
+            return None
+        return self.values[row]
+
+
 class FitnessSimulator:
-    def __init__(self, socketio: SocketIO):
+    """Simulated wearable data for every started athlete, pushed over Socket.IO.
+
+    All athletes are advanced together once per tick by an AthletePopulation.
+    Writers (the tick and start_simulation) serialise on a lock and finish
+    by publishing a new PopulationSnapshot with a single assignment; readers
+    such as metrics() only dereference self.snapshot, so they never block
+    and never see a half-finished tick. Only athletes someone watches are
+    sent, as batched delta frames built by a TelemetryFanout (see
+    utils/telemetry_fanout.py). The tick sleeps only for what is left of
+    its interval, and reports when it overruns. With a TelemetryHistory,
+    every snapshot is also appended to one shared ring of recent samples,
+    and with a TelemetryArchive, to one block of the on-disk archive.
+    """
+
+    def __init__(self, socketio: SocketIO, seed=None, interval=1.0, fanout=None, history=None, archive=None):
         self.socketio = socketio
+        self.interval = interval
         self.running = False
         self.thread = None
-        self.athlete_data = {}  # Store simulated data for each athlete
-        
-        # Define activity patterns
-        self.activity_patterns = {
-            'resting': {'hr_range': (60, 75), 'steps_per_min': (0, 5)},
-            'walking': {'hr_range': (75, 100), 'steps_per_min': (85, 110)},
-            'running': {'hr_range': (140, 180), 'steps_per_min': (150, 180)},
-            'workout': {'hr_range': (120, 160), 'steps_per_min': (30, 60)}
-        }
-        
-        # Define risk scenarios
-        self.risk_scenarios = [
-            {
-                'name': 'High Intensity Training',
-                'condition': lambda hr, hrv: hr > 170 and hrv < 50,
-                'message': 'Extended high-intensity activity detected. Monitor recovery.',
-                'level': 'medium'
-            },
-            {
-                'name': 'Overtraining Risk',
-                'condition': lambda hr, hrv: hr > 150 and hrv < 40,
-                'message': 'Potential overtraining detected. Rest recommended.',
-                'level': 'high'
-            },
-            {
-                'name': 'Poor Recovery',
-                'condition': lambda hr, hrv: hr > 80 and hrv < 30,
-                'message': 'Poor recovery indicators. Consider rest day.',
-                'level': 'high'
-            }
-        ]
-        
-    def start_simulation(self, athlete_id):
+        self.population = AthletePopulation(seed)
+        self.fanout = fanout or TelemetryFanout(socketio)
+        self.activity_patterns = ACTIVITY_PATTERNS
+        self.risk_scenarios = RISK_SCENARIOS
+        self.ticks = 0
+        self.history = history
+        self.history_ring = history.block() if history is not None else None
+        self._history_rows = 0
+        self.archive = archive
+        self.archive_block = archive.block() if archive is not None else None
+        self._lock = threading.Lock()
+        self.snapshot = self.population.snapshot(time.time(), self.ticks)
+
+    def start_simulation(self, athlete_id, team=None):
         """Start simulation for a specific athlete"""
-        if athlete_id not in self.athlete_data:
-            self.athlete_data[athlete_id] = {
-                'heart_rate': 70,
-                'steps': 0,
-                'sleep_hours': 0,
-                'hrv': 65,
-                'last_update': datetime.now(),
-                'sleep_start': None,
-                'is_sleeping': False,
-                'current_activity': 'resting',
-                'activity_duration': 0,
-                'daily_workout_done': False,
-                'calories_burned': 0,
-                'stress_level': 50,  # 0-100 scale
-                'recovery_score': 85,  # 0-100 scale
-                'hydration_level': 100,  # 0-100 scale
-                'last_meal_time': datetime.now() - timedelta(hours=2),
-                'supplements_taken': []
-            }
-        
+        with self._lock:
+            row = self.population.add(athlete_id, team=team)
+            if row >= self.snapshot.size:
+                # Visible to readers right away, in its starting state
+                self.snapshot = self.population.snapshot(self.snapshot.t, self.snapshot.tick, base=self.snapshot)
+
         if not self.running:
             self.running = True
             self.thread = threading.Thread(target=self._simulation_loop)
             self.thread.daemon = True
             self.thread.start()
-    
-    def _simulate_activity_change(self, data):
-        """Simulate random activity pattern changes"""
-        if random.random() < 0.1:  # 10% chance to change activity
-            activities = list(self.activity_patterns.keys())
-            return random.choice(activities)
-        return data['current_activity']
-
-    def _simulate_heart_rate(self, current_hr, activity, stress_level):
-        """Simulate heart rate with random spikes"""
-        hr_range = self.activity_patterns[activity]['hr_range']
-        target_hr = random.uniform(*hr_range)
-        
-        # Random spikes for demo
-        if random.random() < 0.05:  # 5% chance of spike
-            target_hr += random.uniform(20, 40)
-        
-        # Add stress influence
-        stress_factor = stress_level / 100 * 20
-        target_hr += stress_factor
-        
-        # Gradual change towards target
-        hr_change = (target_hr - current_hr) * 0.2
-        hr_change += random.uniform(-5, 5)  # More variation
-        
-        new_hr = current_hr + hr_change
-        return max(min(new_hr, 200), 45)
-
-    def _simulate_steps(self, current_steps, activity, duration):
-        """Simulate step count based on activity"""
-        steps_range = self.activity_patterns[activity]['steps_per_min']
-        steps_per_min = random.uniform(*steps_range)
-        new_steps = current_steps + (steps_per_min * (duration / 60))
-        return new_steps
-
-    def _simulate_hrv(self, heart_rate, stress_level, sleep_hours):
-        """Simulate Heart Rate Variability"""
-        base_hrv = 100 - (heart_rate * 0.3)  # Lower HR generally means higher HRV
-        stress_impact = stress_level * 0.2  # Higher stress reduces HRV
-        sleep_impact = sleep_hours * 2  # More sleep improves HRV
-        
-        hrv = base_hrv - stress_impact + sleep_impact
-        hrv += random.uniform(-5, 5)  # Add some variation
-        
-        return max(min(hrv, 100), 20)  # Keep within realistic bounds
-
-    def _simulate_sleep(self, data):
-        """Simulate sleep patterns"""
-        current_time = datetime.now()
-        hour = current_time.hour
-        
-        # Start sleep between 21:00 and 23:00
-        if not data['is_sleeping'] and 21 <= hour <= 23 and random.random() < 0.3:
-            data['is_sleeping'] = True
-            data['sleep_start'] = current_time
-        
-        # Wake up between 6:00 and 8:00
-        elif data['is_sleeping'] and 6 <= hour <= 8 and random.random() < 0.3:
-            data['is_sleeping'] = False
-            if data['sleep_start']:
-                sleep_duration = (current_time - data['sleep_start']).total_seconds() / 3600
-                data['sleep_hours'] = sleep_duration
-                data['sleep_start'] = None
-
-    def _simulate_stress(self, data):
-        """Simulate stress levels"""
-        base_stress = data['stress_level']
-        activity_stress = {
-            'resting': -5,
-            'walking': 0,
-            'running': 10,
-            'workout': 15
-        }
-        
-        stress_change = activity_stress[data['current_activity']]
-        stress_change += random.uniform(-5, 5)
-        
-        # Recovery during sleep
-        if data['is_sleeping']:
-            stress_change -= 10
-        
-        new_stress = base_stress + (stress_change * 0.1)  # Gradual change
-        return max(min(new_stress, 100), 0)
-
-    def _calculate_recovery_score(self, data):
-        """Calculate recovery score based on various metrics"""
-        hrv_factor = data['hrv']
-        sleep_factor = min(data['sleep_hours'] * 10, 80)  # Cap at 8 hours
-        stress_factor = 100 - data['stress_level']
-        
-        recovery_score = (hrv_factor + sleep_factor + stress_factor) / 3
-        recovery_score += random.uniform(-5, 5)  # Add variation
-        
-        return max(min(recovery_score, 100), 0)
-
-    def _simulate_hydration(self, data):
-        """Simulate hydration levels"""
-        activity_dehydration = {
-            'resting': 0.5,
-            'walking': 1,
-            'running': 3,
-            'workout': 2.5
-        }
-        
-        # Calculate time since last update
-        time_diff = (datetime.now() - data['last_update']).total_seconds() / 3600
-        dehydration_rate = activity_dehydration[data['current_activity']]
-        
-        # Random hydration events (drinking water)
-        if random.random() < 0.1:  # 10% chance of drinking water
-            hydration_gain = random.uniform(5, 15)
-            data['hydration_level'] = min(100, data['hydration_level'] + hydration_gain)
-        
-        # Calculate dehydration
-        hydration_loss = dehydration_rate * time_diff
-        new_hydration = data['hydration_level'] - hydration_loss
-        
-        return max(min(new_hydration, 100), 0)
+
+    def metrics(self, athlete_id):
+        """Current data for one athlete from the latest snapshot, or None if it is not simulated"""
+        values = self.snapshot.get(athlete_id)
+        if values is None:
+            return None
+        data = self.population.decode(values)
+        del data['risks']
+        return data
+
+    def tick(self, now=None):
+        """Advance all athletes one step and publish the snapshot; returns the telemetry frames now due"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self.population.step(now)
+            self.ticks += 1
+            snapshot = self.snapshot = self.population.snapshot(now, self.ticks)
+        if self.history is not None or self.archive is not None:
+            self._record(snapshot)
+        if not self.fanout.watched():
+            return []
+        return self.fanout.collect(self.population, snapshot)
+
+    def _record(self, snapshot):
+        """Append a snapshot to the history ring and archive, registering athletes new since the last one"""
+        values = snapshot.values[:, HISTORY_COLUMNS]
+        columns = {field: values[:, i] for i, field in enumerate(HISTORY_FIELDS)}
+        if self.history is not None:
+            ring = self.history_ring
+            if snapshot.size > self._history_rows:
+                ring.resize(snapshot.size)
+                ids = self.population.ids
+                for row in range(self._history_rows, snapshot.size):
+                    self.history.bind(ids[row], ring, row, snapshot.t)
+                self._history_rows = snapshot.size
+            ring.append(snapshot.t, columns, snapshot.size)
+        if self.archive is not None:
+            block = self.archive_block
+            for row in range(block.width, snapshot.size):
+                self.archive.bind(self.population.ids[row], block)
+            block.append(snapshot.t, columns, snapshot.size)
 
     def _simulation_loop(self):
         """Main simulation loop"""
         while self.running:
-            current_time = datetime.now()
-            
-            for athlete_id, data in self.athlete_data.items():
-                try:
-                    # Calculate time difference since last update
-                    time_diff = (current_time - data['last_update']).total_seconds()
-                    
-                    # Update activity
-                    data['current_activity'] = self._simulate_activity_change(data)
-                    data['activity_duration'] += time_diff
-                    
-                    # Update metrics
-                    data['heart_rate'] = self._simulate_heart_rate(
-                        data['heart_rate'],
-                        data['current_activity'],
-                        data['stress_level']
-                    )
-                    
-                    data['steps'] = self._simulate_steps(
-                        data['steps'],
-                        data['current_activity'],
-                        time_diff
-                    )
-                    
-                    # Simulate sleep patterns
-                    self._simulate_sleep(data)
-                    
-                    # Update stress levels
-                    data['stress_level'] = self._simulate_stress(data)
-                    
-                    # Update HRV based on current conditions
-                    data['hrv'] = self._simulate_hrv(
-                        data['heart_rate'],
-                        data['stress_level'],
-                        data['sleep_hours']
-                    )
-                    
-                    # Update recovery score
-                    data['recovery_score'] = self._calculate_recovery_score(data)
-                    
-                    # Update hydration
-                    data['hydration_level'] = self._simulate_hydration(data)
-                    
-                    # Calculate calories burned
-                    met_values = {
-                        'resting': 1.0,
-                        'walking': 3.5,
-                        'running': 8.0,
-                        'workout': 6.0
-                    }
-                    calories_per_min = met_values[data['current_activity']] * 3.5 * 70 / 200
-                    data['calories_burned'] += calories_per_min * (time_diff / 60)
-                    
-                    # Check for risk scenarios
-                    risks = []
-                    for scenario in self.risk_scenarios:
-                        if scenario['condition'](data['heart_rate'], data['hrv']):
-                            risks.append({
-                                'name': scenario['name'],
-                                'message': scenario['message'],
-                                'level': scenario['level']
-                            })
-                    
-                    # Emit data via Socket.IO
-                    self.socketio.emit('athlete_update', {
-                        'athlete_id': athlete_id,
-                        'data': {
-                            'heart_rate': round(data['heart_rate']),
-                            'hrv': round(data['hrv']),
-                            'steps': int(data['steps']),
-                            'sleep_hours': round(data['sleep_hours'], 1),
-                            'activity': data['current_activity'],
-                            'calories_burned': int(data['calories_burned']),
-                            'stress_level': round(data['stress_level']),
-                            'recovery_score': round(data['recovery_score']),
-                            'hydration_level': round(data['hydration_level']),
-                            'is_sleeping': data['is_sleeping'],
-                            'risks': risks
-                        }
-                    })
-                    
-                    # Update last update timestamp
-                    data['last_update'] = current_time
-                    
-                except Exception as e:
-                    print(f"Error in simulation loop for athlete {athlete_id}: {str(e)}")
-            
-            time.sleep(1)  # Update every second
-    
+            started = time.monotonic()
+            try:
+                self.fanout.send(self.tick())
+            except Exception as e:
+                print(f"Error in simulation loop: {str(e)}")
+
+            elapsed = time.monotonic() - started
+            if elapsed > self.interval:
+                print(f"Simulation tick for {self.population.size} athletes took {elapsed:.2f}s")
+            time.sleep(max(0.0, self.interval - elapsed))
+
     def stop_simulation(self):
         """Stop the simulation"""
         self.running = False
@@ -50,6 +50,8 @@ class TestDeviceSimulator:
         ]
         self.connected_device = None
         self.scanning = False
+        # Optional utils.telemetry_history.TelemetryHistory that keeps what we collect
+        self.history = None
 
     async def scan_devices(self):
         """Simulate device scanning."""
@@ -123,7 +125,11 @@ class TestDeviceSimulator:
             
             # Simulate collecting data points
             while (datetime.now() - start_time).seconds < duration_seconds:
-                data_points.append(self.connected_device.get_data())
+                data = self.connected_device.get_data()
+                data_points.append(data)
+                if self.history is not None:
+                    timestamp = datetime.fromisoformat(data['timestamp']).timestamp()
+                    self.history.record(f"device:{self.connected_device.address}", timestamp, data)
                 await asyncio.sleep(1)  # Collect data every second
                 
             return {
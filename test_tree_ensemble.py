@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_tree_ensemble import app_models, random_rows
+from utils.tree_ensemble import compile_ensemble
+
+
+def rows_with_nan(count, seed=2, rate=0.2):
+    """Random rows with about rate of the values missing"""
+    X = random_rows(count, seed)
+    X[np.random.default_rng(seed).random(X.shape) < rate] = np.nan
+    return X
+
+
+def batches(X):
+    """The batch shapes the app scores: one row, a micro-batch and a bulk batch"""
+    return X[:1], X[:64], X
+
+
+@pytest.mark.parametrize('train_rows', [0, 2000])
+def test_forest_classifier_parity(train_rows):
+    classifier, _ = app_models(train_rows)
+    compiled = compile_ensemble(classifier, bulk_rows=None)
+    for X in batches(random_rows(1000)) + batches(rows_with_nan(1000)):
+        assert np.array_equal(classifier.predict_proba(X), compiled.predict_proba(X))
+        assert np.array_equal(classifier.predict(X), compiled.predict(X))
+
+
+def test_forest_classifier_trained_with_nan_parity():
+    classifier, _ = app_models(2000)
+    X = rows_with_nan(2000, seed=5, rate=0.1)
+    classifier.fit(X, np.where(np.nan_to_num(X[:, 0]) > 50, 'caution', 'safe'))
+    compiled = compile_ensemble(classifier, bulk_rows=None)
+    for X in batches(rows_with_nan(1000)):
+        assert np.array_equal(classifier.predict_proba(X), compiled.predict_proba(X))
+        assert np.array_equal(classifier.predict(X), compiled.predict(X))
+
+
+@pytest.mark.parametrize('train_rows', [0, 2000])
+def test_gradient_boosting_regressor_parity(train_rows):
+    _, regressor = app_models(train_rows)
+    compiled = compile_ensemble(regressor, bulk_rows=None)
+    for X in batches(random_rows(1000)):
+        assert np.array_equal(regressor.predict(X), compiled.predict(X))
+
+
+def test_gradient_boosting_regressor_rejects_nan():
+    _, regressor = app_models(0)
+    compiled = compile_ensemble(regressor, bulk_rows=None)
+    X = rows_with_nan(10)
+    with pytest.raises(ValueError):
+        regressor.predict(X)
+    with pytest.raises(ValueError):
+        compiled.predict(X)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
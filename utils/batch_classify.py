@@ -0,0 +1,37 @@
+import numpy as np
+
+# Column order the supplement classifier was trained on
+SUPPLEMENT_FEATURES = ('protein_content', 'stimulant_level', 'hormone_level', 'synthetic_compounds')
+
+
+def feature_row(features, names=SUPPLEMENT_FEATURES):
+    """One feature vector from a {name: value} dict or a plain sequence"""
+    if isinstance(features, dict):
+        return [float(features[name]) for name in names]
+    row = [float(value) for value in features]
+    if len(row) != len(names):
+        raise ValueError(f"Expected {len(names)} features, got {len(row)}")
+    return row
+
+
+def classify_batch(classifier, rows):
+    """Classify many rows with a single predict_proba call.
+
+    Labels are derived from the probabilities (classes_[argmax]), which is
+    exactly what predict() does for sklearn's forest and tree classifiers,
+    so the model is evaluated once per batch instead of twice per row.
+    Returns a list of {'prediction', 'confidence', 'probabilities'}.
+    """
+    if not len(rows):
+        return []
+    X = np.asarray(rows, dtype=float)
+    proba = classifier.predict_proba(X)
+    best = proba.argmax(axis=1)
+    labels = classifier.classes_[best]
+    confidences = proba[np.arange(len(best)), best]
+    classes = [str(label) for label in classifier.classes_]
+    return [{
+        'prediction': str(label),
+        'confidence': float(confidence),
+        'probabilities': dict(zip(classes, (float(p) for p in row)))
+    } for label, confidence, row in zip(labels, confidences, proba)]
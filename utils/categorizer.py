@@ -0,0 +1,136 @@
+import re
+from bisect import bisect_right
+
+try:
+    import ahocorasick
+except ImportError:  # Fall back to one combined regex over all keywords
+    ahocorasick = None
+
+# Joins texts in a batch; no keyword contains it, so matches never span two texts
+_SEPARATOR = '\x00'
+
+
+class KeywordCategorizer:
+    """Multi-pattern keyword matcher compiled once from a {category: [keywords]} table.
+
+    Every keyword is compiled into a single engine that finds all of them in
+    one pass over the text: an Aho-Corasick automaton when pyahocorasick is
+    installed, otherwise one alternation regex with longer keywords first.
+    classify() and matches() stop at the first deciding hit, categorize()
+    counts them all. The automaton counts overlapping occurrences too (e.g.
+    'doping' inside 'anti-doping'); the regex does not, so a keyword that
+    only occurs inside a longer one (e.g. 'test' in 'latest') goes uncounted.
+    """
+
+    def __init__(self, table, default=None, whole_words=False, backend='auto'):
+        self.categories = list(table)
+        self.default = default
+        self.whole_words = whole_words
+
+        self._keyword_categories = {}
+        for category, keywords in table.items():
+            for keyword in keywords:
+                self._keyword_categories.setdefault(keyword.lower(), []).append(category)
+        # Table position of the first category each keyword belongs to
+        self._keyword_rank = {
+            keyword: self.categories.index(categories[0]) for keyword, categories in self._keyword_categories.items()
+        }
+
+        self._automaton = None
+        self._pattern = None
+        if ahocorasick and backend != 'regex':
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self._keyword_categories:
+                self._automaton.add_word(keyword, (keyword, len(keyword) - 1))
+            self._automaton.make_automaton()
+        else:
+            pattern = '|'.join(sorted(map(re.escape, self._keyword_categories), key=len, reverse=True))
+            self._pattern = re.compile(rf'\b(?:{pattern})\b' if whole_words else pattern)
+
+    @property
+    def backend(self):
+        return 'aho-corasick' if self._automaton else 'regex'
+
+    def classify(self, title, description=''):
+        """Return the primary category for a title and description, without counting"""
+        if not self._keyword_rank:
+            return self.default
+        best = len(self.categories)
+        for _, keyword in self._scan(f"{title or ''}{_SEPARATOR}{description or ''}".lower()):
+            best = min(best, self._keyword_rank[keyword])
+            if best == 0:
+                break
+        return self.categories[best] if best < len(self.categories) else self.default
+
+    def classify_batch(self, pairs):
+        """classify() for a list of (title, description) pairs"""
+        return [self.classify(title, description) for title, description in pairs]
+
+    def match_counts(self, text):
+        """Return {category: number of keyword occurrences} for one text"""
+        return self.categorize_many([text])[0]
+
+    def categorize(self, title, description=''):
+        """Return (primary category, {category: count}) for a title and description"""
+        return self.categorize_batch([(title, description)])[0]
+
+    def categorize_batch(self, pairs):
+        """categorize() for a list of (title, description) pairs, in one scan"""
+        all_counts = self.categorize_many([f"{title or ''}{_SEPARATOR}{description or ''}" for title, description in pairs])
+        return [(self.primary(counts), counts) for counts in all_counts]
+
+    def categorize_many(self, texts):
+        """Count category matches for a batch of texts in one scan"""
+        texts = [(t or '').lower() for t in texts]
+        results = [{} for _ in texts]
+        if not texts:
+            return results
+
+        blob = _SEPARATOR.join(texts)
+        # Start offset of every text inside the blob, to map matches back
+        offsets = []
+        position = 0
+        for text in texts:
+            offsets.append(position)
+            position += len(text) + 1
+
+        for start, keyword in self._scan(blob):
+            counts = results[bisect_right(offsets, start) - 1]
+            for category in self._keyword_categories[keyword]:
+                counts[category] = counts.get(category, 0) + 1
+        return results
+
+    def _scan(self, blob):
+        """Yield (start, keyword) for every keyword match in blob, in one pass"""
+        if self._pattern:
+            for match in self._pattern.finditer(blob):
+                yield match.start(), match.group()
+            return
+
+        for end, (keyword, length) in self._automaton.iter(blob):
+            start = end - length
+            if self.whole_words and not (self._starts_word(blob, start) and self._ends_word(blob, end + 1)):
+                continue
+            yield start, keyword
+
+    def primary(self, counts):
+        """First category in table order that matched, or the default"""
+        for category in self.categories:
+            if counts.get(category):
+                return category
+        return self.default
+
+    def matches(self, title, description=''):
+        """True if any keyword occurs in the title or description"""
+        if not self._keyword_rank:
+            return False
+        text = f"{title or ''}{_SEPARATOR}{description or ''}".lower()
+        return next(self._scan(text), None) is not None
+
+    @staticmethod
+    def _starts_word(text, start):
+        return start == 0 or not (text[start - 1].isalnum() or text[start - 1] == '_')
+
+    @staticmethod
+    def _ends_word(text, end):
+        return end >= len(text) or not (text[end].isalnum() or text[end] == '_')
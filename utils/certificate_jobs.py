@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+# Stages a job moves through; each one is persisted before the next starts
+STAGE_RENDER = 'render'
+STAGE_MINT = 'mint'
+STAGE_CONFIRM = 'confirm'
+STAGE_STAMP = 'stamp'
+STAGE_DONE = 'done'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS certificate_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    pdf_path TEXT,
+    token_id TEXT,
+    tx_hash TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS certificate_jobs_ready ON certificate_jobs (status, available_at);
+"""
+
+
+class CertificateJobQueue:
+    """Durable background pipeline for quiz certificates.
+
+    Jobs live in a local SQLite file, so they survive restarts and every
+    worker process shares one queue. A job renders the PDF first, so it can
+    be downloaded straight away. If a recipient was given, the job then mints
+    the token and re-renders the PDF stamped with the token id. Each stage is
+    recorded before the next one starts. A job picked up again after a crash
+    (its lease expired) resumes at the stage it reached and does not mint a
+    second time once a token id is stored.
+
+    render(payload, token_id) returns the PDF filename. mint(payload)
+    returns a token id. on_update(job) is called after every stage. All
+    three are supplied by the app, so the queue can run without a chain.
+
+    Instead of mint, the app can pass submit(payload), which sends the
+    transaction and returns its hash, and confirm(tx_hash), which returns
+    a Future for the token id. The job then waits in the 'confirm' stage
+    without holding a worker thread. The hash is stored, so after a
+    restart the job is re-attached to the same transaction instead of
+    minting again. A confirmation that times out (TimeoutError) is
+    unresolved, not failed: the job stays in 'confirm' and keeps watching
+    the same hash for as long as it takes. Only a definite answer, a
+    reverted or replaced transaction, sends the job back to be minted
+    again, and only those count towards max_attempts.
+    """
+
+    def __init__(self, db_path, render, mint=None, on_update=None, workers=2,
+                 max_attempts=3, retry_delay=30, lease=300, submit=None, confirm=None,
+                 confirm_timeout=600):
+        self.db_path = db_path
+        self.render = render
+        self.mint = mint
+        self.submit = submit
+        self.confirm = confirm
+        self.confirm_timeout = confirm_timeout
+        self.on_update = on_update
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # Queues created before tx_hash was tracked
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(certificate_jobs)")}
+            if 'tx_hash' not in columns:
+                conn.execute("ALTER TABLE certificate_jobs ADD COLUMN tx_hash TEXT")
+
+    def enqueue(self, payload):
+        """Record a certificate job and return its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO certificate_jobs (job_id, status, stage, payload, available_at, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, STAGE_RENDER, json.dumps(payload, default=str), now, now, now)
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id, payload=False):
+        """Return the status of a job (with its payload if asked), or None"""
+        row = self._connect().execute(
+            "SELECT * FROM certificate_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return self._to_job(row, payload=payload) if row else None
+
+    def start(self):
+        """Start the worker threads (once per process)"""
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'certificate-worker-{i}')
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def run_pending(self):
+        """Process every job that is ready now in the calling thread; returns the number processed"""
+        processed = 0
+        while True:
+            job = self._claim()
+            if not job:
+                return processed
+            self._process(job)
+            processed += 1
+
+    def _run(self):
+        while True:
+            try:
+                if self.run_pending():
+                    continue
+            except Exception as e:
+                logger.error(f"Certificate worker error: {str(e)}")
+            # Sleep until a new job arrives or a retry/lease falls due
+            self._wakeup.wait(timeout=5)
+            self._wakeup.clear()
+
+    def _claim(self):
+        """Atomically lease the oldest ready job, including ones whose lease expired"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM certificate_jobs "
+                "WHERE (status = 'queued' AND available_at <= ?) "
+                "OR (status IN ('running', 'waiting') AND lease_until < ?) "
+                "ORDER BY available_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE certificate_jobs SET status = 'running', lease_until = ?, updated_at = ? WHERE job_id = ?",
+                (now + self.lease, now, row['job_id'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self._to_job(row, payload=True)
+
+    def _process(self, job):
+        job_id = job['job_id']
+        payload = job['payload']
+        try:
+            if job['stage'] == STAGE_RENDER:
+                pdf_path = self.render(payload, None)
+                can_mint = self.mint or (self.submit and self.confirm)
+                next_stage = STAGE_MINT if can_mint and payload.get('recipient') else STAGE_DONE
+                job = self._save(job_id, stage=next_stage, pdf_path=pdf_path,
+                                 status='running' if next_stage != STAGE_DONE else 'completed')
+                self._publish(job)
+
+            if job['stage'] == STAGE_MINT and self.submit and self.confirm:
+                tx_hash = self.submit(payload)
+                job = self._save(job_id, stage=STAGE_CONFIRM, tx_hash=str(tx_hash), error=None)
+                self._publish(job)
+            elif job['stage'] == STAGE_MINT:
+                token_id = self.mint(payload)
+                job = self._save(job_id, stage=STAGE_STAMP, token_id=str(token_id), error=None)
+                self._publish(job)
+
+            if job['stage'] == STAGE_CONFIRM:
+                # Park the job; the confirmation callback moves it on to the stamp stage
+                job = self._save(job_id, status='waiting', lease_until=time.time() + self.confirm_timeout + self.lease)
+                self.confirm(job['tx_hash']).add_done_callback(partial(self._confirmed, job_id))
+                return
+
+            if job['stage'] == STAGE_STAMP:
+                pdf_path = self.render(payload, job['token_id'])
+                job = self._save(job_id, stage=STAGE_DONE, pdf_path=pdf_path, status='completed')
+                self._publish(job)
+        except Exception as e:
+            if job['stage'] == STAGE_CONFIRM:
+                # The transaction is out there; never give up on it because watching it failed
+                logger.error(f"Certificate job {job_id} could not watch {job['tx_hash']}: {str(e)}")
+                job = self._save(job_id, status='queued', error=str(e), available_at=time.time() + self.retry_delay)
+                self._publish(job)
+                return
+            attempts = job['attempts'] + 1
+            logger.error(f"Certificate job {job_id} failed at stage {job['stage']} (attempt {attempts}): {str(e)}")
+            if attempts < self.max_attempts:
+                # Back off before the next attempt at the same stage
+                job = self._save(job_id, status='queued', attempts=attempts, error=str(e),
+                                 available_at=time.time() + self.retry_delay * attempts)
+            else:
+                job = self._save(job_id, status='failed', attempts=attempts, error=str(e))
+            self._publish(job)
+
+    def _confirmed(self, job_id, future):
+        job = self.get(job_id, payload=True)
+        try:
+            token_id = future.result()
+            job = self._save(job_id, stage=STAGE_STAMP, token_id=str(token_id), status='queued',
+                             available_at=time.time(), error=None)
+        except TimeoutError as e:
+            # Unresolved: the transaction may still be mined, so keep watching the same hash
+            logger.warning(f"Certificate job {job_id} still waiting for {job['tx_hash']}: {str(e)}")
+            job = self._save(job_id, status='queued', error=str(e), available_at=time.time() + self.retry_delay)
+        except Exception as e:
+            # Reverted or replaced: nothing was minted, so mint again
+            attempts = job['attempts'] + 1
+            logger.error(f"Certificate job {job_id} confirmation failed (attempt {attempts}): {str(e)}")
+            if attempts < self.max_attempts:
+                job = self._save(job_id, stage=STAGE_MINT, status='queued', attempts=attempts,
+                                 error=str(e), available_at=time.time() + self.retry_delay * attempts)
+            else:
+                job = self._save(job_id, stage=STAGE_MINT, status='failed', attempts=attempts,
+                                 error=str(e))
+        self._publish(job)
+        self._wakeup.set()
+
+    def _publish(self, job):
+        if self.on_update:
+            try:
+                self.on_update(job)
+            except Exception as e:
+                logger.error(f"Error publishing certificate job {job['job_id']}: {str(e)}")
+
+    def _save(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        if fields.get('status') in ('queued', 'completed', 'failed'):
+            fields['lease_until'] = None
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE certificate_jobs SET {assignments} WHERE job_id = ?",
+                (*fields.values(), job_id)
+            )
+        return self.get(job_id, payload=True)
+
+    def _connect(self):
+        """One connection per thread; sqlite3 connections cannot be shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_job(row, payload=False):
+        job = {
+            'job_id': row['job_id'],
+            'status': row['status'],
+            'stage': row['stage'],
+            'pdf_path': row['pdf_path'],
+            'token_id': row['token_id'],
+            'tx_hash': row['tx_hash'],
+            'error': row['error'],
+            'attempts': row['attempts'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+        if payload:
+            job['payload'] = json.loads(row['payload'])
+        return job
@@ -0,0 +1,256 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from utils.rpc_batch import JSONRPCBatch
+
+logger = logging.getLogger(__name__)
+
+EVENTS = ('CertificateMinted', 'Transfer', 'CertificateRevoked', 'CertificateUpdated')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS certificates (
+    token_id INTEGER PRIMARY KEY,
+    owner TEXT,
+    recipient TEXT,
+    quiz_title TEXT,
+    score INTEGER,
+    date TEXT,
+    ipfs_hash TEXT,
+    timestamp INTEGER,
+    is_revoked INTEGER NOT NULL DEFAULT 0,
+    revoke_reason TEXT
+);
+CREATE INDEX IF NOT EXISTS certificates_owner ON certificates (owner);
+CREATE INDEX IF NOT EXISTS certificates_recipient ON certificates (recipient);
+CREATE TABLE IF NOT EXISTS transfers (
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    token_id INTEGER NOT NULL,
+    from_address TEXT NOT NULL,
+    to_address TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    PRIMARY KEY (tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS transfers_token ON transfers (token_id, block_number, log_index);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    timestamp INTEGER NOT NULL
+);
+"""
+
+
+class CertificateLedger:
+    """Local index of the certificate contract's events.
+
+    Follows the chain from a saved block cursor, reading all four event
+    types with one eth_getLogs per chunk of blocks, and keeps certificates
+    by token id and by owner in SQLite along with the timestamps of blocks
+    that carried a transfer. Verification and per-user listing then read
+    the index instead of scanning the chain.
+
+    Blocks within `confirmations` of the head are left for a later sync so
+    a shallow reorg cannot leave stale rows behind. Logs are decoded and
+    the new block timestamps fetched, in one JSON-RPC batch, before the
+    write transaction opens, so no RPC call runs while it holds the lock.
+    """
+
+    def __init__(self, w3, contract, db_path, start_block=0, confirmations=0,
+                 chunk_size=5000, min_sync_interval=2, session=None):
+        self.w3 = w3
+        self.session = session
+        self.contract = contract
+        self.db_path = db_path
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.chunk_size = chunk_size
+        self.min_sync_interval = min_sync_interval
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0
+
+        # topic0 -> contract event, to decode a mixed batch of logs
+        self._events = {}
+        for name in EVENTS:
+            event = getattr(self.contract.events, name)()
+            signature = f"{name}({','.join(i['type'] for i in event.abi['inputs'])})"
+            self._events[bytes(self.w3.keccak(text=signature))] = event
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    @property
+    def cursor(self):
+        """Last block that has been fully indexed"""
+        row = self._connect().execute("SELECT value FROM ledger_state WHERE key = 'cursor'").fetchone()
+        return row['value'] if row else self.start_block - 1
+
+    def sync(self, force=False):
+        """Index every event between the cursor and the confirmed head; returns the new cursor"""
+        if not force and time.monotonic() - self._last_sync < self.min_sync_interval:
+            return self.cursor
+        with self._sync_lock:
+            head = self.w3.eth.block_number - self.confirmations
+            cursor = self.cursor
+            while cursor < head:
+                to_block = min(cursor + self.chunk_size, head)
+                logs = self.w3.eth.get_logs({
+                    'address': self.contract.address,
+                    'fromBlock': cursor + 1,
+                    'toBlock': to_block
+                })
+                events = self._decode(logs)
+                timestamps = self._block_timestamps({
+                    event['blockNumber'] for event in events if event['event'] == 'Transfer'
+                })
+                self._apply(events, timestamps, cursor + 1, to_block)
+                cursor = max(to_block, self.cursor)
+            self._last_sync = time.monotonic()
+            return cursor
+
+    def get(self, token_id):
+        """Return the indexed certificate for token_id, or None"""
+        row = self._connect().execute(
+            "SELECT * FROM certificates WHERE token_id = ?", (int(token_id),)
+        ).fetchone()
+        return self._to_certificate(row) if row and row['recipient'] else None
+
+    def history(self, token_id):
+        """Transfers of token_id, oldest first, with block timestamps"""
+        rows = self._connect().execute(
+            "SELECT t.*, b.timestamp FROM transfers t LEFT JOIN blocks b ON b.number = t.block_number "
+            "WHERE t.token_id = ? ORDER BY t.block_number, t.log_index",
+            (int(token_id),)
+        ).fetchall()
+        return [{
+            'from': row['from_address'],
+            'to': row['to_address'],
+            'block_number': row['block_number'],
+            'timestamp': datetime.fromtimestamp(row['timestamp']).isoformat() if row['timestamp'] is not None else None,
+            'transaction_hash': row['tx_hash']
+        } for row in rows]
+
+    def tokens_of(self, address, by='recipient'):
+        """Token ids minted to (by='recipient') or currently held by (by='owner') an address"""
+        column = 'owner' if by == 'owner' else 'recipient'
+        rows = self._connect().execute(
+            f"SELECT token_id FROM certificates WHERE {column} = ? ORDER BY token_id",
+            (address.lower(),)
+        ).fetchall()
+        return [row['token_id'] for row in rows]
+
+    def _decode(self, logs):
+        """Decode the contract's events in a chunk of raw logs, skipping any it does not know"""
+        events = []
+        for log in logs:
+            event = self._events.get(bytes(log['topics'][0])) if log['topics'] else None
+            if event is not None:
+                events.append(event.process_log(log))
+        return events
+
+    def _block_timestamps(self, block_numbers):
+        """{number: timestamp} for blocks not indexed yet, fetched in one batch"""
+        known = {row['number'] for row in self._connect().execute(
+            f"SELECT number FROM blocks WHERE number IN ({','.join('?' * len(block_numbers))})",
+            tuple(block_numbers)
+        )} if block_numbers else set()
+        missing = sorted(block_numbers - known)
+        if not missing:
+            return {}
+        batch = JSONRPCBatch(self.w3, session=self.session)
+        for number in missing:
+            batch.add_block_timestamp(number)
+        timestamps = dict(zip(missing, batch.execute()))
+        for timestamp in timestamps.values():
+            if isinstance(timestamp, Exception):
+                raise timestamp
+        return timestamps
+
+    def _apply(self, events, timestamps, from_block, to_block):
+        """Write a chunk of decoded events and block timestamps and advance the cursor in one transaction"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker process may have indexed this chunk in the meantime
+            if self.cursor >= from_block:
+                conn.execute("COMMIT")
+                return
+
+            for event in events:
+                self._apply_event(conn, event)
+            for number, timestamp in sorted(timestamps.items()):
+                conn.execute("INSERT OR IGNORE INTO blocks (number, timestamp) VALUES (?, ?)", (number, timestamp))
+
+            conn.execute(
+                "INSERT INTO ledger_state (key, value) VALUES ('cursor', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (to_block,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _apply_event(conn, event):
+        args = event['args']
+        name = event['event']
+        if name == 'Transfer':
+            token_id = args['tokenId']
+            conn.execute(
+                "INSERT OR IGNORE INTO transfers (tx_hash, log_index, token_id, from_address, to_address, block_number) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (event['transactionHash'].hex(), event['logIndex'], token_id,
+                 args['from'], args['to'], event['blockNumber'])
+            )
+            conn.execute(
+                "INSERT INTO certificates (token_id, owner) VALUES (?, ?) "
+                "ON CONFLICT(token_id) DO UPDATE SET owner = excluded.owner",
+                (token_id, args['to'].lower())
+            )
+        elif name == 'CertificateMinted':
+            conn.execute(
+                "INSERT INTO certificates (token_id, recipient, quiz_title, score, date, ipfs_hash, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(token_id) DO UPDATE SET recipient = excluded.recipient, quiz_title = excluded.quiz_title, "
+                "score = excluded.score, date = excluded.date, ipfs_hash = excluded.ipfs_hash, "
+                "timestamp = excluded.timestamp",
+                (args['tokenId'], args['recipient'].lower(), args['quizTitle'], args['score'],
+                 args['date'], args['ipfsHash'], args['timestamp'])
+            )
+        elif name == 'CertificateRevoked':
+            conn.execute("UPDATE certificates SET is_revoked = 1, revoke_reason = ? WHERE token_id = ?",
+                         (args['reason'], args['tokenId']))
+        elif name == 'CertificateUpdated':
+            conn.execute("UPDATE certificates SET ipfs_hash = ? WHERE token_id = ?",
+                         (args['ipfsHash'], args['tokenId']))
+
+    def _connect(self):
+        """One connection per thread; sqlite3 connections cannot be shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _to_certificate(self, row):
+        return {
+            'recipient': self.w3.to_checksum_address(row['recipient']),
+            'owner': self.w3.to_checksum_address(row['owner']) if row['owner'] else None,
+            'quiz_title': row['quiz_title'],
+            'score': row['score'],
+            'date': row['date'],
+            'ipfs_hash': row['ipfs_hash'],
+            'timestamp': row['timestamp'],
+            'is_revoked': bool(row['is_revoked']),
+            'revoke_reason': row['revoke_reason']
+        }
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from web3 import AsyncWeb3, AsyncHTTPProvider
+
+try:
+    from web3 import WebsocketProviderV2
+except ImportError:  # Older web3 without persistent websockets; poll instead
+    WebsocketProviderV2 = None
+
+logger = logging.getLogger(__name__)
+
+
+class ConfirmationTracker:
+    """Resolves many pending transactions from one asyncio loop.
+
+    track() registers a transaction hash and returns a concurrent.futures
+    Future for its receipt. A single background thread runs the event loop.
+    Each new block is fetched once, its transaction hashes are matched
+    against everything pending, and receipts are fetched concurrently for
+    just the matches. Thousands of confirmations therefore cost a few RPC
+    calls per block instead of a blocked thread each. New heads come from an
+    eth_subscribe('newHeads') stream when a websocket URL is given and the
+    installed web3 supports it; otherwise the tracker polls eth_blockNumber
+    every poll_interval seconds. Every recheck_interval seconds all pending
+    receipts are also queried directly, as a safety net for anything a
+    scan could have missed.
+    """
+
+    def __init__(self, network_url, ws_url=None, poll_interval=1.0, timeout=600,
+                 recheck_interval=30, max_concurrency=32):
+        self.network_url = network_url
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.recheck_interval = recheck_interval
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._pending = {}
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._last_block = None
+
+    def track(self, tx_hash, timeout=None):
+        """Return a Future resolved with the receipt of tx_hash (TimeoutError after timeout)"""
+        self.start()
+        future = Future()
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self._loop.call_soon_threadsafe(self._register, self._key(tx_hash), future, deadline)
+        return future
+
+    def pending_count(self):
+        return sum(len(waiters) for waiters in self._pending.values())
+
+    def start(self):
+        """Start the event loop thread for the current process"""
+        with self._start_lock:
+            # Threads do not survive a fork, so every gunicorn worker needs its own loop
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._pending = {}
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run, name='confirmation-tracker')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        # Blocks and receipts are always read over HTTP; the websocket only signals new heads
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(self.network_url))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._loop.run_until_complete(self._main())
+
+    async def _main(self):
+        self._loop.create_task(self._expire_loop())
+        self._loop.create_task(self._recheck_loop())
+        if self.ws_url and WebsocketProviderV2:
+            try:
+                await self._follow_subscription()
+            except Exception as e:
+                logger.error(f"newHeads subscription failed, polling instead: {str(e)}")
+        await self._follow_polling()
+
+    async def _follow_polling(self):
+        while True:
+            try:
+                await self._on_head(await self.w3.eth.block_number)
+            except Exception as e:
+                logger.error(f"Confirmation scan failed: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _follow_subscription(self):
+        async with AsyncWeb3.persistent_websocket(WebsocketProviderV2(self.ws_url)) as ws:
+            await ws.eth.subscribe('newHeads')
+            async for message in ws.ws.process_subscriptions():
+                try:
+                    await self._on_head(message['result']['number'])
+                except Exception as e:
+                    logger.error(f"Confirmation scan failed: {str(e)}")
+
+    async def _on_head(self, head):
+        if self._pending and self._last_block is not None:
+            await self._scan_to(head)
+        else:
+            # Nothing to match; just keep the cursor at the head
+            self._last_block = head
+
+    def _register(self, key, future, deadline):
+        self._pending.setdefault(key, []).append((future, deadline))
+        # The transaction may already be mined (e.g. re-tracked after a restart)
+        self._loop.create_task(self._check_receipts([key]))
+
+    async def _scan_to(self, head):
+        """Fetch every block after the last scanned one and resolve matching transactions"""
+        numbers = range(self._last_block + 1, head + 1)
+        if not numbers:
+            return
+        blocks = await asyncio.gather(*(self._limited(self.w3.eth.get_block(n)) for n in numbers))
+        self._last_block = head
+
+        mined = [self._key(tx) for block in blocks for tx in block['transactions']]
+        await self._check_receipts([key for key in mined if key in self._pending])
+
+    async def _check_receipts(self, keys):
+        receipts = await asyncio.gather(
+            *(self._limited(self.w3.eth.get_transaction_receipt(key)) for key in keys),
+            return_exceptions=True
+        )
+        for key, receipt in zip(keys, receipts):
+            if isinstance(receipt, Exception) or receipt is None:
+                continue
+            for future, _ in self._pending.pop(key, []):
+                if not future.done():
+                    future.set_result(receipt)
+
+    async def _recheck_loop(self):
+        while True:
+            await asyncio.sleep(self.recheck_interval)
+            try:
+                await self._check_receipts(list(self._pending))
+            except Exception as e:
+                logger.error(f"Receipt recheck failed: {str(e)}")
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            for key in list(self._pending):
+                waiters = []
+                for future, deadline in self._pending[key]:
+                    if deadline <= now and not future.done():
+                        future.set_exception(TimeoutError(f"Transaction {key} not confirmed in time"))
+                    elif not future.done():
+                        waiters.append((future, deadline))
+                if waiters:
+                    self._pending[key] = waiters
+                else:
+                    del self._pending[key]
+
+    async def _limited(self, awaitable):
+        async with self._semaphore:
+            return await awaitable
+
+    @staticmethod
+    def _key(tx_hash):
+        if isinstance(tx_hash, str):
+            return tx_hash.lower() if tx_hash.startswith('0x') else '0x' + tx_hash.lower()
+        return '0x' + bytes(tx_hash).hex()
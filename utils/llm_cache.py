@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_responses_expiry ON llm_responses (expires_at);
+"""
+
+
+def normalize_param(value):
+    """Canonical form of a prompt parameter, so "Creatine " and "creatine" share an entry"""
+    if isinstance(value, str):
+        value = unicodedata.normalize('NFKC', value)
+        return _WHITESPACE.sub(' ', value).strip().lower()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {str(k): normalize_param(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_param(v) for v in value]
+    return value
+
+
+class LLMCache:
+    """Response cache in front of a Gemini model.
+
+    generate() formats a prompt template with keyword parameters and returns
+    the response text. Entries are keyed on the endpoint, the template and the
+    normalized parameters, so the same supplement asked about with different
+    casing or spacing is generated once. Each endpoint has its own TTL (see
+    ttls); endpoints mapped to 0 are never cached. When validate is given,
+    a response is only stored if validate(text) does not raise, so a reply
+    that failed to parse as JSON is retried on the next request instead of
+    being served for the whole TTL.
+
+    Recent entries live in a size-bounded in-process LRU. When db_path is
+    given, entries are also written to SQLite so every worker process shares
+    them and they survive a restart. Concurrent misses for the same key wait
+    on a single model call instead of each calling Gemini.
+    """
+
+    def __init__(self, model, db_path=None, max_entries=1024, default_ttl=3600, ttls=None):
+        self.model = model
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._local = threading.local()
+        self._metrics = {}
+        self.evictions = 0
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(_SCHEMA)
+                conn.execute("DELETE FROM llm_responses WHERE expires_at < ?", (time.time(),))
+
+    def generate(self, endpoint, template, validate=None, **params):
+        """Return the model's text for template.format(**params), from cache when possible"""
+        ttl = self.ttls.get(endpoint, self.default_ttl)
+        if not ttl:
+            self._count(endpoint, 'bypassed')
+            return self._call(template.format(**params))
+
+        key = self.key(endpoint, template, params)
+        text = self._lookup(endpoint, key)
+        if text is not None:
+            return text
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = threading.Event()
+        if not leader:
+            # Another request is already generating this entry
+            pending.wait()
+            text = self._lookup(endpoint, key)
+            if text is not None:
+                return text
+
+        try:
+            self._count(endpoint, 'misses')
+            text = self._call(template.format(**params))
+            try:
+                if validate:
+                    validate(text)
+            except Exception:
+                self._count(endpoint, 'rejected')
+            else:
+                self._store(endpoint, key, text, ttl)
+            return text
+        finally:
+            if leader:
+                with self._lock:
+                    del self._inflight[key]
+                pending.set()
+
+    @staticmethod
+    def key(endpoint, template, params):
+        material = json.dumps([endpoint, template, normalize_param(params)], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def invalidate(self, endpoint=None):
+        """Drop every entry, or only those of one endpoint"""
+        with self._lock:
+            for key in [k for k, (ep, _, _) in self._entries.items() if endpoint in (None, ep)]:
+                del self._entries[key]
+        if self.db_path:
+            with self._connect() as conn:
+                if endpoint is None:
+                    conn.execute("DELETE FROM llm_responses")
+                else:
+                    conn.execute("DELETE FROM llm_responses WHERE endpoint = ?", (endpoint,))
+
+    def stats(self):
+        with self._lock:
+            endpoints = {}
+            for endpoint, counts in self._metrics.items():
+                hits = counts['memory_hits'] + counts['disk_hits']
+                lookups = hits + counts['misses']
+                endpoints[endpoint] = dict(counts, hit_rate=round(hits / lookups, 4) if lookups else 0.0)
+            hits = sum(c['memory_hits'] + c['disk_hits'] for c in self._metrics.values())
+            lookups = hits + sum(c['misses'] for c in self._metrics.values())
+            return {
+                'hits': hits,
+                'misses': lookups - hits,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk': bool(self.db_path),
+                'endpoints': endpoints
+            }
+
+    def _call(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    def _lookup(self, endpoint, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] > now:
+                self._entries.move_to_end(key)
+                self._count(endpoint, 'memory_hits', locked=True)
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        if not self.db_path:
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT response, expires_at FROM llm_responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache read failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+        self._remember(endpoint, key, row['response'], row['expires_at'])
+        self._count(endpoint, 'disk_hits')
+        return row['response']
+
+    def _store(self, endpoint, key, text, ttl):
+        expires_at = time.time() + ttl
+        self._remember(endpoint, key, text, expires_at)
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, endpoint, response, expires_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, endpoint, text, expires_at, time.time())
+                )
+        except sqlite3.Error as e:
+            # The in-process entry still serves this worker
+            logger.error(f"LLM cache write failed: {str(e)}")
+
+    def _remember(self, endpoint, key, text, expires_at):
+        with self._lock:
+            self._entries[key] = (endpoint, text, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _count(self, endpoint, name, locked=False):
+        if not locked:
+            with self._lock:
+                return self._count(endpoint, name, locked=True)
+        counts = self._metrics.setdefault(endpoint, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'bypassed': 0, 'rejected': 0})
+        counts[name] += 1
+
+    def _connect(self):
+        """One connection per thread; sqlite3 connections cannot be shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,104 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one model call.
+
+    predict(row) hands the row to a background thread and waits for its
+    result. The thread takes the first waiting row, keeps collecting for up
+    to max_wait seconds or until max_batch rows have arrived, then calls
+    predict_fn once on the stacked matrix and hands each caller its own
+    output. Collection also stops early once no new row has arrived for
+    idle_wait seconds, so a handful of callers is not held for the whole
+    window. Under load, the fixed per-call cost of sklearn is paid once per
+    batch instead of once per request; a lone request waits at most
+    idle_wait longer than before.
+    """
+
+    def __init__(self, predict_fn, max_batch=64, max_wait=0.005, idle_wait=0.0005, name='micro-batcher'):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.idle_wait = idle_wait
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+    def submit(self, row):
+        """Queue one feature row; returns a Future for its prediction"""
+        self.start()
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, row, timeout=5.0):
+        return self.submit(row).result(timeout=timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'queued': self._queue.qsize()
+            }
+
+    def start(self):
+        """Start the batching thread for the current process"""
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            # Threads do not survive a fork, so every gunicorn worker needs its own batcher
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.name)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(remaining, self.idle_wait)))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        try:
+            outputs = self.predict_fn(np.asarray([row for row, _ in batch], dtype=float))
+        except Exception as e:
+            logger.error(f"{self.name} batch of {len(batch)} failed: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self._stats_lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        for (_, future), output in zip(batch, outputs):
+            future.set_result(output)
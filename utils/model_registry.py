@@ -0,0 +1,244 @@
+"""Versioned store of trained models with lazy, memory-mapped loading.
+
+Each model lives in its own directory under the registry root:
+
+    models/<name>/v0001.joblib, v0002.joblib, ...
+    models/<name>/CURRENT        (the active version, e.g. "v0002")
+
+Publishing writes a new uncompressed artifact and then moves CURRENT, both
+atomically. Every worker notices the new pointer on its next check and swaps
+models without a restart. From the command line:
+
+    python -m utils.model_registry list [name]
+    python -m utils.model_registry publish <name> <artifact.joblib>
+    python -m utils.model_registry activate <name> <version>
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+import joblib
+
+try:
+    import fcntl
+except ImportError:  # No cross-process lock on Windows; concurrent first trains may publish twice
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_VERSION_FILE = re.compile(r'^v(\d+)\.joblib$')
+
+
+class ModelEntry:
+    """A loaded model version and the data derived from it"""
+
+    def __init__(self, model, version, path, load_seconds, derived):
+        self.model = model
+        self.version = version
+        self.path = path
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.derived = derived
+
+
+class ModelRegistry:
+    """Loads registered models on first use and hot-swaps them when CURRENT moves.
+
+    Artifacts are written uncompressed and loaded with joblib's
+    mmap_mode='r', so large NumPy arrays inside a model are mapped read-only
+    from the file and their pages are shared by every worker process.
+    register() takes an optional trainer, used when a model has no version
+    yet (training then happens under a file lock, once across workers), a
+    legacy single-file path to import as the first version, and prepare(model),
+    which computes model-constant data once per loaded version (see derived()).
+    """
+
+    def __init__(self, root, mmap_mode='r', check_interval=30):
+        self.root = root
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._specs = {}
+        self._entries = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, trainer=None, legacy_path=None, prepare=None):
+        self._specs[name] = {'trainer': trainer, 'legacy_path': legacy_path, 'prepare': prepare}
+        return self
+
+    def get(self, name):
+        """The current model for name, loading or swapping it in if needed"""
+        return self.entry(name).model
+
+    def derived(self, name):
+        """Model-constant data computed by prepare() for the loaded version"""
+        return self.entry(name).derived
+
+    def entry(self, name):
+        entry = self._entries.get(name)
+        now = time.monotonic()
+        if entry is not None and now - self._checked.get(name, 0) < self.check_interval:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and now - self._checked.get(name, 0) < self.check_interval:
+                return entry
+            version = self.current_version(name)
+            if version is None:
+                version = self._bootstrap(name)
+            if entry is None or entry.version != version:
+                if entry is not None:
+                    logger.info(f"Swapping model {name} from {entry.version} to {version}")
+                entry = self._load(name, version)
+                self._entries[name] = entry
+            self._checked[name] = time.monotonic()
+            return entry
+
+    def current_version(self, name):
+        try:
+            with open(os.path.join(self._dir(name), 'CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self, name):
+        try:
+            files = os.listdir(self._dir(name))
+        except FileNotFoundError:
+            return []
+        return sorted(f[:-len('.joblib')] for f in files if _VERSION_FILE.match(f))
+
+    def publish(self, name, model, activate=True):
+        """Write model as the next version of name; returns the version"""
+        with self._file_lock(name):
+            version = self._publish_locked(name, model, activate)
+        logger.info(f"Published model {name} {version}")
+        return version
+
+    def activate(self, name, version):
+        """Point CURRENT at an existing version (rolling forward or back)"""
+        if version not in self.versions(name):
+            raise ValueError(f"Model {name} has no version {version}")
+        pointer = os.path.join(self._dir(name), 'CURRENT')
+        with open(f"{pointer}.tmp", 'w') as f:
+            f.write(version)
+        os.replace(f"{pointer}.tmp", pointer)
+        # Make this process pick it up on the next get()
+        self._checked.pop(name, None)
+
+    def status(self):
+        """Loaded version, load time and available versions of every registered model"""
+        result = {}
+        for name in self._specs:
+            entry = self._entries.get(name)
+            result[name] = {
+                'loaded': entry is not None,
+                'version': entry.version if entry else None,
+                'current': self.current_version(name),
+                'versions': self.versions(name),
+                'load_seconds': round(entry.load_seconds, 4) if entry else None,
+                'loaded_at': entry.loaded_at if entry else None,
+                'mmap': self.mmap_mode
+            }
+        return result
+
+    def _load(self, name, version):
+        path = os.path.join(self._dir(name), f"{version}.joblib")
+        start = time.perf_counter()
+        model = joblib.load(path, mmap_mode=self.mmap_mode)
+        prepare = self._specs.get(name, {}).get('prepare')
+        derived = prepare(model) if prepare else {}
+        load_seconds = time.perf_counter() - start
+        logger.info(f"Loaded model {name} {version} in {load_seconds * 1000:.1f} ms")
+        return ModelEntry(model, version, path, load_seconds, derived)
+
+    def _bootstrap(self, name):
+        """Create the first version from the legacy file or the trainer"""
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"Model {name} is not registered")
+        with self._file_lock(name):
+            # Another worker may have published while we waited for the lock
+            version = self.current_version(name)
+            if version is not None:
+                return version
+            model = None
+            legacy_path = spec['legacy_path']
+            if legacy_path and os.path.exists(legacy_path):
+                try:
+                    model = joblib.load(legacy_path)
+                    logger.info(f"Imported {legacy_path} as the first version of {name}")
+                except Exception as e:
+                    # Typically pickled by an incompatible scikit-learn version
+                    logger.warning(f"Could not import {legacy_path}: {str(e)}")
+            if model is None:
+                if not spec['trainer']:
+                    raise FileNotFoundError(f"Model {name} has no published version")
+                logger.info(f"No usable artifact for model {name}; training one")
+                model = spec['trainer']()
+            return self._publish_locked(name, model)
+
+    def _publish_locked(self, name, model, activate=True):
+        directory = self._dir(name)
+        numbers = [int(_VERSION_FILE.match(f).group(1)) for f in os.listdir(directory) if _VERSION_FILE.match(f)]
+        version = f"v{max(numbers, default=0) + 1:04d}"
+        path = os.path.join(directory, f"{version}.joblib")
+        # Uncompressed, so the arrays can be memory-mapped on load
+        joblib.dump(model, f"{path}.tmp", compress=0)
+        os.replace(f"{path}.tmp", path)
+        if activate:
+            self.activate(name, version)
+        return version
+
+    def _dir(self, name):
+        return os.path.join(self.root, name)
+
+    def _file_lock(self, name):
+        os.makedirs(self._dir(name), exist_ok=True)
+        return _FileLock(os.path.join(self._dir(name), '.lock'))
+
+
+class _FileLock:
+    """Exclusive lock across processes on a lock file (a no-op without fcntl)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def main(argv):
+    root = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+    registry = ModelRegistry(root)
+    if len(argv) >= 1 and argv[0] == 'list':
+        names = argv[1:] or sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+        for name in names:
+            current = registry.current_version(name)
+            print(f"{name}: " + ", ".join(f"{v}{' (current)' if v == current else ''}" for v in registry.versions(name)))
+    elif len(argv) == 3 and argv[0] == 'publish':
+        print(registry.publish(argv[1], joblib.load(argv[2])))
+    elif len(argv) == 3 and argv[0] == 'activate':
+        registry.activate(argv[1], argv[2])
+        print(f"{argv[1]} -> {argv[2]}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,236 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCAL_NEWS_DOMAINS = 'timesofindia.indiatimes.com,hindustantimes.com,indianexpress.com'
+
+
+class NewsRefresher:
+    """Background owner of the anti-doping wiki news feed.
+
+    A daemon thread fetches the NewsAPI sources concurrently and writes a
+    single JSON snapshot to disk. Every worker process renders from that
+    snapshot, so page latency never depends on NewsAPI. A file lock next to
+    the snapshot makes sure only one worker refreshes per interval, keeping
+    upstream quota use independent of the number of workers.
+    """
+
+    def __init__(self, newsapi, snapshot_path, refresh_interval=1800, fetch_timeout=20):
+        self.newsapi = newsapi
+        self.snapshot_path = snapshot_path
+        self.lock_path = snapshot_path + '.lock'
+        self.refresh_interval = refresh_interval
+        self.fetch_timeout = fetch_timeout
+
+        # Each entry: (category, callable returning a NewsAPI response)
+        self.sources = [
+            ('International Doping News', self._fetch_international_doping),
+            ('Local Doping News', self._fetch_local_doping),
+            ('Sports News', self._fetch_sports_headlines),
+        ]
+
+        self._snapshot = None
+        self._snapshot_mtime = None
+        self._wakeup = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+
+    def start(self):
+        """Start the refresher thread for the current process"""
+        # Threads do not survive a fork, so gunicorn workers started from a
+        # preloaded app each need their own refresher thread.
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._refresh_loop, name='news-refresher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def get_news(self):
+        """Return (articles, last_update) from the latest snapshot without blocking on NewsAPI"""
+        self.start()
+        snapshot = self._read_snapshot()
+        if snapshot is None:
+            self.trigger()
+            return [], None
+
+        last_update = datetime.fromisoformat(snapshot['last_update'])
+        if self._is_stale(last_update):
+            # Serve the stale copy right away and let the refresher catch up
+            self.trigger()
+        return snapshot['articles'], last_update
+
+    def trigger(self):
+        """Ask the refresher thread to check the snapshot now"""
+        self._wakeup.set()
+
+    def refresh(self, force=False):
+        """Fetch all sources and publish a new snapshot.
+
+        Returns True if this process wrote a new snapshot. Another worker
+        holding the lock, or a snapshot that is still fresh, makes this a no-op.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        return False
+
+                # Another worker may have refreshed while we waited for the lock
+                previous = self._read_snapshot()
+                if previous and not force and not self._is_stale(datetime.fromisoformat(previous['last_update'])):
+                    return False
+
+                articles = self._fetch_all(previous)
+                if not articles:
+                    logger.warning("News refresh returned no articles, keeping previous snapshot")
+                    return False
+
+                self._write_snapshot({
+                    'last_update': datetime.utcnow().isoformat(),
+                    'articles': articles
+                })
+                logger.info(f"News snapshot refreshed with {len(articles)} articles")
+                return True
+        except Exception as e:
+            logger.error(f"Error refreshing news snapshot: {str(e)}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh_loop(self):
+        """Refresh on schedule, or sooner when a reader finds the snapshot stale"""
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"News refresher loop error: {str(e)}")
+            self._wakeup.wait(self._seconds_until_stale())
+            self._wakeup.clear()
+
+    def _seconds_until_stale(self):
+        snapshot = self._read_snapshot()
+        if snapshot is None:
+            return 60  # Retry soon when NewsAPI has never answered
+        age = (datetime.utcnow() - datetime.fromisoformat(snapshot['last_update'])).total_seconds()
+        return max(self.refresh_interval - age, 1)
+
+    def _is_stale(self, last_update):
+        return (datetime.utcnow() - last_update).total_seconds() >= self.refresh_interval
+
+    def _fetch_all(self, previous):
+        """Fetch every source concurrently, falling back to the previous articles of a failed source"""
+        previous_by_category = {}
+        for article in (previous or {}).get('articles', []):
+            previous_by_category.setdefault(article['category'], []).append(article)
+
+        all_news = []
+        executor = ThreadPoolExecutor(max_workers=len(self.sources))
+        try:
+            futures = [(category, executor.submit(fetch)) for category, fetch in self.sources]
+            # One deadline for the whole refresh; hung fetches are abandoned, not waited for
+            wait([future for _, future in futures], timeout=self.fetch_timeout)
+            for category, future in futures:
+                try:
+                    if not future.done():
+                        raise TimeoutError(f"no answer within {self.fetch_timeout}s")
+                    articles = self._format_articles(future.result(), category)
+                except Exception as e:
+                    logger.error(f"Error fetching {category}: {str(e)}")
+                    articles = []
+                all_news.extend(articles or previous_by_category.get(category, []))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return all_news
+
+    def _fetch_international_doping(self):
+        return self.newsapi.get_everything(
+            q='doping sports athletics',
+            language='en',
+            sort_by='publishedAt',
+            from_param=(datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%d'),
+            page_size=10
+        )
+
+    def _fetch_local_doping(self):
+        return self.newsapi.get_everything(
+            q='doping sports athletics',
+            language='en',
+            domains=LOCAL_NEWS_DOMAINS,
+            sort_by='publishedAt',
+            from_param=(datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%d'),
+            page_size=10
+        )
+
+    def _fetch_sports_headlines(self):
+        return self.newsapi.get_top_headlines(
+            category='sports',
+            language='en',
+            page_size=10
+        )
+
+    @staticmethod
+    def _format_articles(response, category):
+        """Convert a NewsAPI response into the article dicts the wiki template renders"""
+        articles = []
+        if response.get('status') != 'ok' or not response.get('articles'):
+            return articles
+
+        for article in response['articles']:
+            if not (article.get('title') and article.get('description')):
+                continue
+            try:
+                published = datetime.strptime(article.get('publishedAt', ''), '%Y-%m-%dT%H:%M:%SZ')
+            except ValueError:
+                published = datetime.utcnow()
+            articles.append({
+                'title': article.get('title', ''),
+                'description': article.get('description', ''),
+                'url': article.get('url', '#'),
+                'image': article.get('urlToImage', None),
+                'publishedAt': published.strftime('%B %d, %Y'),
+                'source': (article.get('source') or {}).get('name', 'Unknown Source'),
+                'category': category
+            })
+        return articles
+
+    def _read_snapshot(self):
+        """Read the shared snapshot, reusing the parsed copy while the file is unchanged"""
+        try:
+            mtime = os.stat(self.snapshot_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        if mtime != self._snapshot_mtime:
+            try:
+                with open(self.snapshot_path) as f:
+                    self._snapshot = json.load(f)
+                self._snapshot_mtime = mtime
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading news snapshot: {str(e)}")
+                return self._snapshot
+        return self._snapshot
+
+    def _write_snapshot(self, snapshot):
+        """Write the snapshot atomically so readers never see a partial file"""
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.snapshot_path)
@@ -0,0 +1,122 @@
+import re
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track the click and never change the content
+TRACKING_PARAMS = {
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'fbclid', 'gclid', 'si', 'feature', 'ref', 'src', 'uo', 'ls', 'at', 'ct'
+}
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+# Episode numbering and platform suffixes differ between directories
+_TITLE_NOISE = re.compile(r'\b(ep|episode|podcast|audio|video|official|full)\b')
+
+
+def normalize_url(url):
+    """Reduce a podcast URL to a canonical form so platform variants compare equal"""
+    if not url or url == '#':
+        return ''
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in ('www.', 'm.', 'music.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = parts.path.rstrip('/') or '/'
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k.lower() not in TRACKING_PARAMS]
+
+    # youtu.be/<id> and youtube.com/watch?v=<id> are the same video
+    if host == 'youtu.be':
+        host, query = 'youtube.com', [('v', path.lstrip('/'))]
+        path = '/watch'
+    elif host == 'youtube.com' and path == '/watch':
+        query = [(k, v) for k, v in query if k == 'v']
+
+    return urlunsplit(('https', host, path, urlencode(sorted(query)), ''))
+
+
+def normalize_text(text):
+    """Lowercase, strip accents, punctuation and noise words"""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    text = _TITLE_NOISE.sub(' ', _PUNCTUATION.sub(' ', text))
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def content_fingerprint(item):
+    """Identify an episode by its normalized title and author, independent of platform.
+
+    Returns None when the title is too short to tell episodes apart.
+    """
+    title = normalize_text(item.get('title'))
+    if len(title) < 12:
+        return None
+    return (title, normalize_text(item.get('author')))
+
+
+class PodcastMerger:
+    """Hash-based dedup/merge stage for podcast results.
+
+    Items are matched on normalized URL first and then on content
+    fingerprint, so the same episode listed on several platforms becomes one
+    entry. That entry records every contributing source and URL. Each add() is
+    a pair of dict lookups, so merging n items is O(n).
+    """
+
+    def __init__(self):
+        self._items = []
+        self._by_url = {}
+        self._by_fingerprint = {}
+
+    def add(self, item):
+        """Merge one item in; returns the entry it ended up in"""
+        url = normalize_url(item.get('source_url'))
+        fingerprint = content_fingerprint(item)
+        source = item.get('source_type', 'unknown')
+
+        index = self._by_url.get(url) if url else None
+        if index is None and fingerprint:
+            index = self._by_fingerprint.get(fingerprint)
+
+        if index is None:
+            entry = dict(item)
+            entry['sources'] = list(item.get('sources') or [source])
+            entry['alternate_urls'] = []
+            index = len(self._items)
+            self._items.append(entry)
+        else:
+            entry = self._items[index]
+            for contributor in item.get('sources') or [source]:
+                if contributor not in entry['sources']:
+                    entry['sources'].append(contributor)
+            if url and url != normalize_url(entry.get('source_url')) and item['source_url'] not in entry['alternate_urls']:
+                entry['alternate_urls'].append(item['source_url'])
+            # Fill gaps from the richer listing
+            for field in ('description', 'image_url', 'audio_url', 'published_date'):
+                if not entry.get(field) and item.get(field):
+                    entry[field] = item[field]
+
+        if url:
+            self._by_url.setdefault(url, index)
+        if fingerprint:
+            self._by_fingerprint.setdefault(fingerprint, index)
+        return entry
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+        return self
+
+    def items(self):
+        return self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+def merge_podcasts(*item_lists):
+    """Merge any number of podcast lists into one deduplicated list"""
+    merger = PodcastMerger()
+    for items in item_lists:
+        merger.extend(items)
+    return merger.items()
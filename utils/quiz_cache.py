@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QuizCache:
+    """In-process cache of quiz definitions in front of mongo_db.quizzes.
+
+    Each entry holds the quiz, its precomputed answer key and a version
+    token. The token is the document's own 'version'/'updated_at' field when
+    present, otherwise a hash of its content. Edits in Mongo invalidate
+    entries immediately through a change stream when the server supports
+    one. Otherwise each entry is revalidated against Mongo at most once every
+    revalidate_after seconds.
+    """
+
+    def __init__(self, collection, revalidate_after=30):
+        self.collection = collection
+        self.revalidate_after = revalidate_after
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._watcher = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.invalidations = 0
+
+    def get(self, quiz_id):
+        """Return the cache entry for quiz_id, loading it from Mongo on a miss"""
+        entry = self._entries.get(quiz_id)
+        if entry and not self._needs_revalidation(entry):
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        # Serialize loads so a class starting the same exam triggers one query
+        with self._load_lock:
+            entry = self._entries.get(quiz_id)
+            if entry and not self._needs_revalidation(entry):
+                with self._lock:
+                    self.hits += 1
+                return entry
+
+            with self._lock:
+                if entry:
+                    self.revalidations += 1
+                else:
+                    self.misses += 1
+            quiz = self.collection.find_one({"quiz_id": quiz_id}, {"_id": 0})
+            if not quiz:
+                self.invalidate(quiz_id)
+                return None
+
+            version = self._version_of(quiz)
+            if entry and entry['version'] == version:
+                entry['checked_at'] = time.monotonic()
+                return entry
+            if entry:
+                with self._lock:
+                    self.invalidations += 1
+            entry = {
+                'quiz': quiz,
+                'answer_key': tuple(q['correct_answer'] for q in quiz.get('questions', [])),
+                'version': version,
+                'checked_at': time.monotonic()
+            }
+            self._entries[quiz_id] = entry
+            return entry
+
+    def get_quiz(self, quiz_id):
+        entry = self.get(quiz_id)
+        return entry['quiz'] if entry else None
+
+    def answer_key(self, quiz_id):
+        entry = self.get(quiz_id)
+        return entry['answer_key'] if entry else None
+
+    def invalidate(self, quiz_id=None):
+        """Drop one quiz, or every quiz when quiz_id is None"""
+        with self._lock:
+            if quiz_id is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                dropped = 1 if self._entries.pop(quiz_id, None) else 0
+            self.invalidations += dropped
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'revalidations': self.revalidations,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+            'change_stream': bool(self._watcher and self._watcher.is_alive())
+        }
+
+    def start_watcher(self):
+        """Invalidate entries from a MongoDB change stream; returns False if unsupported"""
+        try:
+            stream = self.collection.watch(full_document='updateLookup')
+        except Exception as e:
+            logger.info(f"Quiz change stream unavailable, using periodic revalidation: {str(e)}")
+            return False
+
+        self._watcher = threading.Thread(target=self._watch, args=(stream,), name='quiz-cache-watcher')
+        self._watcher.daemon = True
+        self._watcher.start()
+        return True
+
+    def _watch(self, stream):
+        try:
+            with stream:
+                for change in stream:
+                    quiz_id = (change.get('fullDocument') or {}).get('quiz_id')
+                    # Deletes carry no document, so drop everything to be safe
+                    self.invalidate(quiz_id)
+        except Exception as e:
+            logger.error(f"Quiz change stream stopped: {str(e)}")
+
+    def _needs_revalidation(self, entry):
+        if self._watcher and self._watcher.is_alive():
+            return False
+        return time.monotonic() - entry['checked_at'] >= self.revalidate_after
+
+    @staticmethod
+    def _version_of(quiz):
+        if quiz.get('version') is not None:
+            return str(quiz['version'])
+        if quiz.get('updated_at') is not None:
+            return str(quiz['updated_at'])
+        return hashlib.sha1(json.dumps(quiz, sort_keys=True, default=str).encode()).hexdigest()
@@ -0,0 +1,163 @@
+import itertools
+
+import requests
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+from web3.exceptions import ContractLogicError
+
+try:
+    from eth_abi import decode as decode_abi
+except ImportError:  # eth-abi < 4, installed with web3 5
+    from eth_abi import decode_abi
+
+_ids = itertools.count(1)
+
+
+class RPCError(Exception):
+    """Error object returned for one request of a batch"""
+
+
+class JSONRPCBatch:
+    """Collects JSON-RPC requests and sends them in a single HTTP round trip.
+
+    add() queues a raw request and add_call() queues an eth_call for a bound
+    contract function; execute() returns one result per request, in order,
+    with contract call outputs decoded as ContractFunction.call() returns
+    them (addresses checksummed, several outputs as a list). Only public
+    web3 and eth-abi APIs are used, so web3 5 and 6 both work. A request
+    that failed yields an exception instance in its slot instead of
+    raising, so one reverted call does not sink the whole batch.
+
+    Providers without an HTTP endpoint (e.g. EthereumTesterProvider) get the
+    same results, one request at a time.
+    """
+
+    def __init__(self, w3, session=None, max_size=500, timeout=30):
+        self.w3 = w3
+        self.session = session or requests.Session()
+        self.max_size = max_size
+        self.timeout = timeout
+        self._requests = []
+
+    def __len__(self):
+        return len(self._requests)
+
+    def add(self, method, params, decode=None):
+        """Queue a request; returns its position in the results"""
+        self._requests.append((method, params, decode))
+        return len(self._requests) - 1
+
+    def add_call(self, function, block='latest'):
+        """Queue an eth_call for a contract function bound to its arguments"""
+        transaction = {'to': function.address, 'data': self._encode_call(function)}
+        return self.add('eth_call', [transaction, block], decode=lambda raw: _decode_outputs(function.abi, raw))
+
+    def add_receipt(self, tx_hash):
+        """Queue eth_getTransactionReceipt; the result is None while the transaction is pending"""
+        return self.add('eth_getTransactionReceipt', [self.w3.to_hex(HexBytes(tx_hash))], decode=_format_receipt)
+
+    def add_block_timestamp(self, number):
+        """Queue eth_getBlockByNumber for a block's timestamp"""
+        return self.add('eth_getBlockByNumber', [hex(number), False], decode=lambda block: _int(block['timestamp']))
+
+    def execute(self):
+        requests_, self._requests = self._requests, []
+        responses = []
+        for start in range(0, len(requests_), self.max_size):
+            responses.extend(self._send(requests_[start:start + self.max_size]))
+
+        results = []
+        for (method, _, decode), response in zip(requests_, responses):
+            if 'error' in response:
+                error = response['error']
+                message = error.get('message', str(error)) if isinstance(error, dict) else str(error)
+                results.append(ContractLogicError(message) if method == 'eth_call' else RPCError(message))
+                continue
+            try:
+                results.append(decode(response['result']) if decode else response['result'])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _send(self, chunk):
+        endpoint = getattr(self.w3.provider, 'endpoint_uri', None)
+        if not endpoint:
+            return [self._request_one(method, params) for method, params, _ in chunk]
+
+        payload = [{'jsonrpc': '2.0', 'id': next(_ids), 'method': method, 'params': params}
+                   for method, params, _ in chunk]
+        response = self.session.post(endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        by_id = {item.get('id'): item for item in response.json()}
+        return [by_id.get(request['id'], {'error': {'message': 'Missing response in batch'}})
+                for request in payload]
+
+    def _request_one(self, method, params):
+        # Through the manager, so the provider's middlewares hand back JSON-RPC shaped results
+        try:
+            return {'result': self.w3.manager.request_blocking(method, params)}
+        except Exception as e:
+            return {'error': {'message': str(e)}}
+
+    def _encode_call(self, function):
+        """Calldata for a bound contract function"""
+        contract = self.w3.eth.contract(abi=[function.abi])
+        # web3 7 has only encode_abi(); web3 5 and most of 6 only encodeABI()
+        encode = getattr(contract, 'encode_abi', None) or contract.encodeABI
+        return encode(function.abi['name'], args=function.args, kwargs=function.kwargs)
+
+def _abi_type(output):
+    """Type string for one ABI output, with tuples spelled out for eth-abi"""
+    if output['type'].startswith('tuple'):
+        return f"({','.join(_abi_type(c) for c in output['components'])}){output['type'][len('tuple'):]}"
+    return output['type']
+
+
+def _normalize(output, value):
+    """Checksum addresses anywhere in a decoded output, as ContractFunction.call() does"""
+    type_ = output['type']
+    if type_.endswith(']'):
+        inner = dict(output, type=type_[:type_.rindex('[')])
+        return [_normalize(inner, item) for item in value]
+    if type_ == 'tuple':
+        return tuple(_normalize(component, item) for component, item in zip(output['components'], value))
+    if type_ == 'address':
+        return to_checksum_address(value)
+    return value
+
+
+def _decode_outputs(abi, raw):
+    outputs = abi.get('outputs', [])
+    decoded = decode_abi([_abi_type(output) for output in outputs], HexBytes(raw))
+    normalized = [_normalize(output, value) for output, value in zip(outputs, decoded)]
+    return normalized[0] if len(normalized) == 1 else normalized
+
+
+def _int(value):
+    return value if isinstance(value, int) else int(value, 16)
+
+
+def _format_receipt(raw):
+    """Receipt JSON converted the way get_transaction_receipt() returns it, for the fields decoded here"""
+    if raw is None:
+        return None
+    logs = [AttributeDict({
+        'address': to_checksum_address(log['address']),
+        'topics': [HexBytes(topic) for topic in log['topics']],
+        'data': HexBytes(log['data']),
+        'blockHash': HexBytes(log['blockHash']),
+        'blockNumber': _int(log['blockNumber']),
+        'transactionHash': HexBytes(log['transactionHash']),
+        'transactionIndex': _int(log['transactionIndex']),
+        'logIndex': _int(log['logIndex']),
+        'removed': log.get('removed', False)
+    }) for log in raw['logs']]
+    return AttributeDict({
+        'transactionHash': HexBytes(raw['transactionHash']),
+        'blockHash': HexBytes(raw['blockHash']),
+        'blockNumber': _int(raw['blockNumber']),
+        'gasUsed': _int(raw['gasUsed']),
+        'status': _int(raw['status']),
+        'logs': logs
+    })
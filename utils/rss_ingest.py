@@ -0,0 +1,172 @@
+import html
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_SCRIPT_STYLE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_BLOCK_TAGS = re.compile(r'<\s*(br|/p|/div|/li|/h[1-6])\b[^>]*>', re.IGNORECASE)
+_TAGS = re.compile(r'<[^>]*>')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def strip_html(text, limit=None):
+    """Extract plain text from an HTML snippet without building a parse tree"""
+    if not text:
+        return ''
+    if '<' in text:
+        text = _SCRIPT_STYLE.sub(' ', text)
+        text = _BLOCK_TAGS.sub(' ', text)
+        text = _TAGS.sub('', text)
+    text = _WHITESPACE.sub(' ', html.unescape(text)).strip()
+    return text[:limit] if limit else text
+
+
+class RSSIngestor:
+    """Parallel, incremental RSS ingestion.
+
+    Feeds are fetched concurrently with ETag/Last-Modified conditional
+    requests. A 304 reuses the episodes already processed for that feed, and
+    a changed feed only has the entries above the last seen GUID processed.
+    Feed state is kept in a JSON file so restarts stay incremental.
+    """
+
+    def __init__(self, state_path, max_workers=16, entries_per_feed=5, timeout=10):
+        self.state_path = state_path
+        self.entries_per_feed = entries_per_feed
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+        # One pooled session for every feed host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'AntidopingPlatform/1.0 (+podcast ingest)'
+
+    def fetch(self, feeds):
+        """Fetch every feed in parallel and return their latest episodes.
+
+        feeds is a list of {'url': ..., 'category': ...} dicts.
+        """
+        if not feeds:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(feeds))) as executor:
+            results = list(executor.map(self._fetch_feed, feeds))
+        self._save_state()
+
+        podcasts = []
+        for episodes in results:
+            podcasts.extend(episodes)
+        return podcasts
+
+    def _fetch_feed(self, feed_info):
+        url = feed_info['url']
+        with self._lock:
+            state = dict(self._state.get(url, {}))
+
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('modified'):
+            headers['If-Modified-Since'] = state['modified']
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                logger.debug(f"Feed unchanged: {url}")
+                return state.get('episodes', [])
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Error fetching feed {url}: {str(e)}")
+            return state.get('episodes', [])
+
+        feed = feedparser.parse(response.content)
+        episodes = self._new_episodes(feed, feed_info, state.get('last_guid'))
+        if episodes:
+            known = {episode['guid'] for episode in episodes}
+            episodes += [e for e in state.get('episodes', []) if e['guid'] not in known]
+        else:
+            episodes = state.get('episodes', [])
+        episodes = episodes[:self.entries_per_feed]
+
+        with self._lock:
+            self._state[url] = {
+                'etag': response.headers.get('ETag'),
+                'modified': response.headers.get('Last-Modified'),
+                'last_guid': episodes[0]['guid'] if episodes else state.get('last_guid'),
+                'episodes': episodes
+            }
+        return episodes
+
+    def _new_episodes(self, feed, feed_info, last_guid):
+        """Process entries newest-first, stopping at the last GUID seen for this feed"""
+        episodes = []
+        feed_title = feed.feed.get('title', 'Unknown')
+        for entry in feed.entries[:self.entries_per_feed]:
+            guid = entry.get('id') or entry.get('link') or entry.get('title')
+            if guid == last_guid:
+                break
+            try:
+                episodes.append(self._episode_from_entry(entry, guid, feed_title, feed_info))
+            except Exception as entry_error:
+                logger.error(f"Error processing entry from {feed_info['url']}: {str(entry_error)}")
+        return episodes
+
+    @staticmethod
+    def _episode_from_entry(entry, guid, feed_title, feed_info):
+        # Extract audio URL from enclosures
+        audio_url = next((e['href'] for e in entry.get('enclosures', [])
+                          if e.get('type', '').startswith('audio/')), '')
+
+        # Get the largest image from media content, falling back to the thumbnail
+        image_url = ''
+        images = [m for m in entry.get('media_content', []) if m.get('type', '').startswith('image/')]
+        if images:
+            image_url = max(images, key=lambda m: int(m.get('width') or 0))['url']
+        elif entry.get('media_thumbnail'):
+            image_url = entry.media_thumbnail[0]['url']
+
+        return {
+            'guid': guid,
+            'title': entry.get('title', 'Untitled Episode'),
+            'description': strip_html(entry.get('description', ''), limit=500),
+            'published_date': entry.get('published', ''),
+            'duration': entry.get('itunes_duration', ''),
+            'audio_url': audio_url,
+            'image_url': image_url,
+            'source_url': entry.get('link', ''),
+            'author': entry.get('author', feed_title),
+            'category': feed_info['category'],
+            'language': entry.get('language', 'en'),
+            'source_type': 'rss'
+        }
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        with self._lock:
+            snapshot = json.dumps(self._state)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error(f"Error saving RSS state: {str(e)}")
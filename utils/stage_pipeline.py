@@ -0,0 +1,89 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+
+class StagePipeline:
+    """Runs a small dependency graph of stages concurrently within one latency budget.
+
+    Each stage is fn(inputs) -> value, where inputs maps the names listed in
+    `after` to their results. A stage is submitted as soon as everything it
+    depends on has settled, so independent stages overlap. A stage that
+    raises, or is still running when its deadline or the overall budget runs
+    out, yields its fallback instead. Dependents then run on that fallback
+    while budget remains, and are otherwise given their own fallback.
+    """
+
+    # Long-lived pool: a stage abandoned at the deadline finishes in the
+    # background instead of blocking the request that gave up on it
+    _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='stage-pipeline')
+
+    def __init__(self, budget=15.0):
+        self.budget = budget
+        self._stages = {}
+
+    def add(self, name, fn, after=(), fallback=None, deadline=None):
+        """Register a stage; deadline (seconds from start) is capped by the budget"""
+        missing = [dep for dep in after if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {', '.join(missing)}")
+        self._stages[name] = {'fn': fn, 'after': tuple(after), 'fallback': fallback, 'deadline': deadline}
+        return self
+
+    def run(self):
+        """Returns (results, report); report maps each stage to its status and elapsed ms"""
+        start = time.monotonic()
+        budget_end = start + self.budget
+        deadlines = {
+            name: min(start + stage['deadline'], budget_end) if stage['deadline'] else budget_end
+            for name, stage in self._stages.items()
+        }
+        results = {}
+        report = {}
+        pending = {}  # future -> stage name
+
+        def settle(name, value, status):
+            results[name] = value
+            report[name] = {'status': status, 'elapsed_ms': round((time.monotonic() - start) * 1000, 1)}
+
+        while len(results) < len(self._stages):
+            now = time.monotonic()
+            running = set(pending.values())
+            for name, stage in self._stages.items():
+                if name in results or name in running:
+                    continue
+                if not all(dep in results for dep in stage['after']):
+                    continue
+                if now >= deadlines[name]:
+                    settle(name, stage['fallback'], 'skipped')
+                    continue
+                inputs = {dep: results[dep] for dep in stage['after']}
+                pending[self._executor.submit(stage['fn'], inputs)] = name
+
+            for future, name in list(pending.items()):
+                if now >= deadlines[name]:
+                    logger.warning(f"Stage {name} missed its deadline; using fallback")
+                    future.cancel()
+                    del pending[future]
+                    settle(name, self._stages[name]['fallback'], 'timeout')
+
+            if not pending:
+                continue
+
+            timeout = max(min(deadlines[name] for name in pending.values()) - time.monotonic(), 0)
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    settle(name, future.result(), 'ok')
+                except Exception as e:
+                    logger.error(f"Stage {name} failed: {str(e)}")
+                    settle(name, self._stages[name]['fallback'], 'failed')
+
+        return results, report
+
+    @staticmethod
+    def is_partial(report):
+        return any(entry['status'] != 'ok' for entry in report.values())
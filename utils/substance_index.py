@@ -0,0 +1,340 @@
+"""Local index of WADA-listed substances and common supplement ingredients.
+
+The source list lives in json/prohibited_substances.json. It is compiled into
+json/substance_index.json.gz: sorted lookup terms with trigram postings,
+so loading is one gzip + json read with no per-start preprocessing. After
+editing the source, rebuild with:
+
+    python -m utils.substance_index
+"""
+import difflib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'json')
+SOURCE_PATH = os.path.join(DATA_DIR, 'prohibited_substances.json')
+INDEX_PATH = os.path.join(DATA_DIR, 'substance_index.json.gz')
+
+# Worst first wins when several ingredients are combined
+STATUS_RANK = {'SAFE': 0, 'THRESHOLD': 1, 'IN-COMPETITION': 2, 'PROHIBITED': 3}
+
+_DOSE = re.compile(r'\([^)]*\)|\b\d+(?:[.,]\d+)?\s*(?:mg|mcg|µg|ug|g|iu|ml|%)(?=\W|$)', re.IGNORECASE)
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+_INGREDIENTS_HEADER = re.compile(r'^\s*(?:other\s+)?ingredients?\s*:?\s*', re.IGNORECASE)
+_LABEL_FIELD = re.compile(r'^\s*[\w ]{2,20}:\s')
+# Salt and ester forms name the same listed substance
+_SALT_FORM = re.compile(r'\s+(?:hcl|hydrochloride|sulfate|sulphate|phosphate|tartrate|mesylate)$')
+# Fuzzy matching below this length mostly produces false positives (e.g. 'lh', 'epo')
+_MIN_FUZZY_LENGTH = 5
+
+
+def normalize_term(text):
+    """Lowercase ASCII words without doses, bullets or punctuation"""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    text = _DOSE.sub(' ', text)
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def _trigrams(term):
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_index(source):
+    """Compile the source document into the prebuilt index structure"""
+    substances = source['substances']
+    products = source.get('products', [])
+    refs = {}
+    # Substances get ids 0..n-1, products -1..-m so one term list serves both
+    for position, entry in enumerate(substances):
+        for name in [entry['name'], *entry.get('synonyms', [])]:
+            refs.setdefault(normalize_term(name), position)
+    for position, entry in enumerate(products):
+        for name in [entry['name'], *entry.get('synonyms', [])]:
+            term = normalize_term(name)
+            # A product name shadows a same-named ingredient only for product lookups
+            refs[f'product:{term}'] = -(position + 1)
+
+    terms = sorted(refs)
+    postings = {}
+    for position, term in enumerate(terms):
+        for gram in _trigrams(term.split(':', 1)[-1]):
+            postings.setdefault(gram, []).append(position)
+
+    return {
+        'version': FORMAT_VERSION,
+        'source_digest': _digest(source),
+        'substances': substances,
+        'products': products,
+        'terms': terms,
+        'refs': [refs[term] for term in terms],
+        'trigrams': postings
+    }
+
+
+def _digest(source):
+    return hashlib.sha256(json.dumps(source, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SubstanceIndex:
+    """Exact, prefix and fuzzy lookup of substances and known products.
+
+    lookup() resolves one ingredient name: exact normalized match first
+    (salt forms stripped), then the closest fuzzy match above `cutoff`
+    (catching OCR slips such as 'caffiene'). Fuzzy candidates come from
+    trigram postings, so only terms sharing enough trigrams are scored.
+    assess() rolls a list of ingredient names up into one status and
+    reports which names are unknown, so callers only need the LLM for
+    those. A fuzzy match is only a suggestion ('creatinine' is not
+    creatine): assess() counts it as unknown and product() ignores it
+    unless asked, so it never stands in for an answer.
+    """
+
+    def __init__(self, data, cutoff=0.85):
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported substance index version: {data.get('version')}")
+        self.cutoff = cutoff
+        self.source_digest = data['source_digest']
+        self.substances = data['substances']
+        self.products = data['products']
+        self._terms = data['terms']
+        self._refs = data['refs']
+        self._trigrams = data['trigrams']
+        self._positions = {term: position for position, term in enumerate(self._terms)}
+
+    @classmethod
+    def load(cls, path=INDEX_PATH, source_path=SOURCE_PATH):
+        """Load the prebuilt index; rebuilds (and rewrites) it when missing or older than the source"""
+        data = None
+        if os.path.exists(path):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        stale = data is None or data.get('version') != FORMAT_VERSION
+        if not stale and os.path.exists(source_path) and os.path.getmtime(source_path) > os.path.getmtime(path):
+            with open(source_path, encoding='utf-8') as f:
+                stale = _digest(json.load(f)) != data['source_digest']
+        if stale:
+            logger.warning(f"Substance index at {path} is missing or stale; rebuilding from {source_path}")
+            data = cls.build(source_path, path)
+        return cls(data)
+
+    @staticmethod
+    def build(source_path=SOURCE_PATH, path=INDEX_PATH):
+        """Compile source_path and write the prebuilt index to path; returns the index data"""
+        with open(source_path, encoding='utf-8') as f:
+            data = build_index(json.load(f))
+        try:
+            tmp_path = f"{path}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # A read-only deploy still works from the in-memory build
+            logger.error(f"Could not write substance index {path}: {str(e)}")
+        return data
+
+    def lookup(self, name):
+        """Best match for one ingredient name, or None"""
+        term = normalize_term(name)
+        if not term:
+            return None
+        if term in self._positions:
+            return self._match(name, term, 1.0, 'exact')
+        base = _SALT_FORM.sub('', term)
+        if base in self._positions:
+            return self._match(name, base, 1.0, 'exact')
+        if len(term) < _MIN_FUZZY_LENGTH:
+            return None
+        matches = self.fuzzy(name, limit=1)
+        return matches[0] if matches else None
+
+    def product(self, name, fuzzy=False):
+        """Known product entry for a product name, or None; fuzzy=True also accepts a close spelling"""
+        term = normalize_term(name)
+        position = self._positions.get(f'product:{term}')
+        if position is not None:
+            return self.products[-self._refs[position] - 1]
+        if not fuzzy:
+            return None
+        candidates = self._fuzzy_terms(term, products=True)
+        return self.products[-self._refs[candidates[0][1]] - 1] if candidates else None
+
+    def prefix(self, text, limit=10):
+        """Substances with a name or synonym starting with text, for autocomplete"""
+        term = normalize_term(text)
+        if not term:
+            return []
+        results = []
+        seen = set()
+        position = bisect_left(self._terms, term)
+        while position < len(self._terms) and self._terms[position].startswith(term) and len(results) < limit:
+            ref = self._refs[position]
+            if ref >= 0 and ref not in seen:
+                seen.add(ref)
+                results.append(self._match(text, self._terms[position], 1.0, 'prefix'))
+            position += 1
+        return results
+
+    def fuzzy(self, name, limit=5):
+        """Substances whose name or synonym is at least `cutoff` similar to name, best first"""
+        results = []
+        seen = set()
+        for score, position in self._fuzzy_terms(normalize_term(name)):
+            ref = self._refs[position]
+            if ref in seen:
+                continue
+            seen.add(ref)
+            results.append(self._match(name, self._terms[position], score, 'fuzzy'))
+            if len(results) >= limit:
+                break
+        return results
+
+    def assess(self, names):
+        """Per-ingredient results plus the worst status and the names without an exact match in the index"""
+        ingredients = []
+        unknown = []
+        suggestions = []
+        worst = 'SAFE'
+        for name in names:
+            match = self.lookup(name)
+            if match is None or match['match'] != 'exact':
+                unknown.append(name)
+                if match:
+                    suggestions.append(match)
+                continue
+            ingredients.append(match)
+            if STATUS_RANK[match['status']] > STATUS_RANK[worst]:
+                worst = match['status']
+        return {'status': worst, 'ingredients': ingredients, 'unknown': unknown, 'suggestions': suggestions}
+
+    def label_analysis(self, text):
+        """Analyze OCR text of a product label in the /analyze-product format.
+
+        Returns None unless an ingredients list was found and every
+        ingredient on it is in the index; otherwise the LLM should answer.
+        """
+        product_name, names = parse_label(text)
+        if not names:
+            return None
+        result = self.assess(names)
+        if result['unknown']:
+            return None
+
+        flagged = [m for m in result['ingredients'] if m['status'] != 'SAFE']
+        risk_level = {'SAFE': 'LOW', 'THRESHOLD': 'MEDIUM'}.get(result['status'], 'HIGH')
+        competition_status = {'SAFE': 'SAFE', 'THRESHOLD': 'CAUTION'}.get(result['status'], 'PROHIBITED')
+        if flagged:
+            warning_message = "Contains " + ", ".join(f"{m['name']} ({m['status'].lower()})" for m in flagged)
+        else:
+            warning_message = "No ingredients on the WADA prohibited list were found on this label"
+
+        recommendations = ["Choose batch-tested products (e.g. Informed Sport certified) to limit contamination risk"]
+        if flagged:
+            recommendations.insert(0, "Check the current WADA Prohibited List and your TUE status before use")
+        return {
+            'product_name': product_name or 'Unknown Product',
+            'overall_assessment': {
+                'risk_level': risk_level,
+                'competition_status': competition_status,
+                'warning_message': warning_message
+            },
+            'ingredients_analysis': [{
+                'name': m['query'],
+                'status': m['status'],
+                'category': m['category'],
+                'warning': m.get('threshold') or m.get('note') or ''
+            } for m in result['ingredients']],
+            'recommendations': recommendations,
+            'source': 'substance_index'
+        }
+
+    def _fuzzy_terms(self, term, products=False):
+        """(score, position) of terms similar to term, best first"""
+        if not term:
+            return []
+        grams = _trigrams(term)
+        shared = {}
+        for gram in grams:
+            for position in self._trigrams.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        # Terms sharing under half the trigrams cannot reach the cutoff
+        needed = max(1, len(grams) // 2)
+        scored = []
+        for position, count in shared.items():
+            if count < needed or (self._refs[position] < 0) != products:
+                continue
+            candidate = self._terms[position].split(':', 1)[-1]
+            score = difflib.SequenceMatcher(None, term, candidate).ratio()
+            if score >= self.cutoff:
+                scored.append((score, position))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored
+
+    def _match(self, query, term, score, kind):
+        entry = self.substances[self._refs[self._positions[term]]]
+        match = {
+            'query': query,
+            'name': entry['name'],
+            'status': entry['status'],
+            'category': entry['category'],
+            'wada_class': entry.get('wada_class'),
+            'score': round(score, 3),
+            'match': kind
+        }
+        for field in ('threshold', 'note'):
+            if entry.get(field):
+                match[field] = entry[field]
+        return match
+
+
+def parse_label(text):
+    """Split label text into (product name, ingredient names)"""
+    lines = [line.strip() for line in (text or '').splitlines() if line.strip()]
+    product_name = lines[0] if lines else None
+    names = []
+    in_ingredients = False
+    for line in lines:
+        header = _INGREDIENTS_HEADER.match(line)
+        if header:
+            in_ingredients = True
+            line = line[header.end():]
+        elif in_ingredients and _LABEL_FIELD.match(line):
+            # e.g. "Directions: ..." ends the ingredients section
+            break
+        if not in_ingredients:
+            continue
+        for item in re.split(r'[,;]', line):
+            item = item.strip().lstrip('-•*').strip().rstrip('.')
+            if normalize_term(item):
+                names.append(item)
+    return product_name, names
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_index():
+    """Process-wide index loaded from the prebuilt file on first use"""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = SubstanceIndex.load()
+    return _default
+
+
+if __name__ == '__main__':
+    data = SubstanceIndex.build()
+    print(f"Wrote {INDEX_PATH}: {len(data['substances'])} substances, {len(data['products'])} products, "
+          f"{len(data['terms'])} terms, {os.path.getsize(INDEX_PATH)} bytes")
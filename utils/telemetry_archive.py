@@ -0,0 +1,594 @@
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import numpy as np
+
+from utils.telemetry_history import HISTORY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Rollup levels, finest first, with their bucket length in seconds (buckets are UTC-aligned)
+ROLLUP_LEVELS = (('minute', 60), ('hour', 3600), ('day', 86400))
+LEVEL_SECONDS = dict(ROLLUP_LEVELS)
+DAY = 86400
+
+
+def rollup_dtype(fields=HISTORY_FIELDS):
+    """One rollup record: bucket start plus count/sum/min/max per field"""
+    width = len(fields)
+    return np.dtype([('t', '<f8'), ('count', '<u4', (width,)), ('sum', '<f8', (width,)),
+                     ('min', '<f4', (width,)), ('max', '<f4', (width,))])
+
+
+def aggregate(timestamps, values, seconds, dtype):
+    """Rollup records (buckets x series) of sorted samples; values is (samples x series x fields)"""
+    ids = np.floor(timestamps / seconds)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    present = ~np.isnan(values)
+    records = np.zeros((len(starts), values.shape[1]), dtype=dtype)
+    records['t'] = (ids[starts] * seconds)[:, np.newaxis]
+    records['count'] = np.add.reduceat(present, starts, axis=0)
+    records['sum'] = np.add.reduceat(np.where(present, values, 0).astype(np.float64), starts, axis=0)
+    records['min'] = np.fmin.reduceat(values, starts, axis=0)
+    records['max'] = np.fmax.reduceat(values, starts, axis=0)
+    return records
+
+
+def combine(records):
+    """Merge records sharing a bucket start (partials from separate flushes) into one per bucket"""
+    if len(records) < 2:
+        return records
+    records = records[np.argsort(records['t'], kind='stable')]
+    starts = np.flatnonzero(np.r_[True, records['t'][1:] != records['t'][:-1]])
+    if len(starts) == len(records):
+        return records
+    merged = np.zeros(len(starts), dtype=records.dtype)
+    merged['t'] = records['t'][starts]
+    merged['count'] = np.add.reduceat(records['count'], starts, axis=0)
+    merged['sum'] = np.add.reduceat(records['sum'], starts, axis=0)
+    merged['min'] = np.fmin.reduceat(records['min'], starts, axis=0)
+    merged['max'] = np.fmax.reduceat(records['max'], starts, axis=0)
+    return merged
+
+
+def combine_columns(a, b):
+    """Element-wise merge of two rollup record arrays for the same buckets"""
+    merged = a.copy()
+    merged['count'] += b['count']
+    merged['sum'] += b['sum']
+    merged['min'] = np.fmin(a['min'], b['min'])
+    merged['max'] = np.fmax(a['max'], b['max'])
+    return merged
+
+
+def collapse(records):
+    """All records merged into a single one"""
+    total = records[:1].copy()
+    total['count'] = records['count'].sum(axis=0)
+    total['sum'] = records['sum'].sum(axis=0)
+    total['min'] = np.fmin.reduce(records['min'], axis=0)
+    total['max'] = np.fmax.reduce(records['max'], axis=0)
+    return total
+
+
+def _day_name(day):
+    return datetime.fromtimestamp(day * DAY, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def _read(path, dtype):
+    """The complete records of an append-only file, memory-mapped; a torn trailing record is ignored"""
+    try:
+        count = os.path.getsize(path) // dtype.itemsize
+    except OSError:
+        count = 0
+    if not count:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+
+class ArchiveBlock:
+    """Series appended together with shared timestamps, like one simulator's athletes.
+
+    Samples are buffered in memory and flushed once per flush_seconds
+    interval. A flush only detaches the buffer; the archive's writer
+    thread then turns it into raw column chunks and into minute/hour/day
+    rollup records for every series, in a few vectorized passes, so the
+    appending thread never waits on aggregation or disk. Rollup buckets
+    still open stay pending in memory and are folded into by the next
+    flush, so a bucket is normally written once; only a shutdown or
+    restart leaves partial records, which queries merge.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.ids = []
+        self.columns = {}
+        self.times = []
+        self.rows = []
+        # Detached buffers the writer has not stored yet
+        self.inflight = []
+        self.pending = {}
+        self._lock = threading.Lock()
+        self._fold_lock = threading.Lock()
+
+    @property
+    def width(self):
+        return len(self.ids)
+
+    def add(self, series_id):
+        """Column of a series in this block, adding it if new"""
+        with self._lock:
+            column = self.columns.get(series_id)
+            if column is None:
+                column = self.columns[series_id] = len(self.ids)
+                self.ids.append(series_id)
+            return column
+
+    def append(self, t, columns, count=None):
+        """Buffer one sample per series: columns maps a field to an array over the first count series"""
+        interval = self.archive.flush_seconds
+        batch = None
+        with self._lock:
+            if self.times and math.floor(t / interval) != math.floor(self.times[0] / interval):
+                batch = self._detach(math.floor(t / interval) * interval)
+            count = self.width if count is None else count
+            row = np.full((count, len(self.archive.fields)), np.nan, dtype=np.float32)
+            for i, field in enumerate(self.archive.fields):
+                if field in columns:
+                    row[:, i] = columns[field]
+            self.times.append(t)
+            self.rows.append(row)
+        if batch is not None:
+            self.archive.submit(lambda: self._store(batch))
+
+    def flush(self, until=None, final=False):
+        """Write out what is buffered; rollup buckets ending by until (all, if final) are closed"""
+        with self._lock:
+            batch = self._detach(math.inf if final else (time.time() if until is None else until))
+        self.archive.submit(lambda: self._store(batch))
+
+    def due(self, now):
+        """Whether the buffer holds samples from an interval that has ended, or a pending bucket has closed"""
+        interval = self.archive.flush_seconds
+        until = math.floor(now / interval) * interval
+        with self._lock:
+            if self.times and self.times[0] < until:
+                return True
+        with self._fold_lock:
+            return any(records['t'][0] + LEVEL_SECONDS[level] <= until for level, records in self.pending.items())
+
+    def buffered(self, column, start, end):
+        """(timestamps, values) of one series not stored yet, within [start, end)"""
+        with self._lock:
+            batches = [(times, rows) for times, rows, _, _ in self.inflight] + [(self.times, self.rows)]
+            picked = [(t, row[column]) for times, rows in batches for t, row in zip(times, rows)
+                      if start <= t < end and column < len(row)]
+        if not picked:
+            return np.zeros(0), np.zeros((0, len(self.archive.fields)), dtype=np.float32)
+        return np.array([t for t, _ in picked]), np.array([values for _, values in picked])
+
+    def open_records(self, column, level):
+        """The pending (not yet written) rollup record of a series at a level, if any"""
+        with self._fold_lock:
+            records = self.pending.get(level)
+            if records is None or column >= len(records) or not records['count'][column].any():
+                return None
+            return records[column:column + 1].copy()
+
+    def _detach(self, until):
+        """Take the buffer for _store(), with rollup buckets ending by until to close"""
+        batch = (self.times, self.rows, self.width, until)
+        self.times, self.rows = [], []
+        if batch[0]:
+            self.inflight.append(batch)
+        return batch
+
+    def _store(self, batch):
+        """Aggregate and write one detached buffer (on the writer thread)"""
+        times, rows, width, until = batch
+        writes = []
+        if width:
+            with self._fold_lock:
+                if times:
+                    timestamps = np.array(times)
+                    values = np.full((len(rows), width, len(self.archive.fields)), np.nan, dtype=np.float32)
+                    for i, row in enumerate(rows):
+                        values[i, :len(row)] = row
+                    writes.extend(self._raw_writes(timestamps, values))
+                    records = {level: aggregate(timestamps, values, seconds, self.archive.dtype)
+                               for level, seconds in ROLLUP_LEVELS}
+                else:
+                    records = {level: np.zeros((0, width), dtype=self.archive.dtype) for level, _ in ROLLUP_LEVELS}
+                for level, _ in ROLLUP_LEVELS:
+                    writes.extend(self._fold(level, records[level], width, until))
+        self.archive.write_files(writes)
+        if times:
+            with self._lock:
+                self.inflight.remove(batch)
+
+    def _raw_writes(self, timestamps, values):
+        """Column chunks of every series per UTC day; fields before timestamps, so readers see whole rows"""
+        writes = []
+        days = np.floor(timestamps / DAY).astype(np.int64)
+        bounds = np.flatnonzero(np.r_[True, days[1:] != days[:-1], True])
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            chunk = values[lo:hi]
+            present = ~np.isnan(chunk).all(axis=2)
+            # One contiguous run per (field, series) to write
+            columns = np.ascontiguousarray(chunk.transpose(2, 1, 0))
+            for column in np.flatnonzero(present.any(axis=0)).tolist():
+                rows = present[:, column]
+                full = rows.all()
+                files = [(f"{field}.f32", columns[i, column] if full else columns[i, column][rows])
+                         for i, field in enumerate(self.archive.fields)]
+                files.append(('t.f64', timestamps[lo:hi] if full else timestamps[lo:hi][rows]))
+                writes.append((self.ids[column], _day_name(days[lo]), files))
+        return writes
+
+    def _fold(self, level, records, width, until):
+        """Merge new rollup records into the pending bucket and return writes for buckets now closed"""
+        seconds = LEVEL_SECONDS[level]
+        pending = self.pending.pop(level, None)
+        closed = []
+        if pending is not None:
+            if len(pending) < width:
+                grown = np.zeros(width, dtype=pending.dtype)
+                grown['t'] = pending['t'][0]
+                grown[:len(pending)] = pending
+                pending = grown
+            if len(records) and records['t'][0, 0] == pending['t'][0]:
+                records = records.copy()
+                records[0] = combine_columns(pending, records[0])
+            elif len(records) or pending['t'][0] + seconds <= until:
+                closed.append(pending)
+            else:
+                self.pending[level] = pending
+        for i in range(len(records)):
+            if i < len(records) - 1 or records['t'][i, 0] + seconds <= until:
+                closed.append(records[i])
+            else:
+                self.pending[level] = records[i]
+        return [write for record in closed for write in self._rollup_writes(level, record)]
+
+    def _rollup_writes(self, level, record):
+        day = _day_name(math.floor(record['t'][0] / DAY))
+        name = f"{level}.bin"
+        return [(self.ids[column], None if level == 'day' else day, [(name, record[column:column + 1])])
+                for column in np.flatnonzero(record['count'].any(axis=1)).tolist()]
+
+
+class TelemetryArchive:
+    """Append-only on-disk telemetry history with minute/hour/day rollups.
+
+    Layout, one directory per series (athlete id, or 'device:<address>')
+    and per UTC day:
+
+        <root>/<series>/<YYYY-MM-DD>/t.f64, <field>.f32 ...   raw columns
+        <root>/<series>/<YYYY-MM-DD>/minute.bin, hour.bin       rollups
+        <root>/<series>/day.bin                                 daily rollups
+
+    Raw columns are plain little-endian arrays and rollups are fixed-size
+    records (see rollup_dtype), so queries memory-map just the days they
+    touch and binary-search the timestamps instead of loading files.
+    summary() answers an aggregate over any range from the coarsest
+    rollups that fit it, reading raw samples only for the sub-minute edges.
+
+    Writers buffer in ArchiveBlocks; aggregation and file appends happen
+    on a single writer thread once start() has been called (inline
+    otherwise), which also flushes blocks that went quiet. Queries add
+    the samples not stored yet to what is on disk, so they are current
+    to the last appended sample.
+    """
+
+    def __init__(self, root, fields=HISTORY_FIELDS, flush_seconds=60, raw_days=None):
+        self.root = root
+        self.fields = tuple(fields)
+        self.flush_seconds = flush_seconds
+        self.raw_days = raw_days
+        self.dtype = rollup_dtype(self.fields)
+        self.series = {}
+        self.blocks = []
+        self._lock = threading.Lock()
+        self._dirs = set()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pruned_day = None
+        self._stats = {'flushes': 0, 'files_written': 0, 'bytes_written': 0, 'write_errors': 0}
+        os.makedirs(root, exist_ok=True)
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='telemetry-archive')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def block(self):
+        """A new block for a writer with many series sharing timestamps"""
+        block = ArchiveBlock(self)
+        with self._lock:
+            self.blocks.append(block)
+        return block
+
+    def bind(self, series_id, block):
+        """Add a series to a block; returns its column"""
+        column = block.add(series_id)
+        with self._lock:
+            self.series[series_id] = (block, column)
+        return column
+
+    def record(self, series_id, t, values):
+        """Append one sample {field: value} to a series with its own block"""
+        entry = self.series.get(series_id)
+        if entry is None:
+            entry = (self.block(), 0)
+            self.bind(series_id, entry[0])
+        block, _ = entry
+        block.append(t, {field: values[field] for field in self.fields if values.get(field) is not None}, 1)
+
+    def submit(self, task):
+        """Run task on the writer thread, or right away if it is not running"""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(task)
+        else:
+            task()
+
+    def flush(self, final=False):
+        """Flush every block and wait until everything queued is on disk"""
+        with self._lock:
+            blocks = list(self.blocks)
+        for block in blocks:
+            block.flush(final=final)
+        if self._thread and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Write everything, including still-open rollup buckets as partial records"""
+        self.flush(final=True)
+
+    def samples(self, series_id, start, end, fields=None, buffered=True):
+        """(timestamps, {field: values}) of a series within [start, end), oldest first"""
+        fields = self._fields(fields)
+        parts_t, parts = [], {field: [] for field in fields}
+        for day in range(math.floor(start / DAY), math.floor((end - 1e-9) / DAY) + 1):
+            directory = self._path(series_id, _day_name(day))
+            timestamps = _read(os.path.join(directory, 't.f64'), np.dtype('<f8'))
+            lo, hi = np.searchsorted(timestamps, [start, end])
+            if lo == hi:
+                continue
+            parts_t.append(np.array(timestamps[lo:hi]))
+            for field in fields:
+                parts[field].append(np.array(_read(os.path.join(directory, f"{field}.f32"), np.dtype('<f4'))[lo:hi]))
+
+        entry = self.series.get(series_id)
+        if entry is not None and buffered:
+            block, column = entry
+            timestamps, values = block.buffered(column, start, end)
+            if len(timestamps):
+                # Rows the writer thread already stored are not repeated
+                newest = parts_t[-1][-1] if parts_t else -math.inf
+                keep = timestamps > newest
+                parts_t.append(timestamps[keep])
+                for field in fields:
+                    parts[field].append(values[keep, self.fields.index(field)])
+
+        if not parts_t:
+            return np.zeros(0), {field: np.zeros(0, dtype=np.float32) for field in fields}
+        return np.concatenate(parts_t), {field: np.concatenate(parts[field]) for field in fields}
+
+    def rollups(self, series_id, level, start, end):
+        """Merged rollup records of a series at a level with bucket start in [start, end)"""
+        if level == 'day':
+            paths = [self._path(series_id, None, 'day.bin')]
+        else:
+            paths = [self._path(series_id, _day_name(day), f"{level}.bin")
+                     for day in range(math.floor(start / DAY), math.floor((end - 1e-9) / DAY) + 1)]
+        parts = []
+        for path in paths:
+            records = _read(path, self.dtype)
+            if len(records):
+                keep = (records['t'] >= start) & (records['t'] < end)
+                parts.append(np.asarray(records[keep]))
+        entry = self.series.get(series_id)
+        if entry is not None:
+            block, column = entry
+            records = block.open_records(column, level)
+            if records is not None and start <= records['t'][0] < end:
+                parts.append(records)
+        if not parts:
+            return np.zeros(0, dtype=self.dtype)
+        return combine(np.concatenate(parts))
+
+    def summary(self, series_id, start, end, fields=None):
+        """count/min/max/avg per field over [start, end), from the coarsest rollups covering it"""
+        fields = self._fields(fields)
+        total = np.zeros(1, dtype=self.dtype)
+        total['min'] = np.nan
+        total['max'] = np.nan
+        for level, lo, hi in self._cover(start, end, len(ROLLUP_LEVELS) - 1):
+            if level is None:
+                timestamps, columns = self.samples(series_id, lo, hi, buffered=False)
+                records = self._bucket(np.stack([columns[field] for field in self.fields], axis=-1))
+            else:
+                records = self.rollups(series_id, level, lo, hi)
+            if len(records):
+                total = combine_columns(total, collapse(records))
+        entry = self.series.get(series_id)
+        if entry is not None:
+            # Samples not flushed yet are in no rollup
+            block, column = entry
+            _, values = block.buffered(column, start, end)
+            records = self._bucket(values)
+            if len(records):
+                total = combine_columns(total, records)
+        return self._json_summary(total[0], fields)
+
+    def query(self, series_id, start, end, level='raw', fields=None):
+        """Compact columnar JSON of raw samples or of rollups at a level"""
+        fields = self._fields(fields)
+        if level == 'raw':
+            timestamps, columns = self.samples(series_id, start, end, fields)
+            return {
+                'series': series_id, 'level': level, 'count': len(timestamps),
+                't': np.round(timestamps, 3).tolist(),
+                'fields': {field: _json_values(values) for field, values in columns.items()}
+            }
+        if level not in LEVEL_SECONDS:
+            raise ValueError(f"Unknown level: {level}")
+        records = self.rollups(series_id, level, start, end)
+        result = {'series': series_id, 'level': level, 'count': len(records),
+                  't': records['t'].tolist(), 'fields': {}}
+        for field in fields:
+            i = self.fields.index(field)
+            counts = records['count'][:, i]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                avg = records['sum'][:, i] / counts
+            result['fields'][field] = {'count': counts.tolist(), 'min': _json_values(records['min'][:, i]),
+                                       'max': _json_values(records['max'][:, i]), 'avg': _json_values(avg)}
+        return result
+
+    def prune(self, now=None):
+        """Delete raw columns of days older than raw_days, keeping their rollups"""
+        if not self.raw_days:
+            return 0
+        cutoff = _day_name(math.floor((time.time() if now is None else now) / DAY) - self.raw_days)
+        removed = 0
+        for series in os.listdir(self.root):
+            series_dir = os.path.join(self.root, series)
+            if not os.path.isdir(series_dir):
+                continue
+            for day in os.listdir(series_dir):
+                if len(day) != 10 or day >= cutoff:
+                    continue
+                for name in os.listdir(os.path.join(series_dir, day)):
+                    if name.endswith(('.f32', '.f64')):
+                        os.remove(os.path.join(series_dir, day, name))
+                        removed += 1
+        return removed
+
+    def stats(self):
+        with self._lock:
+            blocks = list(self.blocks)
+        return {
+            'series': len(self.series),
+            'blocks': len(blocks),
+            'buffered_samples': sum(len(block.times) for block in blocks),
+            'inflight_flushes': sum(len(block.inflight) for block in blocks),
+            'queued_flushes': self._queue.qsize(),
+            'flush_seconds': self.flush_seconds,
+            **self._stats
+        }
+
+    def _run(self):
+        while True:
+            try:
+                task = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                self._maintain()
+                continue
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"Error storing archived telemetry: {str(e)}")
+            finally:
+                self._queue.task_done()
+            if self._queue.empty():
+                self._maintain()
+
+    def _maintain(self):
+        """Flush blocks that stopped receiving samples, and prune old raw days once a day"""
+        now = time.time()
+        with self._lock:
+            blocks = list(self.blocks)
+        for block in blocks:
+            if block.due(now):
+                try:
+                    block.flush(math.floor(now / self.flush_seconds) * self.flush_seconds)
+                except Exception as e:
+                    logger.error(f"Error flushing telemetry archive block: {str(e)}")
+        today = math.floor(now / DAY)
+        if self.raw_days and self._pruned_day != today:
+            self._pruned_day = today
+            try:
+                removed = self.prune(now)
+                if removed:
+                    logger.info(f"Pruned {removed} raw telemetry files older than {self.raw_days} days")
+            except Exception as e:
+                logger.error(f"Error pruning telemetry archive: {str(e)}")
+
+    def write_files(self, writes):
+        """Append (series_id, day or None, [(filename, array)]) to the series' files"""
+        if not writes:
+            return
+        self._stats['flushes'] += 1
+        for series_id, day, files in writes:
+            directory = self._path(series_id, day)
+            try:
+                if directory not in self._dirs:
+                    os.makedirs(directory, exist_ok=True)
+                    self._dirs.add(directory)
+                for name, array in files:
+                    with open(os.path.join(directory, name), 'ab') as f:
+                        f.write(array.tobytes())
+                    self._stats['files_written'] += 1
+                    self._stats['bytes_written'] += array.nbytes
+            except Exception as e:
+                self._stats['write_errors'] += 1
+                logger.error(f"Error archiving telemetry for {series_id}: {str(e)}")
+
+    def _path(self, series_id, day=None, name=None):
+        # Dots are escaped too, so no id can name '.' or '..'
+        parts = [self.root, quote(str(series_id), safe='').replace('.', '%2E')]
+        if day:
+            parts.append(day)
+        if name:
+            parts.append(name)
+        return os.path.join(*parts)
+
+    def _fields(self, fields):
+        return [field for field in (fields or self.fields) if field in self.fields]
+
+    @staticmethod
+    def _cover(start, end, level_index):
+        """Split [start, end) into (level, lo, hi) spans of whole buckets, coarsest first; level None is raw"""
+        if start >= end:
+            return []
+        if level_index < 0:
+            return [(None, start, end)]
+        level, seconds = ROLLUP_LEVELS[level_index]
+        lo = math.ceil(start / seconds) * seconds
+        hi = math.floor(end / seconds) * seconds
+        if lo >= hi:
+            return TelemetryArchive._cover(start, end, level_index - 1)
+        return (TelemetryArchive._cover(start, lo, level_index - 1) + [(level, lo, hi)] +
+                TelemetryArchive._cover(hi, end, level_index - 1))
+
+    def _bucket(self, values):
+        """One rollup record of (samples x fields) values, or none if there are no samples"""
+        if not len(values):
+            return np.zeros(0, dtype=self.dtype)
+        return aggregate(np.zeros(len(values)), values[:, np.newaxis], 1, self.dtype)[:, 0]
+
+    def _json_summary(self, record, fields):
+        result = {}
+        for field in fields:
+            i = self.fields.index(field)
+            count = int(record['count'][i])
+            result[field] = {
+                'count': count,
+                'min': None if not count else round(float(record['min'][i]), 3),
+                'max': None if not count else round(float(record['max'][i]), 3),
+                'avg': None if not count else round(float(record['sum'][i]) / count, 3)
+            }
+        return result
+
+
+def _json_values(values, digits=3):
+    return [None if math.isnan(v) else v for v in np.round(np.asarray(values, dtype=np.float64), digits).tolist()]
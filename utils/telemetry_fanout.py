@@ -0,0 +1,173 @@
+import logging
+import threading
+
+import numpy as np
+from flask_socketio import join_room, leave_room
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = '/'
+
+
+class TelemetryRoom:
+    """Subscribers of one athlete or team and what they were last sent"""
+
+    def __init__(self, name, kind, key):
+        self.name = name
+        self.kind = kind
+        self.key = key
+        self.sids = set()
+        # Joined since the room's last frame; they get a full frame with the next one
+        self.pending = set()
+        self.ids = []
+        self.sent = None
+        self.last_emit = float('-inf')
+
+
+class TelemetryFanout:
+    """Pushes simulator telemetry to the clients watching it, as batched deltas.
+
+    Clients join a room per athlete ('athlete_<id>') or per team
+    ('team_<name>'). Each tick, collect() reads the simulator's published
+    snapshot (no simulator lock needed) and looks only at watched athletes:
+    for every room that may emit (at most max_rate frames per second) it
+    compares the values with what that room was last sent and builds one
+    frame holding just the changed fields of the changed athletes. Rooms
+    with nothing new send nothing. A client joining a room gets a full
+    frame for it alongside that room's next frame, so it never applies a
+    delta to values it has not seen. The work per tick therefore follows
+    what is being watched, not how many athletes are simulated.
+    """
+
+    def __init__(self, socketio, event='telemetry', max_rate=1.0):
+        self.socketio = socketio
+        self.event = event
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.rooms = {}
+        self.subscriptions = {}
+        self._lock = threading.Lock()
+        self._stats = {'frames': 0, 'keyframes': 0, 'athlete_updates': 0, 'field_updates': 0,
+                       'rate_limited': 0, 'unchanged': 0}
+
+    def subscribe(self, sid, athletes=(), teams=()):
+        """Join sid to the rooms of the given athletes and teams; returns the room names"""
+        names = []
+        with self._lock:
+            for kind, keys in (('athlete', athletes), ('team', teams)):
+                for key in keys:
+                    name = f"{kind}_{key}"
+                    room = self.rooms.get(name)
+                    if room is None:
+                        room = self.rooms[name] = TelemetryRoom(name, kind, str(key))
+                    if sid not in room.sids:
+                        room.sids.add(sid)
+                        room.pending.add(sid)
+                        self.subscriptions.setdefault(sid, set()).add(name)
+                        join_room(name, sid=sid, namespace=NAMESPACE)
+                    names.append(name)
+        return names
+
+    def unsubscribe(self, sid, athletes=(), teams=()):
+        with self._lock:
+            for kind, keys in (('athlete', athletes), ('team', teams)):
+                for key in keys:
+                    self._leave(sid, f"{kind}_{key}")
+
+    def disconnect(self, sid):
+        """Forget every subscription of a disconnected client"""
+        with self._lock:
+            for name in list(self.subscriptions.get(sid, ())):
+                self._leave(sid, name, connected=False)
+
+    def _leave(self, sid, name, connected=True):
+        room = self.rooms.get(name)
+        if room is None or sid not in room.sids:
+            return
+        room.sids.discard(sid)
+        room.pending.discard(sid)
+        self.subscriptions.get(sid, set()).discard(name)
+        if not self.subscriptions.get(sid):
+            self.subscriptions.pop(sid, None)
+        if connected:
+            leave_room(name, sid=sid, namespace=NAMESPACE)
+        if not room.sids:
+            # Nobody watches it; a later subscriber starts from a full frame again
+            del self.rooms[name]
+
+    def watched(self):
+        """Whether any client is subscribed at all"""
+        return bool(self.rooms)
+
+    def collect(self, population, snapshot):
+        """Frames due for a published PopulationSnapshot, as (payload, to) pairs"""
+        now = snapshot.t
+        frames = []
+        with self._lock:
+            for room in self.rooms.values():
+                if now - room.last_emit < self.min_interval:
+                    self._stats['rate_limited'] += 1
+                    continue
+                ids = self._members(room, population, snapshot)
+                if not ids:
+                    continue
+                values = snapshot.values[[snapshot.index[i] for i in ids]]
+                if room.ids != ids:
+                    room.sent = self._realign(room, ids, values.shape[1])
+                    room.ids = ids
+
+                changed = values != room.sent
+                athletes = {}
+                for position in np.flatnonzero(changed.any(axis=1)).tolist():
+                    columns = np.flatnonzero(changed[position]).tolist()
+                    athletes[ids[position]] = population.decode(values[position], columns)
+                    self._stats['field_updates'] += len(columns)
+                if athletes:
+                    frames.append(({'t': now, 'full': False, 'athletes': athletes}, room.name))
+                    self._stats['athlete_updates'] += len(athletes)
+                else:
+                    self._stats['unchanged'] += 1
+
+                # A room's first frame is already complete
+                if room.pending and not changed.all():
+                    keyframe = {'t': now, 'full': True, 'athletes': {
+                        athlete_id: population.decode(row) for athlete_id, row in zip(ids, values)
+                    }}
+                    frames.extend((keyframe, sid) for sid in room.pending)
+                    self._stats['keyframes'] += len(room.pending)
+                room.pending.clear()
+                room.sent = values
+                room.last_emit = now
+            self._stats['frames'] += len(frames)
+        return frames
+
+    def send(self, frames):
+        for payload, to in frames:
+            try:
+                self.socketio.emit(self.event, payload, to=to, namespace=NAMESPACE)
+            except Exception as e:
+                logger.error(f"Error emitting telemetry to {to}: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rooms': len(self.rooms),
+                'subscribers': len(self.subscriptions),
+                'max_rate': round(1.0 / self.min_interval, 3) if self.min_interval else None,
+                **self._stats
+            }
+
+    @staticmethod
+    def _members(room, population, snapshot):
+        if room.kind == 'athlete':
+            return [room.key] if snapshot.get(room.key) is not None else []
+        return [i for i in population.teams.get(room.key, ()) if snapshot.get(i) is not None]
+
+    @staticmethod
+    def _realign(room, ids, width):
+        """Last-sent rows for the new member list; new members have never been sent anything"""
+        sent = np.full((len(ids), width), np.nan)
+        previous = {athlete_id: position for position, athlete_id in enumerate(room.ids)}
+        for position, athlete_id in enumerate(ids):
+            if athlete_id in previous and room.sent is not None:
+                sent[position] = room.sent[previous[athlete_id]]
+        return sent
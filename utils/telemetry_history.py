@@ -0,0 +1,251 @@
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Metrics kept per sample, besides the timestamp
+HISTORY_FIELDS = ('heart_rate', 'hrv', 'steps', 'stress_level', 'recovery_score', 'hydration_level')
+
+# Widths are rounded up to a multiple of this, so series joining one at a
+# time do not each copy the block, while at most this many columns go unused
+GROW_SERIES = 32
+
+
+class TelemetryRing:
+    """Fixed-memory ring of recent samples for a block of series sharing timestamps.
+
+    Column s of every field array is one series (one athlete or device),
+    row r one sample time, so the simulator stores a whole tick with one
+    vectorized write per field. Values are float32 with NaN for "not
+    recorded". The block never uses more than memory_bytes: when it has to
+    widen for more series, it keeps fewer (the newest) samples instead of
+    growing, up to max_samples per series. At 256 MB and one sample per
+    second that drops below an hour past about 2,000 series; window()
+    reports what is actually held, and queries say when a range reaches
+    past it.
+    """
+
+    def __init__(self, max_samples=3600, width=1, memory_bytes=256 * 1024 * 1024, fields=HISTORY_FIELDS):
+        self.fields = fields
+        self.max_samples = max_samples
+        self.memory_bytes = memory_bytes
+        self.width = 0
+        self.capacity = 0
+        self.count = 0
+        self.head = 0
+        self.timestamps = np.zeros(0)
+        self.values = {field: np.zeros((0, 0), dtype=np.float32) for field in fields}
+        self.added_at = np.zeros(0)
+        self._lock = threading.Lock()
+        self.resize(width)
+
+    def resize(self, width):
+        """Make room for at least width series, keeping the newest samples that still fit"""
+        with self._lock:
+            if width <= self.width:
+                return
+            width = -(-width // GROW_SERIES) * GROW_SERIES
+            per_sample = 8 + width * len(self.fields) * 4
+            capacity = max(1, min(self.max_samples, self.memory_bytes // per_sample))
+            keep = min(self.count, capacity)
+            order = self._order()[-keep:] if keep else np.zeros(0, dtype=np.intp)
+
+            timestamps = np.zeros(capacity)
+            timestamps[:keep] = self.timestamps[order]
+            for field in self.fields:
+                values = np.full((capacity, width), np.nan, dtype=np.float32)
+                values[:keep, :self.width] = self.values[field][order]
+                self.values[field] = values
+            self.timestamps = timestamps
+            self.added_at = np.concatenate([self.added_at, np.full(width - self.width, np.inf)])
+            self.width, self.capacity, self.count, self.head = width, capacity, keep, keep % capacity
+        if capacity < self.max_samples:
+            logger.warning(f"Telemetry ring for {width} series keeps {capacity} of {self.max_samples} samples "
+                           f"per series within {self.memory_bytes // (1024 * 1024)} MB")
+
+    def activate(self, series, t):
+        """Mark a series as recorded from t on; earlier rows in its column are not its data"""
+        self.added_at[series] = t
+
+    def append(self, t, columns, count=None):
+        """Store one sample per series: columns maps a field to a value, or to an array for the first count series"""
+        with self._lock:
+            row = self.head
+            self.timestamps[row] = t
+            for field in self.fields:
+                values = self.values[field][row]
+                if count is None:
+                    values[:] = columns.get(field, np.nan)
+                else:
+                    values[:count] = columns.get(field, np.nan)
+                    values[count:] = np.nan
+            self.head = (row + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def query(self, series, start=None, end=None, fields=None):
+        """(timestamps, {field: values}) of one series within [start, end], oldest first"""
+        fields = fields or self.fields
+        with self._lock:
+            order = self._order()
+            timestamps = self.timestamps[order]
+            keep = timestamps >= max(self.added_at[series], -math.inf if start is None else start)
+            if end is not None:
+                keep &= timestamps <= end
+            rows = order[keep]
+            return self.timestamps[rows], {field: self.values[field][rows, series] for field in fields}
+
+    def window(self):
+        """(oldest, newest) sample time held, or (None, None) when empty"""
+        with self._lock:
+            if not self.count:
+                return None, None
+            order = self._order()
+            return float(self.timestamps[order[0]]), float(self.timestamps[order[-1]])
+
+    @property
+    def full(self):
+        """True once old samples are being overwritten"""
+        return self.count == self.capacity
+
+    def _order(self):
+        """Row indices from oldest to newest"""
+        if self.count < self.capacity:
+            return np.arange(self.count)
+        return (np.arange(self.capacity) + self.head) % self.capacity
+
+
+def downsample(timestamps, columns, bucket, start=None):
+    """min/max/avg of each field per bucket-second interval, NaNs ignored.
+
+    Returns (bucket start times, {field: {'min', 'max', 'avg'}}); buckets
+    without samples are left out.
+    """
+    if not len(timestamps):
+        return timestamps, {field: {'min': [], 'max': [], 'avg': []} for field in columns}
+    origin = timestamps[0] if start is None else start
+    ids = np.floor((timestamps - origin) / bucket).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    result = {}
+    for field, values in columns.items():
+        values = values.astype(np.float64)
+        present = ~np.isnan(values)
+        counts = np.add.reduceat(present, starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[field] = {
+                'min': np.fmin.reduceat(values, starts),
+                'max': np.fmax.reduceat(values, starts),
+                'avg': np.add.reduceat(np.where(present, values, 0.0), starts) / counts
+            }
+    return origin + ids[starts] * bucket, result
+
+
+def _json_values(values, digits):
+    return [None if math.isnan(v) else v for v in np.round(values, digits).tolist()]
+
+
+class TelemetryHistory:
+    """Recent telemetry per athlete or device, with range queries and downsampling.
+
+    Series are identified by athlete id, or 'device:<address>' for wearable
+    devices. A block writer such as the simulator registers its series in
+    one shared TelemetryRing; anything else records through record(), which
+    gives each series its own single-column ring.
+    """
+
+    def __init__(self, max_samples=3600, memory_bytes=256 * 1024 * 1024):
+        self.max_samples = max_samples
+        self.memory_bytes = memory_bytes
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def block(self, width=64):
+        """A new shared ring for a block writer, within the configured memory"""
+        return TelemetryRing(self.max_samples, width=width, memory_bytes=self.memory_bytes)
+
+    def bind(self, series_id, ring, column, t=None):
+        ring.activate(column, time.time() if t is None else t)
+        with self._lock:
+            self.series[series_id] = (ring, column)
+
+    def record(self, series_id, t, values):
+        """Append one sample {field: value} to a series with its own ring"""
+        entry = self.series.get(series_id)
+        if entry is None:
+            with self._lock:
+                entry = self.series.get(series_id)
+                if entry is None:
+                    # A single series is small; no need to share the block budget
+                    ring = TelemetryRing(self.max_samples, width=1, memory_bytes=self.max_samples * 64)
+                    ring.activate(0, t)
+                    entry = self.series[series_id] = (ring, 0)
+        ring, _ = entry
+        ring.append(t, {field: values[field] for field in ring.fields if values.get(field) is not None})
+
+    def query(self, series_id, start=None, end=None, bucket=None, points=None, fields=None):
+        """Samples of a series as compact columns, optionally downsampled.
+
+        With bucket (seconds) or points (target number of buckets over the
+        range), each field becomes {'min', 'max', 'avg'} lists per bucket;
+        otherwise raw values are returned. 'retained_from' is the oldest
+        sample the ring still holds and 'truncated' is True when older
+        samples in the range were overwritten. Returns None for an unknown
+        series; raises ValueError for an unknown field, a bucket or points
+        that is not positive, or start after end.
+        """
+        if start is not None and end is not None and start > end:
+            raise ValueError(f"start ({start}) is after end ({end})")
+        if bucket is not None and bucket <= 0:
+            raise ValueError(f"bucket must be positive, got {bucket}")
+        if points is not None and points <= 0:
+            raise ValueError(f"points must be positive, got {points}")
+        entry = self.series.get(series_id)
+        if entry is None:
+            return None
+        ring, column = entry
+        unknown = [field for field in fields or () if field not in ring.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}; expected some of {', '.join(ring.fields)}")
+        fields = list(fields or ring.fields)
+        timestamps, columns = ring.query(column, start, end, fields)
+        oldest, _ = ring.window()
+        added = float(ring.added_at[column])
+        window = {
+            'retained_from': None if oldest is None else max(oldest, added),
+            # Samples of this series in range were overwritten, not just never recorded
+            'truncated': bool(ring.full and start is not None and start < oldest and added < oldest)
+        }
+
+        if points and not bucket and len(timestamps):
+            span = (end if end is not None else timestamps[-1]) - (start if start is not None else timestamps[0])
+            bucket = max(1, math.ceil(span / points))
+        if not bucket:
+            return {
+                'series': series_id, 'bucket': None, 'count': len(timestamps), **window,
+                't': np.round(timestamps, 3).tolist(),
+                'fields': {field: _json_values(values, 1) for field, values in columns.items()}
+            }
+        bucket_starts, stats = downsample(timestamps, columns, bucket, start)
+        return {
+            'series': series_id, 'bucket': bucket, 'count': len(timestamps), **window,
+            't': np.round(bucket_starts, 3).tolist(),
+            'fields': {field: {name: _json_values(values, 1) for name, values in summary.items()}
+                       for field, summary in stats.items()}
+        }
+
+    def stats(self):
+        """Sizes plus the shortest history any series has: samples_per_series and, once full, window_seconds"""
+        rings = {id(ring): ring for ring, _ in list(self.series.values())}
+        windows = [newest - oldest for oldest, newest in (ring.window() for ring in rings.values() if ring.full)]
+        return {
+            'series': len(self.series),
+            'rings': len(rings),
+            'bytes': int(sum(ring.timestamps.nbytes + sum(v.nbytes for v in ring.values.values())
+                             for ring in rings.values())),
+            'max_samples': self.max_samples,
+            'samples_per_series': min((ring.capacity for ring in rings.values()), default=self.max_samples),
+            'window_seconds': round(min(windows), 3) if windows else None
+        }
@@ -0,0 +1,196 @@
+import numpy as np
+
+# Rows per traversal chunk; bounds the (rows x trees) index arrays to a few MB
+CHUNK_ROWS = 8192
+# Batches this large go to scikit-learn: its Cython traversal has a higher
+# fixed cost per call but a lower cost per row (crossover measured at
+# ~256 rows for the app's models, see benchmarks/bench_tree_ensemble.py)
+BULK_ROWS = 256
+
+
+class CompiledTrees:
+    """Every tree of an ensemble flattened into contiguous node arrays.
+
+    Node i of the ensemble has feature[i], threshold[i], its two children at
+    children[2i] (left) and children[2i + 1] (right), and value[i] (one row
+    of outputs). Child indices are global and leaves point at themselves,
+    so all trees of a batch descend together: each step gathers the split
+    feature of every (row, tree) cursor and moves it to
+    children[2 * node + (x > threshold)]. After max_depth steps every cursor
+    sits on its leaf. Splits compare float32 inputs against the float64
+    thresholds, which is how scikit-learn's trees evaluate them.
+    """
+
+    def __init__(self, trees, values):
+        sizes = [tree.node_count for tree in trees]
+        self.roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+        self.n_trees = len(trees)
+        self.max_depth = max(tree.max_depth for tree in trees)
+
+        feature, threshold, children, missing_left = [], [], [], []
+        for root, tree in zip(self.roots, trees):
+            is_leaf = tree.children_left < 0
+            own = np.arange(tree.node_count) + root
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            children.append(np.column_stack([
+                np.where(is_leaf, own, tree.children_left + root),
+                np.where(is_leaf, own, tree.children_right + root)
+            ]).ravel())
+            missing_left.append(tree.missing_go_to_left.astype(bool) if hasattr(tree, 'missing_go_to_left')
+                                else np.zeros(tree.node_count, dtype=bool))
+        self.feature = np.ascontiguousarray(np.concatenate(feature), dtype=np.intp)
+        self.threshold = np.ascontiguousarray(np.concatenate(threshold), dtype=np.float64)
+        self.children = np.ascontiguousarray(np.concatenate(children), dtype=np.intp)
+        self.missing_left = np.concatenate(missing_left)
+        self.has_missing = bool(self.missing_left.any())
+        self.value = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+
+    def leaves(self, X):
+        """Global leaf index of every (row, tree) for a C-contiguous float32 matrix"""
+        flat = X.ravel()
+        offset = (np.arange(X.shape[0]) * X.shape[1])[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            x = flat[offset + self.feature[node]]
+            go_right = x > self.threshold[node]
+            if self.has_missing:
+                # NaN compares False; send it right unless the split learned otherwise
+                go_right |= np.isnan(x) & ~self.missing_left[node]
+            node = self.children[2 * node + go_right]
+        return node
+
+    def accumulate(self, X, out, scale=None):
+        """Add every tree's leaf value to out, in ensemble order.
+
+        add.accumulate sums strictly left to right, the same order as
+        scikit-learn's per-tree `out += prediction`, so results are
+        bit-for-bit identical (np.sum would use pairwise summation).
+        """
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            leaf_values = self.value[self.leaves(X[start:start + CHUNK_ROWS])]
+            if scale is not None:
+                leaf_values *= scale
+            chunk = out[start:start + CHUNK_ROWS]
+            terms = np.concatenate([chunk[:, np.newaxis], leaf_values], axis=1)
+            chunk[:] = np.add.accumulate(terms, axis=1)[:, -1]
+        return out
+
+
+def _as_float32(X, n_features):
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.shape[1] != n_features:
+        raise ValueError(f"Expected {n_features} features, got {X.shape[1]}")
+    return np.ascontiguousarray(X)
+
+
+class CompiledScorer:
+    """Common state of the compiled scorers; bulk batches go to the model itself"""
+
+    def __init__(self, model, bulk_rows):
+        self.model = model
+        self.bulk_rows = bulk_rows
+        self.n_features_in_ = model.n_features_in_
+        self.feature_importances_ = model.feature_importances_
+
+    def is_bulk(self, X):
+        return self.bulk_rows is not None and len(X) >= self.bulk_rows
+
+
+class CompiledForestClassifier(CompiledScorer):
+    """predict_proba/predict of a fitted single-output forest classifier"""
+
+    def __init__(self, forest, bulk_rows=BULK_ROWS):
+        super().__init__(forest, bulk_rows)
+        self.classes_ = forest.classes_
+        self.n_classes_ = len(forest.classes_)
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        values = []
+        for tree in trees:
+            # Normalised per leaf exactly as DecisionTreeClassifier.predict_proba does
+            proba = tree.value[:, 0, :self.n_classes_].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba / normalizer)
+        self.trees = CompiledTrees(trees, values)
+
+    def predict_proba(self, X):
+        if self.is_bulk(X):
+            return self.model.predict_proba(X)
+        X = _as_float32(X, self.n_features_in_)
+        proba = self.trees.accumulate(X, np.zeros((X.shape[0], self.n_classes_), dtype=np.float64))
+        proba /= self.trees.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+class CompiledForestRegressor(CompiledScorer):
+    """predict of a fitted single-output forest regressor"""
+
+    def __init__(self, forest, bulk_rows=BULK_ROWS):
+        super().__init__(forest, bulk_rows)
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        self.trees = CompiledTrees(trees, [tree.value[:, 0, :1] for tree in trees])
+
+    def predict(self, X):
+        if self.is_bulk(X):
+            return self.model.predict(X)
+        X = _as_float32(X, self.n_features_in_)
+        out = self.trees.accumulate(X, np.zeros((X.shape[0], 1), dtype=np.float64))
+        out /= self.trees.n_trees
+        return out.ravel()
+
+
+class CompiledGradientBoostingRegressor(CompiledScorer):
+    """predict of a fitted GradientBoostingRegressor with the default init"""
+
+    def __init__(self, model, bulk_rows=BULK_ROWS):
+        super().__init__(model, bulk_rows)
+        self.learning_rate = model.learning_rate
+        if isinstance(model.init_, str) and model.init_ == 'zero':
+            self.baseline = 0.0
+        else:
+            # The default init is a DummyRegressor, whose prediction ignores X
+            from sklearn.dummy import DummyRegressor
+            if not isinstance(model.init_, DummyRegressor):
+                raise ValueError(f"Unsupported init estimator {type(model.init_).__name__}")
+            self.baseline = float(model.init_.predict(np.zeros((1, self.n_features_in_))).astype(np.float64)[0])
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        self.trees = CompiledTrees(trees, [tree.value[:, 0, :1] for tree in trees])
+
+    def predict(self, X):
+        if self.is_bulk(X):
+            return self.model.predict(X)
+        X = _as_float32(X, self.n_features_in_)
+        if np.isnan(X).any():
+            # GradientBoostingRegressor rejects missing values as well
+            raise ValueError("Input contains NaN")
+        out = np.full((X.shape[0], 1), self.baseline, dtype=np.float64)
+        return self.trees.accumulate(X, out, scale=self.learning_rate).ravel()
+
+
+def compile_ensemble(model, bulk_rows=BULK_ROWS):
+    """A compiled scorer for a fitted sklearn tree ensemble.
+
+    Supports single-output RandomForest/ExtraTrees classifiers and
+    regressors and GradientBoostingRegressor; raises ValueError otherwise.
+    The scorer exposes the same predict/predict_proba/classes_ as the
+    model, so callers can use either. Batches of bulk_rows or more are
+    passed to the model itself (None scores everything compiled).
+    """
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.ensemble._forest import ForestClassifier, ForestRegressor
+
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Only single-output ensembles can be compiled")
+    if isinstance(model, ForestClassifier):
+        return CompiledForestClassifier(model, bulk_rows)
+    if isinstance(model, ForestRegressor):
+        return CompiledForestRegressor(model, bulk_rows)
+    if isinstance(model, GradientBoostingRegressor):
+        return CompiledGradientBoostingRegressor(model, bulk_rows)
+    raise ValueError(f"Cannot compile {type(model).__name__}")